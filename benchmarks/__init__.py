@@ -0,0 +1 @@
+# Throughput and latency benchmarks (python -m benchmarks.run)
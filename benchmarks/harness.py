@@ -0,0 +1,110 @@
+import inspect
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+# Metrics checked against the baseline: (higher is better, tolerance multiplier,
+# absolute slack). Tails are noisier than medians, and a few microseconds or
+# bytes on a tiny reference are noise; p999 is reported but not gated.
+GATED_METRICS = {
+    'msgs_per_sec': (True, 1, 0),
+    'p50_us': (False, 1, 1),
+    'p99_us': (False, 2, 5),
+    'alloc_bytes': (False, 1, 64)
+}
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+async def measure(op: Callable, iterations: int, warmup: int = 100,
+                  alloc_iterations: Optional[int] = None) -> Dict:
+    """Time op(i) for i in range(iterations); op may be sync or async
+
+    Latencies are per call in microseconds. alloc_bytes is the mean memory
+    a call allocates above what was live before it (tracemalloc peak), and
+    retained_bytes what stays allocated per call; both come from a separate,
+    shorter pass since tracing slows everything down.
+    """
+    is_async = inspect.iscoroutinefunction(op)
+    clock = time.perf_counter_ns
+    for i in range(warmup):
+        result = op(i)
+        if is_async:
+            await result
+    samples = [0] * iterations
+    started = clock()
+    for i in range(iterations):
+        t0 = clock()
+        result = op(i)
+        if is_async:
+            await result
+        samples[i] = clock() - t0
+    elapsed = (clock() - started) / 1e9
+    samples.sort()
+
+    alloc_iterations = min(iterations, alloc_iterations or 2000)
+    allocated = 0
+    tracemalloc.start()
+    try:
+        first, _ = tracemalloc.get_traced_memory()
+        for i in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = op(i)
+            if is_async:
+                await result
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - first
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'msgs_per_sec': iterations / elapsed if elapsed > 0 else 0.0,
+        'p50_us': percentile(samples, 50) / 1000,
+        'p99_us': percentile(samples, 99) / 1000,
+        'p999_us': percentile(samples, 99.9) / 1000,
+        'max_us': samples[-1] / 1000,
+        'alloc_bytes': allocated / alloc_iterations,
+        'retained_bytes': max(retained, 0) / alloc_iterations
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, results: Dict[str, Dict]):
+    gated = {name: {metric: round(result[metric], 3) for metric in GATED_METRICS}
+             for name, result in results.items()}
+    with open(path, 'w') as f:
+        json.dump(gated, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions beyond tolerance (a fraction) for scenarios in both sets"""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        for metric, (higher_is_better, factor, slack) in GATED_METRICS.items():
+            if metric not in expected:
+                continue
+            value, reference = result[metric], expected[metric]
+            allowed = tolerance * factor
+            if higher_is_better:
+                worse = value < reference * (1 - allowed)
+            else:
+                worse = value > reference * (1 + allowed) and value - reference > slack
+            if worse:
+                regressions.append(f"{name}: {metric} {value:.1f} vs baseline {reference:.1f}")
+    return regressions
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark Runner for Arbitrage Trading System
+Drives synthetic (and optionally recorded) frames through the feed, engine
+and order stages with stubbed venues, then checks the results against the
+stored baseline.
+
+Usage: python -m benchmarks.run [--iterations N] [--only NAME] [--frames PATH...]
+                                [--update-baseline] [--tolerance F]
+Exits non-zero when a gated metric regresses by more than the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Per-message logging would dominate the numbers
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from benchmarks.harness import measure, load_baseline, save_baseline, compare
+from benchmarks.scenarios import SCENARIOS, RECORDED_SCENARIOS, ITERATION_SCALE
+from exchanges.recorder import read_frames
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+async def run(iterations, only=None, frame_paths=None):
+    scenarios = dict(SCENARIOS)
+    frames = None
+    if frame_paths:
+        frames = list(read_frames(frame_paths))
+        scenarios.update(RECORDED_SCENARIOS)
+    results = {}
+    for name, setup in scenarios.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        count = max(int(iterations * ITERATION_SCALE.get(name, 1)), 100)
+        op = await setup(count, frames)
+        results[name] = await measure(op, count)
+    return results
+
+def print_results(results):
+    print(f"{'SCENARIO':<30}{'MSGS/S':>12}{'P50 µs':>10}{'P99 µs':>10}{'P999 µs':>10}{'ALLOC B':>10}")
+    for name, result in results.items():
+        print(f"{name:<30}{result['msgs_per_sec']:>12,.0f}{result['p50_us']:>10.1f}{result['p99_us']:>10.1f}"
+              f"{result['p999_us']:>10.1f}{result['alloc_bytes']:>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the throughput and latency benchmarks")
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--only', action='append', help="run scenarios whose name contains this")
+    parser.add_argument('--frames', nargs='+', help="recorded frame segments or directories to replay")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed regression as a fraction")
+    parser.add_argument('--json', action='store_true', help="print the raw results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations, args.only, args.frames))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        save_baseline(args.baseline, baseline)
+        print(f"✅ Baseline written to {args.baseline}")
+        return
+    regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+    if regressions:
+        print("❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+    print("✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
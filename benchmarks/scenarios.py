@@ -0,0 +1,190 @@
+import json
+import time
+from typing import Callable, Dict, List, Optional
+from exchanges.rate_limit import PRIORITY_ORDER
+from exchanges.records import Quote
+from exchanges.recorder import Frame
+from exchanges.replay import connect_engine
+from exchanges.websocket_manager import WebSocketManager
+from services.arbitrage_engine import ArbitrageEngine
+from services.order_manager import OrderManager
+from utils.symbols import SymbolRegistry
+
+# Synthetic market: this many USDT pairs listed on every exchange, with
+# prices cycling through this many steps so every frame changes something
+SYMBOLS = 200
+PRICE_STEPS = 64
+
+
+def synthetic_bases(count: int = SYMBOLS) -> List[str]:
+    return [f"X{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}" for i in range(count)]
+
+
+def synthetic_registry(bases: List[str]) -> SymbolRegistry:
+    symbols = SymbolRegistry()
+    pairs = [(base, 'USDT') for base in bases]
+    symbols.load({'cex': pairs, 'gate': pairs, 'binance': pairs})
+    return symbols
+
+
+def synthetic_frames(exchange: str, bases: List[str], count: int) -> List[str]:
+    """Ticker frames as each venue sends them, round-robin over the symbols"""
+    frames = []
+    for i in range(count):
+        base = bases[i % len(bases)]
+        price = 100 + (i // len(bases)) % PRICE_STEPS * 0.01
+        bid, ask = f"{price - 0.01:.2f}", f"{price + 0.01:.2f}"
+        if exchange == 'binance':
+            frame = {'e': '24hrTicker', 'E': 1700000000000 + i, 's': f'{base}USDT', 'c': f'{price:.2f}',
+                     'b': bid, 'B': '1.5', 'a': ask, 'A': '2.5'}
+        elif exchange == 'gate':
+            frame = {'time': 1700000000, 'time_ms': 1700000000000 + i, 'channel': 'spot.tickers',
+                     'event': 'update', 'result': {'currency_pair': f'{base}_USDT', 'last': f'{price:.2f}',
+                                                   'highest_bid': bid, 'lowest_ask': ask}}
+        else:
+            frame = {'e': 'tick', 'data': {'pair': f'{base}:USDT', 'last': f'{price:.2f}', 'bid': bid, 'ask': ask}}
+        frames.append(json.dumps(frame))
+    return frames
+
+
+class StubVenues:
+    """Stands in for the exchange order endpoints: every order fills at its limit price"""
+
+    def __init__(self):
+        self.orders = 0
+
+    async def place_order(self, exchange: str, symbol: str, side: str, amount: float, price: float,
+                          priority: int = PRIORITY_ORDER) -> Dict:
+        self.orders += 1
+        return {'exchange': exchange, 'symbol': symbol, 'side': side, 'amount': amount, 'price': price,
+                'status': 'filled', 'order_id': f'{exchange}-{self.orders}'}
+
+
+def _manager(symbols: SymbolRegistry) -> WebSocketManager:
+    manager = WebSocketManager(symbols=symbols, workers=False)
+    manager.register_handlers()
+    return manager
+
+
+def _handle_message(exchange: str) -> Callable:
+    async def setup(iterations: int, frames: Optional[List[Frame]] = None):
+        bases = synthetic_bases()
+        manager = _manager(synthetic_registry(bases))
+        adapter = manager.exchanges[exchange]
+        messages = synthetic_frames(exchange, bases, iterations + 100)
+
+        async def op(i):
+            adapter.last_recv = (time.time(), time.monotonic())
+            await adapter.handle_message(messages[i])
+        return op
+    return setup
+
+
+async def handle_price_update(iterations: int, frames: Optional[List[Frame]] = None):
+    """Manager bookkeeping for an already parsed quote"""
+    bases = synthetic_bases()
+    symbols = synthetic_registry(bases)
+    manager = _manager(symbols)
+    manager.register_price_callback(lambda exchange, symbol, quote: None)
+    ids = [symbols.id(f'{base}USDT') for base in bases]
+    now = time.time()
+    quotes = [Quote('binance', ids[i % len(ids)], 99.99, 100.01, 100.0, 1.5, 2.5, now * 1000 - 5, now, 0.0)
+              for i in range(len(ids) * 4)]
+
+    async def op(i):
+        await manager.handle_price_update(quotes[i % len(quotes)])
+    return op
+
+
+async def check_opportunities(iterations: int, frames: Optional[List[Frame]] = None):
+    """Full scan of every symbol on three exchanges"""
+    bases = synthetic_bases()
+    engine = ArbitrageEngine(symbols=synthetic_registry(bases))
+    engine.set_opportunity_callback(lambda opportunity: None)
+    for i, base in enumerate(bases):
+        for j, exchange in enumerate(('cex', 'gate', 'binance')):
+            # Every tenth symbol has a spread worth trading
+            engine.update_price(exchange, f'{base}USDT', 100 + (j * 0.5 if i % 10 == 0 else j * 0.001))
+
+    def op(i):
+        engine.check_opportunities()
+    return op
+
+
+async def order_submit(iterations: int, frames: Optional[List[Frame]] = None):
+    """Two-leg submission against stub venues"""
+    manager = OrderManager()
+    manager.place_order = StubVenues().place_order
+    manager.register_callback(lambda result: None)
+    opportunity = {'symbol': 'BTCUSDT', 'buy_exchange': 'binance', 'sell_exchange': 'gate',
+                   'buy_price': 60000.0, 'sell_price': 60300.0, 'executable_size': 0.01}
+
+    async def op(i):
+        await manager.submit_arbitrage_opportunity(opportunity)
+    return op
+
+
+async def end_to_end(iterations: int, frames: Optional[List[Frame]] = None):
+    """Frame -> adapter -> manager -> incremental engine -> order manager"""
+    bases = synthetic_bases()
+    symbols = synthetic_registry(bases)
+    manager = _manager(symbols)
+    engine = ArbitrageEngine(incremental=True, symbols=symbols)
+    opportunities = []
+    engine.set_opportunity_callback(opportunities.append)
+    connect_engine(manager, engine)
+    orders = OrderManager()
+    orders.place_order = StubVenues().place_order
+    orders.register_callback(lambda result: None)
+    # Gate trades a little rich on every tenth symbol
+    gate = synthetic_frames('gate', bases, iterations + 100)
+    binance = synthetic_frames('binance', bases, iterations + 100)
+    for i in range(0, len(gate), 10):
+        frame = json.loads(gate[i])
+        frame['result']['last'] = f"{float(frame['result']['last']) * 1.01:.2f}"
+        gate[i] = json.dumps(frame)
+    adapters = (manager.exchanges['binance'], manager.exchanges['gate'])
+    messages = (binance, gate)
+
+    async def op(i):
+        adapter = adapters[i & 1]
+        adapter.last_recv = (time.time(), time.monotonic())
+        await adapter.handle_message(messages[i & 1][i >> 1])
+        while opportunities:
+            await orders.submit_arbitrage_opportunity(opportunities.pop(), amount=0.01)
+    return op
+
+
+async def recorded_frames(iterations: int, frames: Optional[List[Frame]] = None):
+    """Recorded frames through their adapters, manager and engine, cycled to fill the run"""
+    manager = WebSocketManager(workers=False)
+    manager.register_handlers()
+    engine = ArbitrageEngine(incremental=True)
+    engine.set_opportunity_callback(lambda opportunity: None)
+    connect_engine(manager, engine)
+    playable = [(recv_time, manager.exchanges[exchange], message)
+                for recv_time, exchange, message in frames if exchange in manager.exchanges]
+    if not playable:
+        raise ValueError("No recorded frames for a known exchange")
+
+    async def op(i):
+        recv_time, adapter, message = playable[i % len(playable)]
+        adapter.last_recv = (recv_time, time.monotonic())
+        await adapter.handle_message(message)
+    return op
+
+
+# name -> async setup(iterations, frames) returning op(i)
+SCENARIOS = {
+    'binance.handle_message': _handle_message('binance'),
+    'gate.handle_message': _handle_message('gate'),
+    'cex.handle_message': _handle_message('cex'),
+    'manager.handle_price_update': handle_price_update,
+    'engine.check_opportunities': check_opportunities,
+    'orders.submit': order_submit,
+    'end_to_end': end_to_end
+}
+# Scenarios whose single op is a lot of work run fewer iterations
+ITERATION_SCALE = {'engine.check_opportunities': 0.05}
+# Only run when recorded frames are given
+RECORDED_SCENARIOS = {'recorded_frames': recorded_frames}
@@ -1,3 +1,5 @@
+import os
+
 CONFIG = {
     'min_profit_threshold': 0.5,
     'max_trade_size': 1000,
@@ -5,5 +7,58 @@ CONFIG = {
     'trade_cooldown': 30,
     'reconnect_delay': 5000,
     'max_reconnect_attempts': 10,
-    'order_timeout': 30
+    'max_reconnect_delay': 60000,
+    'order_timeout': 30,
+    'order_poll_interval': 0.5,
+    'concurrent_legs': False,
+    'unwind_mode': 'unwind',
+    'unwind_slippage': 0.002,
+    'heartbeat_interval': 20,
+    'pong_timeout': 10,
+    'rtt_window': 100,
+    'ingress_queue_size': 10000,
+    'binance_connections': 1,
+    'binance_streams_per_connection': 200,
+    'binance_subscribe_rate': 5,
+    'gate_subscribe_rate': 10,
+    'cex_subscribe_rate': 5,
+    'subscribe_batch_size': 100,
+    'shared_price_table': 'arbitrage_prices',
+    'shared_price_capacity': 4096,
+    'exchange_workers': False,
+    'subscriber_queue_size': 1000,
+    'recorder_dir': os.getenv('RECORD_FRAMES_DIR'),
+    'recorder_segment_seconds': 300,
+    'recorder_compresslevel': 4,
+    # Endpoints, overridable to point the adapters at local mock servers
+    'ws_urls': {
+        'cex': os.getenv('CEXIO_WS_URL', 'wss://ws.cex.io/ws/'),
+        'gate': os.getenv('GATEIO_WS_URL', 'wss://api.gateio.ws/ws/v4/'),
+        'binance': os.getenv('BINANCE_WS_URL', 'wss://stream.binance.com:9443/ws/')
+    },
+    'rest_urls': {
+        'cex': os.getenv('CEXIO_REST_URL', 'https://cex.io'),
+        'gate': os.getenv('GATEIO_REST_URL', 'https://api.gateio.ws'),
+        'binance': os.getenv('BINANCE_REST_URL', 'https://api.binance.com')
+    },
+    # Pooled REST sessions (exchanges/rest.py)
+    'rest_pool_size': 20,
+    'rest_keepalive': 60,
+    'rest_dns_ttl': 300,
+    'rest_timeout': 10,
+    'rest_warm_connections': 2,
+    'rest_keep_warm_interval': 30,
+    # Published REST limits: bucket -> (limit, period seconds); see exchanges/rate_limit.py
+    'rate_limits': {
+        'cex': {'requests': (600, 600)},
+        'gate': {'public': (200, 10), 'private': (200, 10), 'orders': (10, 1)},
+        'binance': {'weight': (6000, 60), 'orders': (100, 10)}
+    },
+    'rate_limit_headroom': 0.8,  # fraction of each limit we allow ourselves
+    'rate_limit_retries': 3,  # retries of a request rejected with 429/418
+    'rate_limit_backoff': 1.0,  # pause after a 429 without Retry-After, seconds
+    'listen_key_keepalive': 1800,  # seconds between Binance listenKey keepalives
+    'order_store_size': 10000,  # orders kept by services/order_store.py
+    'fee_cache_path': '.fee_cache.json',
+    'fee_cache_ttl': 3600
 } 
\ No newline at end of file
@@ -1,43 +1,71 @@
 import asyncio
 import json
-import hmac
-import hashlib
 import time
 import websockets
 from typing import Dict, List, Optional, Callable
 import os
 from dotenv import load_dotenv
-import aiohttp
+from config.settings import CONFIG
+from .ingress import ConflatingQueue, DISPATCH_INLINE
+from .rate_limit import binance_depth_weight, PRIORITY_URGENT, PRIORITY_ORDER, PRIORITY_SNAPSHOT
+from .rest import get_client
+from utils.event_bus import EventBus
+from utils.logger import get_logger, log_sampled
 
 load_dotenv()
 
+logger = get_logger('binance')
+
+
+def log_pong_failure(task: asyncio.Task):
+    """Done callback of a background pong wait: report errors from the 'pong' subscribers"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Error handling Binance pong: %s", task.exception())
+
+
 class BinanceWebSocket:
+    # Event type ('e') of unwrapped payloads -> event kind
+    EVENT_KINDS = {
+        '24hrTicker': 'ticker',
+        'depthUpdate': 'depth',
+        'trade': 'trade',
+        'kline': 'kline',
+        '24hrMiniTicker': 'miniTicker'
+    }
+    
     def __init__(self):
-        self.ws_url = 'wss://stream.binance.com:9443/ws/'
+        self.ws_url = CONFIG['ws_urls']['binance']
         self.api_key = os.getenv('BINANCE_API_KEY')
         self.api_secret = os.getenv('BINANCE_API_SECRET')
         self.websocket = None
         self.is_connected = False
-        self.callbacks = {}
+        self.bus = EventBus()  # event type -> subscribers
+        self.last_recv = None  # (wall clock, monotonic) receive time of the frame being handled
+        self.recorder = None   # FrameRecorder capturing raw frames, if any
+        self.ingress = ConflatingQueue(CONFIG['ingress_queue_size'])
         self.streams = []
+        self._pong_task = None  # background wait for the last ping's pong
         
     async def connect(self):
         """Establish WebSocket connection to Binance"""
         try:
             self.websocket = await websockets.connect(self.ws_url)
             self.is_connected = True
-            print("Connected to Binance WebSocket")
+            logger.info("Connected to Binance WebSocket")
             return True
         except Exception as e:
-            print(f"Failed to connect to Binance: {e}")
+            logger.error("Failed to connect to Binance: %s", e)
             return False
     
     async def disconnect(self):
         """Close WebSocket connection"""
+        if self._pong_task is not None:
+            self._pong_task.cancel()
+            self._pong_task = None
         if self.websocket:
             await self.websocket.close()
             self.is_connected = False
-            print("Disconnected from Binance WebSocket")
+            logger.info("Disconnected from Binance WebSocket")
     
     async def send_message(self, message: Dict):
         """Send message to Binance WebSocket"""
@@ -60,10 +88,13 @@ class BinanceWebSocket:
         }
         
         await self.send_message(subscribe_message)
-        print(f"Subscribed to ticker streams: {streams}")
+        logger.info("Subscribed to ticker streams: %s", streams)
     
     async def subscribe_to_orderbook(self, symbols: List[str], depth: str = "5"):
-        """Subscribe to orderbook data for specified symbols"""
+        """Subscribe to orderbook data for specified symbols
+        
+        Pass depth="" for the diff stream used to maintain a local order book.
+        """
         streams = [f"{symbol.lower()}@depth{depth}@100ms" for symbol in symbols]
         self.streams.extend(streams)
         
@@ -74,7 +105,7 @@ class BinanceWebSocket:
         }
         
         await self.send_message(subscribe_message)
-        print(f"Subscribed to orderbook streams: {streams}")
+        logger.info("Subscribed to orderbook streams: %s", streams)
     
     async def subscribe_to_trades(self, symbols: List[str]):
         """Subscribe to trade data for specified symbols"""
@@ -88,7 +119,7 @@ class BinanceWebSocket:
         }
         
         await self.send_message(subscribe_message)
-        print(f"Subscribed to trade streams: {streams}")
+        logger.info("Subscribed to trade streams: %s", streams)
     
     async def subscribe_to_kline(self, symbols: List[str], interval: str = "1m"):
         """Subscribe to kline/candlestick data for specified symbols"""
@@ -102,7 +133,7 @@ class BinanceWebSocket:
         }
         
         await self.send_message(subscribe_message)
-        print(f"Subscribed to kline streams: {streams}")
+        logger.info("Subscribed to kline streams: %s", streams)
     
     async def subscribe_to_mini_ticker(self, symbols: List[str]):
         """Subscribe to mini ticker data for specified symbols"""
@@ -116,10 +147,11 @@ class BinanceWebSocket:
         }
         
         await self.send_message(subscribe_message)
-        print(f"Subscribed to mini ticker streams: {streams}")
+        logger.info("Subscribed to mini ticker streams: %s", streams)
     
     async def subscribe_to_all_market_mini_tickers(self):
         """Subscribe to all market mini tickers"""
+        self.streams.append("!miniTicker@arr")
         subscribe_message = {
             "method": "SUBSCRIBE",
             "params": ["!miniTicker@arr"],
@@ -127,10 +159,11 @@ class BinanceWebSocket:
         }
         
         await self.send_message(subscribe_message)
-        print("Subscribed to all market mini tickers")
+        logger.info("Subscribed to all market mini tickers")
     
     async def subscribe_to_all_market_tickers(self):
         """Subscribe to all market tickers"""
+        self.streams.append("!ticker@arr")
         subscribe_message = {
             "method": "SUBSCRIBE",
             "params": ["!ticker@arr"],
@@ -138,130 +171,282 @@ class BinanceWebSocket:
         }
         
         await self.send_message(subscribe_message)
-        print("Subscribed to all market tickers")
+        logger.info("Subscribed to all market tickers")
     
-    async def ping(self):
-        """Send ping to keep connection alive"""
-        ping_message = {
-            "method": "ping",
+    async def resubscribe(self):
+        """Replay the recorded subscriptions after a reconnect"""
+        if not self.streams:
+            return
+        subscribe_message = {
+            "method": "SUBSCRIBE",
+            "params": list(dict.fromkeys(self.streams)),
             "id": int(time.time() * 1000)
         }
-        await self.send_message(ping_message)
+        await self.send_message(subscribe_message)
+        logger.info("Resubscribed to %s Binance streams", len(subscribe_message['params']))
+    
+    async def ping(self):
+        """Send a protocol-level ping frame to keep the connection alive
+        
+        Market data streams don't accept a JSON ping method, so the pong
+        frame is awaited in the background and reported to the 'pong'
+        callback like the other exchanges' pong messages.
+        """
+        if not self.is_connected:
+            raise Exception("Not connected to Binance WebSocket")
+        pong_waiter = await self.websocket.ping()
+        # A pong answers every earlier ping too, so only the latest wait is kept
+        if self._pong_task is not None:
+            self._pong_task.cancel()
+        self._pong_task = asyncio.create_task(self._await_pong(pong_waiter))
+        self._pong_task.add_done_callback(log_pong_failure)
+    
+    async def _await_pong(self, pong_waiter):
+        try:
+            await pong_waiter
+        except Exception:
+            # Connection closed before the pong arrived; the heartbeat times out
+            return
+        await self._handle_pong({'pong': True})
+    
+    async def _handle_pong(self, data: Dict):
+        """Handle pong response"""
+        await self.bus.publish('pong', data)
     
     def register_callback(self, event_type: str, callback: Callable):
-        """Register callback for specific event types"""
-        self.callbacks[event_type] = callback
+        """Register callback for specific event types; every registered callback is called"""
+        return self.bus.subscribe(event_type, callback)
     
     async def handle_message(self, message: str):
         """Handle incoming WebSocket messages"""
         try:
             data = json.loads(message)
+        except json.JSONDecodeError as e:
+            logger.error("Failed to parse Binance message: %s", e)
+            return
+        await self.dispatch(data)
+    
+    async def dispatch(self, data):
+        """Route a parsed message to its handlers and registered callbacks"""
+        try:
+            kind = None
             
             # Handle different message types
             if 'stream' in data:
                 stream = data['stream']
                 stream_data = data['data']
-                
-                if '@ticker' in stream:
-                    await self._handle_ticker(stream_data)
-                elif '@depth' in stream:
-                    await self._handle_orderbook(stream_data)
-                elif '@trade' in stream:
-                    await self._handle_trade(stream_data)
-                elif '@kline_' in stream:
-                    await self._handle_kline(stream_data)
-                elif '@miniTicker' in stream:
-                    await self._handle_mini_ticker(stream_data)
-                else:
-                    print(f"Unknown stream: {stream}")
+                kind = self._stream_kind(stream)
+                if kind == 'depth' and 's' not in stream_data:
+                    # Partial depth payloads don't carry the symbol
+                    stream_data['s'] = stream.split('@', 1)[0].upper()
+                elif kind is None:
+                    logger.warning("Unknown stream: %s", stream)
             
             # Handle array responses (all market data)
             elif isinstance(data, list):
                 if len(data) > 0 and 's' in data[0]:
-                    if 'P' in data[0]:  # Mini ticker
-                        await self._handle_all_mini_tickers(data)
-                    else:  # Full ticker
-                        await self._handle_all_tickers(data)
+                    stream_data = data
+                    # Full tickers are 24hrTicker events; mini tickers lack bid/ask and change %
+                    kind = 'miniTickerArray' if data[0].get('e') == '24hrMiniTicker' else 'tickerArray'
+            
+            # Raw /ws/ connections deliver events without the stream envelope
+            elif 'e' in data:
+                stream_data = data
+                kind = self.EVENT_KINDS.get(data['e'])
             
             # Handle ping/pong responses
             elif 'pong' in data:
-                print("Received pong from Binance")
+                await self._handle_pong(data)
             
             # Handle subscription responses
             elif 'result' in data:
-                print(f"Subscription result: {data}")
+                logger.debug("Subscription result: %s", data)
+            
+            if kind == 'ticker':
+                await self._handle_ticker(stream_data)
+            elif kind == 'depth':
+                await self._handle_orderbook(stream_data)
+            elif kind == 'trade':
+                await self._handle_trade(stream_data)
+            elif kind == 'kline':
+                await self._handle_kline(stream_data)
+            elif kind == 'miniTicker':
+                await self._handle_mini_ticker(stream_data)
+            elif kind == 'tickerArray':
+                await self._handle_all_tickers(stream_data)
+            elif kind == 'miniTickerArray':
+                await self._handle_all_mini_tickers(stream_data)
             
             # Call registered callback if exists
-            if 'stream' in data and data['stream'] in self.callbacks:
-                await self.callbacks[data['stream']](data)
+            if kind is not None:
+                await self.bus.publish(kind, stream_data)
+            if 'stream' in data:
+                await self.bus.publish(data['stream'], data)
                 
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse Binance message: {e}")
         except Exception as e:
-            print(f"Error handling Binance message: {e}")
+            logger.error("Error handling Binance message: %s", e)
+    
+    @staticmethod
+    def _stream_kind(stream: str) -> Optional[str]:
+        """Map a stream name (btcusdt@depth5@100ms) to its event kind"""
+        if stream == '!ticker@arr':
+            return 'tickerArray'
+        elif stream == '!miniTicker@arr':
+            return 'miniTickerArray'
+        elif '@ticker' in stream:
+            return 'ticker'
+        elif '@depth' in stream:
+            return 'depth'
+        elif '@trade' in stream:
+            return 'trade'
+        elif '@kline_' in stream:
+            return 'kline'
+        elif '@miniTicker' in stream:
+            return 'miniTicker'
+        return None
     
     async def _handle_ticker(self, data: Dict):
         """Handle ticker data"""
-        print(f"Binance Ticker: {data}")
+        log_sampled(logger, 'ticker', "Binance Ticker: %s", data)
     
     async def _handle_orderbook(self, data: Dict):
         """Handle orderbook data"""
-        print(f"Binance Orderbook: {data}")
+        log_sampled(logger, 'orderbook', "Binance Orderbook: %s", data)
     
     async def _handle_trade(self, data: Dict):
         """Handle trade data"""
-        print(f"Binance Trade: {data}")
+        log_sampled(logger, 'trade', "Binance Trade: %s", data)
     
     async def _handle_kline(self, data: Dict):
         """Handle kline/candlestick data"""
-        print(f"Binance Kline: {data}")
+        log_sampled(logger, 'kline', "Binance Kline: %s", data)
     
     async def _handle_mini_ticker(self, data: Dict):
         """Handle mini ticker data"""
-        print(f"Binance Mini Ticker: {data}")
+        log_sampled(logger, 'ticker', "Binance Mini Ticker: %s", data)
     
     async def _handle_all_mini_tickers(self, data: List):
         """Handle all market mini tickers"""
-        print(f"Binance All Mini Tickers: {len(data)} symbols")
+        log_sampled(logger, 'ticker', "Binance All Mini Tickers: %s symbols", len(data))
     
     async def _handle_all_tickers(self, data: List):
         """Handle all market tickers"""
-        print(f"Binance All Tickers: {len(data)} symbols")
+        log_sampled(logger, 'ticker', "Binance All Tickers: %s symbols", len(data))
     
     async def listen(self):
-        """Main listening loop"""
+        """Main listening loop
+        
+        Frames are parsed here and handed to a conflating ingress queue that
+        a separate task drains, so slow callbacks never delay recv().
+        """
         if not self.is_connected:
             await self.connect()
         
+        consumer = asyncio.create_task(self._drain_ingress())
         try:
             while self.is_connected:
                 message = await self.websocket.recv()
-                await self.handle_message(message)
+                received = (time.time(), time.monotonic())
+                if self.recorder is not None:
+                    self.recorder.record('binance', received[0], message)
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError as e:
+                    logger.error("Failed to parse Binance message: %s", e)
+                    continue
+                key = self._ingress_key(data)
+                if key is DISPATCH_INLINE:
+                    self.last_recv = received
+                    await self.dispatch(data)
+                else:
+                    self.ingress.put(key, (data, received))
         except websockets.exceptions.ConnectionClosed:
-            print("Binance WebSocket connection closed")
+            logger.warning("Binance WebSocket connection closed")
             self.is_connected = False
         except Exception as e:
-            print(f"Error in Binance listen loop: {e}")
+            logger.error("Error in Binance listen loop: %s", e)
             self.is_connected = False
+        finally:
+            consumer.cancel()
+            # Frames queued from a dead connection are stale
+            self.ingress.clear()
+    
+    async def _drain_ingress(self):
+        """Process queued frames in order"""
+        while True:
+            data, received = await self.ingress.get()
+            self.last_recv = received
+            await self.dispatch(data)
+    
+    def _ingress_key(self, data):
+        """Conflation key for the ingress queue
+        
+        Tickers and partial depth snapshots are superseded by the next frame
+        for the same stream; diff depth and trades must all be processed.
+        """
+        if isinstance(data, list):
+            # All-market arrays only carry the symbols that changed
+            return None
+        if 'stream' in data:
+            stream = data['stream']
+            if '@depth' in stream:
+                # Diff streams (@depth@100ms) carry first/last update ids
+                return None if 'U' in data['data'] else stream
+            if '@trade' in stream or '@arr' in stream:
+                return None
+            return stream
+        event_type = data.get('e')
+        if event_type in ('24hrTicker', '24hrMiniTicker'):
+            return (event_type, data.get('s'))
+        if event_type is None:
+            # Subscription results and other control frames
+            return DISPATCH_INLINE
+        return None
 
 async def get_fees():
     """Fetch spot trading fees from Binance REST API (requires API key/secret in env)."""
-    api_key = os.getenv('BINANCE_API_KEY')
-    api_secret = os.getenv('BINANCE_API_SECRET')
-    if not api_key or not api_secret:
+    client = get_client('binance')
+    if client.auth is None:
         return {'error': 'Missing Binance API key or secret'}
-    url = 'https://api.binance.com/sapi/v1/asset/tradeFee'
-    timestamp = int(time.time() * 1000)
-    query = f'timestamp={timestamp}'
-    signature = hmac.new(api_secret.encode(), query.encode(), hashlib.sha256).hexdigest()
-    full_url = f'{url}?{query}&signature={signature}'
-    headers = {'X-MBX-APIKEY': api_key}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(full_url, headers=headers) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            else:
-                return {'error': f'HTTP {resp.status}'}
+    status, data = await client.get('/sapi/v1/asset/tradeFee', signed=True)
+    return data if status == 200 else {'error': f'HTTP {status}'}
+
+async def get_orderbook_snapshot(symbol: str, limit: int = 1000):
+    """Fetch an order book snapshot from Binance REST API for local book resyncs."""
+    status, data = await get_client('binance').get('/api/v3/depth', {'symbol': symbol.upper(), 'limit': limit},
+                                                   cost={'weight': binance_depth_weight(limit)},
+                                                   priority=PRIORITY_SNAPSHOT)
+    if status == 200:
+        return {'bids': data['bids'], 'asks': data['asks'], 'update_id': data['lastUpdateId']}
+    return {'error': f'HTTP {status}'}
+
+async def get_symbols():
+    """Fetch the (base, quote) assets of every trading Binance spot market."""
+    status, data = await get_client('binance').get('/api/v3/exchangeInfo', cost={'weight': 20})
+    if status == 200:
+        return [(s['baseAsset'], s['quoteAsset']) for s in data['symbols'] if s.get('status') == 'TRADING']
+    return {'error': f'HTTP {status}'}
+
+async def create_order(symbol: str, side: str, amount: float, price: float, time_in_force: str = 'IOC',
+                       priority: int = PRIORITY_ORDER):
+    """Place a limit order; arbitrage legs default to immediate-or-cancel. Unwinds pass PRIORITY_URGENT."""
+    params = {'symbol': symbol.upper(), 'side': side.upper(), 'type': 'LIMIT', 'timeInForce': time_in_force,
+              'quantity': f'{amount:.8f}', 'price': f'{price:.8f}', 'newOrderRespType': 'RESULT'}
+    status, data = await get_client('binance').post('/api/v3/order', params, signed=True,
+                                                    cost={'weight': 1, 'orders': 1}, priority=priority)
+    return data if status == 200 else {'error': f'HTTP {status}', 'details': data}
+
+async def get_order_status(symbol: str, order_id):
+    """Fetch one order's state from Binance REST API."""
+    status, data = await get_client('binance').get('/api/v3/order', {'symbol': symbol.upper(), 'orderId': order_id},
+                                                   signed=True, cost={'weight': 4}, priority=PRIORITY_ORDER)
+    return data if status == 200 else {'error': f'HTTP {status}', 'details': data}
+
+async def cancel_order(symbol: str, order_id):
+    """Cancel an open order; goes ahead of every other queued request."""
+    status, data = await get_client('binance').delete('/api/v3/order', {'symbol': symbol.upper(), 'orderId': order_id},
+                                                      signed=True, priority=PRIORITY_URGENT)
+    return data if status == 200 else {'error': f'HTTP {status}', 'details': data}
 
 # Example usage
 async def main():
@@ -0,0 +1,287 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Callable
+from config.settings import CONFIG
+from .binance import BinanceWebSocket, log_pong_failure
+from .subscriptions import Pacer
+from utils.event_bus import EventBus
+from utils.logger import get_logger
+
+logger = get_logger('binance')
+
+# Rough messages/second per stream kind, used to balance shards
+STREAM_LOAD = {
+    'depth': 10.0,
+    'trade': 5.0,
+    'ticker': 1.0,
+    'miniTicker': 1.0,
+    'kline': 0.5
+}
+ARRAY_STREAM_LOAD = 20.0  # !ticker@arr frames carry every changed symbol
+
+
+def stream_load(stream: str) -> float:
+    if stream.endswith('@arr'):
+        return ARRAY_STREAM_LOAD
+    return STREAM_LOAD.get(BinanceWebSocket._stream_kind(stream), 1.0)
+
+
+class BinanceShard(BinanceWebSocket):
+    """One combined-stream (/stream?streams=) connection owned by a BinanceStreamPool
+
+    Outgoing messages are paced to CONFIG['binance_subscribe_rate'] per
+    second, Binance's limit on incoming messages per connection.
+    """
+
+    def __init__(self, pool, index: int):
+        self.pool = pool
+        self.index = index
+        self.load = 0.0
+        self.pacer = Pacer(CONFIG['binance_subscribe_rate'])
+        super().__init__()
+        self.base_url = self.ws_url.replace('/ws/', '/stream')
+        self.ws_url = self.base_url
+
+    @property
+    def last_recv(self):
+        return self._last_recv
+
+    @last_recv.setter
+    def last_recv(self, received):
+        # The pool exposes the receive time of whichever shard is dispatching
+        self._last_recv = received
+        self.pool.last_recv = received
+
+    async def connect(self):
+        """Connect with every assigned stream in the URL, so no resubscribe is needed"""
+        streams = list(dict.fromkeys(self.streams))
+        self.ws_url = f"{self.base_url}?streams={'/'.join(streams)}" if streams else self.base_url
+        return await super().connect()
+
+    async def resubscribe(self):
+        # Streams are part of the connection URL
+        return
+
+    async def send_message(self, message: Dict):
+        await self.pacer.wait()
+        await super().send_message(message)
+
+
+class PoolIngress:
+    """Aggregated ingress counters of all shards"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def stats(self) -> Dict:
+        totals = {'depth': 0, 'high_water': 0, 'enqueued': 0, 'conflated': 0, 'dropped': 0}
+        for shard in self.pool.shards:
+            for key, value in shard.ingress.stats().items():
+                totals[key] = max(totals[key], value) if key == 'high_water' else totals[key] + value
+        totals['connections'] = len(self.pool.shards)
+        return totals
+
+
+class BinanceStreamPool:
+    """Binance market data over several combined-stream connections
+
+    Streams are spread over CONFIG['binance_connections'] shards by expected
+    message load, with at most CONFIG['binance_streams_per_connection']
+    streams each; more shards are opened when all are full. Every shard
+    parses with the BinanceWebSocket code and reports to the same callbacks,
+    so the pool is a drop-in replacement for a single BinanceWebSocket.
+    """
+
+    # set_pairs() kind -> stream name suffix
+    KIND_SUFFIXES = {'ticker': '@ticker', 'orderbook': '@depth@100ms', 'trades': '@trade'}
+
+    def __init__(self, connections: Optional[int] = None, max_streams: Optional[int] = None):
+        self.connections = connections or CONFIG['binance_connections']
+        self.max_streams = max_streams or CONFIG['binance_streams_per_connection']
+        self.bus = EventBus()        # the pool's own 'pong'
+        self.shard_bus = EventBus()  # shared by all shards
+        self.last_recv = None
+        self._recorder = None
+        self.shards = []
+        self.assignments = {}  # {stream: shard}
+        self.ingress = PoolIngress(self)
+        self._shards_changed = asyncio.Event()
+        self._pong_task = None  # background wait for the last ping's pongs
+        for _ in range(self.connections):
+            self._add_shard()
+
+    @property
+    def is_connected(self) -> bool:
+        return bool(self.shards) and all(shard.is_connected for shard in self.shards)
+
+    @property
+    def streams(self) -> List[str]:
+        return list(self.assignments)
+
+    @property
+    def recorder(self):
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, recorder):
+        # Every shard records under 'binance'; replay feeds them back through the pool
+        self._recorder = recorder
+        for shard in self.shards:
+            shard.recorder = recorder
+
+    def _add_shard(self) -> BinanceShard:
+        shard = BinanceShard(self, len(self.shards))
+        shard.bus = self.shard_bus
+        shard.recorder = self._recorder
+        self.shards.append(shard)
+        self._shards_changed.set()
+        return shard
+
+    def _assign(self, stream: str) -> BinanceShard:
+        """Place a stream on the least loaded shard that has room"""
+        candidates = [shard for shard in self.shards if len(shard.streams) < self.max_streams]
+        shard = min(candidates, key=lambda s: s.load) if candidates else self._add_shard()
+        shard.streams.append(stream)
+        shard.load += stream_load(stream)
+        self.assignments[stream] = shard
+        return shard
+
+    async def connect(self):
+        """Connect every shard that isn't connected yet"""
+        results = await asyncio.gather(*(shard.connect() for shard in self.shards if not shard.is_connected))
+        return all(results)
+
+    async def disconnect(self):
+        if self._pong_task is not None:
+            self._pong_task.cancel()
+            self._pong_task = None
+        await asyncio.gather(*(shard.disconnect() for shard in self.shards))
+
+    async def resubscribe(self):
+        # Reconnected shards carry their streams in the URL
+        return
+
+    def register_callback(self, event_type: str, callback: Callable):
+        """Register callback for specific event types; every registered callback is called"""
+        # Shards' own pongs are ignored; the pool reports one when all have answered
+        bus = self.bus if event_type == 'pong' else self.shard_bus
+        return bus.subscribe(event_type, callback)
+
+    async def subscribe(self, streams: List[str]):
+        """Assign new streams to shards and subscribe the connected ones"""
+        by_shard = {}
+        for stream in streams:
+            if stream not in self.assignments:
+                shard = self._assign(stream)
+                by_shard.setdefault(shard.index, []).append(stream)
+        for index, shard_streams in by_shard.items():
+            shard = self.shards[index]
+            if not shard.is_connected:
+                # Picked up by connect() or, for an overflow shard opened
+                # while listening, by its reader, with the streams in the URL
+                continue
+            await shard.send_message({
+                "method": "SUBSCRIBE",
+                "params": shard_streams,
+                "id": int(time.time() * 1000)
+            })
+        if by_shard:
+            logger.info("Subscribed to %s Binance streams on %s connections",
+                        sum(len(s) for s in by_shard.values()), len(by_shard))
+
+    async def unsubscribe(self, streams: List[str]):
+        """Drop streams from their shards"""
+        by_shard = {}
+        for stream in streams:
+            shard = self.assignments.pop(stream, None)
+            if shard is None:
+                continue
+            shard.streams.remove(stream)
+            shard.load -= stream_load(stream)
+            by_shard.setdefault(shard.index, []).append(stream)
+        for index, shard_streams in by_shard.items():
+            shard = self.shards[index]
+            if shard.is_connected:
+                await shard.send_message({
+                    "method": "UNSUBSCRIBE",
+                    "params": shard_streams,
+                    "id": int(time.time() * 1000)
+                })
+
+    async def set_pairs(self, kind: str, symbols: List[str]):
+        """Change the symbols of a 'ticker', 'orderbook' or 'trades' subscription in place"""
+        suffix = self.KIND_SUFFIXES[kind]
+        wanted = [f"{symbol.lower()}{suffix}" for symbol in symbols]
+        wanted_set = set(wanted)
+        await self.unsubscribe([s for s in self.assignments if s.endswith(suffix) and s not in wanted_set])
+        await self.subscribe(wanted)
+
+    async def subscribe_to_ticker(self, symbols: List[str]):
+        await self.subscribe([f"{symbol.lower()}@ticker" for symbol in symbols])
+
+    async def subscribe_to_orderbook(self, symbols: List[str], depth: str = "5"):
+        await self.subscribe([f"{symbol.lower()}@depth{depth}@100ms" for symbol in symbols])
+
+    async def subscribe_to_trades(self, symbols: List[str]):
+        await self.subscribe([f"{symbol.lower()}@trade" for symbol in symbols])
+
+    async def subscribe_to_kline(self, symbols: List[str], interval: str = "1m"):
+        await self.subscribe([f"{symbol.lower()}@kline_{interval}" for symbol in symbols])
+
+    async def subscribe_to_mini_ticker(self, symbols: List[str]):
+        await self.subscribe([f"{symbol.lower()}@miniTicker" for symbol in symbols])
+
+    async def subscribe_to_all_market_mini_tickers(self):
+        await self.subscribe(["!miniTicker@arr"])
+
+    async def subscribe_to_all_market_tickers(self):
+        await self.subscribe(["!ticker@arr"])
+
+    async def ping(self):
+        """Ping every shard and report one pong once all have answered"""
+        if not self.is_connected:
+            raise Exception("Not connected to Binance WebSocket")
+        waiters = [await shard.websocket.ping() for shard in self.shards]
+        if self._pong_task is not None:
+            self._pong_task.cancel()
+        self._pong_task = asyncio.create_task(self._await_pongs(waiters))
+        self._pong_task.add_done_callback(log_pong_failure)
+
+    async def _await_pongs(self, waiters):
+        try:
+            await asyncio.gather(*waiters)
+        except Exception:
+            # A shard closed before answering; the heartbeat times out
+            return
+        await self.bus.publish('pong', {'pong': True})
+
+    async def handle_message(self, message: str):
+        """Handle a combined-stream message as if it arrived on the first shard"""
+        await self.shards[0].handle_message(message)
+
+    async def dispatch(self, data):
+        await self.shards[0].dispatch(data)
+
+    async def listen(self):
+        """Run every shard's reader, returning as soon as any shard drops
+
+        The supervisor then marks the gap and reconnects the dropped shards;
+        the others keep their connections.
+        """
+        if not self.is_connected:
+            await self.connect()
+        tasks = {}
+        try:
+            while True:
+                for shard in self.shards:
+                    if shard.index not in tasks:
+                        tasks[shard.index] = asyncio.create_task(shard.listen())
+                self._shards_changed.clear()
+                changed = asyncio.create_task(self._shards_changed.wait())
+                done, _ = await asyncio.wait([changed, *tasks.values()], return_when=asyncio.FIRST_COMPLETED)
+                changed.cancel()
+                if any(task in done for task in tasks.values()):
+                    return
+        finally:
+            for task in tasks.values():
+                task.cancel()
@@ -6,31 +6,47 @@ import hmac
 import hashlib
 import time
 import websockets
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
 import os
 from dotenv import load_dotenv
-import aiohttp
+from config.settings import CONFIG
+from .ingress import ConflatingQueue, DISPATCH_INLINE
+from .subscriptions import SubscriptionManager, chunks
+from .rate_limit import PRIORITY_URGENT, PRIORITY_ORDER, PRIORITY_SNAPSHOT
+from .rest import get_client
+from utils.event_bus import EventBus
+from utils.logger import get_logger, log_sampled
 
 load_dotenv()
 
+logger = get_logger('cex')
+
 class CEXIOWebSocket:
+    # set_pairs() kind -> room prefix
+    KIND_CHANNELS = {'ticker': 'tickers', 'orderbook': 'order_book', 'trades': 'trades'}
+    
     def __init__(self):
-        self.ws_url = 'wss://ws.cex.io/ws/'
+        self.ws_url = CONFIG['ws_urls']['cex']
         self.api_key = os.getenv('CEXIO_API_KEY')
         self.api_secret = os.getenv('CEXIO_API_SECRET')
         self.websocket = None
         self.is_connected = False
-        self.callbacks = {}
+        self.bus = EventBus()  # event type -> subscribers
+        self.last_recv = None  # (wall clock, monotonic) receive time of the frame being handled
+        self.recorder = None   # FrameRecorder capturing raw frames, if any
+        self.ingress = ConflatingQueue(CONFIG['ingress_queue_size'])
+        # Active rooms, replayed on reconnect
+        self.subscriptions = SubscriptionManager(self, CONFIG['cex_subscribe_rate'], CONFIG['subscribe_batch_size'])
         
     async def connect(self):
         """Establish WebSocket connection to CEX.IO"""
         try:
             self.websocket = await websockets.connect(self.ws_url)
             self.is_connected = True
-            print("Connected to CEX.IO WebSocket")
+            logger.info("Connected to CEX.IO WebSocket")
             return True
         except Exception as e:
-            print(f"Failed to connect to CEX.IO: {e}")
+            logger.error("Failed to connect to CEX.IO: %s", e)
             return False
     
     async def disconnect(self):
@@ -38,7 +54,7 @@ class CEXIOWebSocket:
         if self.websocket:
             await self.websocket.close()
             self.is_connected = False
-            print("Disconnected from CEX.IO WebSocket")
+            logger.info("Disconnected from CEX.IO WebSocket")
     
     async def send_message(self, message: Dict):
         """Send message to CEX.IO WebSocket"""
@@ -50,7 +66,7 @@ class CEXIOWebSocket:
     async def authenticate(self):
         """Authenticate with CEX.IO using API credentials"""
         if not self.api_key or not self.api_secret:
-            print("Warning: CEX.IO API credentials not found")
+            logger.warning("CEX.IO API credentials not found")
             return False
         
         timestamp = int(time.time())
@@ -70,38 +86,39 @@ class CEXIOWebSocket:
         }
         
         await self.send_message(auth_message)
-        print("Authentication sent to CEX.IO")
+        logger.info("Authentication sent to CEX.IO")
         return True
     
+    def build_subscription_messages(self, event: str, channel: str, pairs: List[str], params: Tuple,
+                                    batch_size: int) -> List[Dict]:
+        """Subscribe/unsubscribe messages carrying a batch of rooms each"""
+        rooms = [f"{channel}:{pair}" for pair in pairs]
+        return [{"e": event, "rooms": batch} for batch in chunks(rooms, batch_size)]
+    
     async def subscribe_to_ticker(self, pairs: List[str]):
         """Subscribe to ticker data for specified pairs"""
-        for pair in pairs:
-            subscribe_message = {
-                "e": "subscribe",
-                "rooms": [f"tickers:{pair}"]
-            }
-            await self.send_message(subscribe_message)
-            print(f"Subscribed to {pair} ticker on CEX.IO")
+        new = await self.subscriptions.subscribe("tickers", pairs)
+        logger.info("Subscribed to %s tickers on CEX.IO", len(new))
     
     async def subscribe_to_orderbook(self, pairs: List[str]):
         """Subscribe to orderbook data for specified pairs"""
-        for pair in pairs:
-            subscribe_message = {
-                "e": "subscribe",
-                "rooms": [f"order_book:{pair}"]
-            }
-            await self.send_message(subscribe_message)
-            print(f"Subscribed to {pair} orderbook on CEX.IO")
+        new = await self.subscriptions.subscribe("order_book", pairs)
+        logger.info("Subscribed to %s orderbooks on CEX.IO", len(new))
     
     async def subscribe_to_trades(self, pairs: List[str]):
         """Subscribe to trade data for specified pairs"""
-        for pair in pairs:
-            subscribe_message = {
-                "e": "subscribe",
-                "rooms": [f"trades:{pair}"]
-            }
-            await self.send_message(subscribe_message)
-            print(f"Subscribed to {pair} trades on CEX.IO")
+        new = await self.subscriptions.subscribe("trades", pairs)
+        logger.info("Subscribed to %s trade streams on CEX.IO", len(new))
+    
+    async def set_pairs(self, kind: str, pairs: List[str]):
+        """Change the pairs of a 'ticker', 'orderbook' or 'trades' subscription in place"""
+        added, removed = await self.subscriptions.set(self.KIND_CHANNELS[kind], pairs)
+        logger.info("CEX.IO %s subscriptions: +%s -%s", kind, len(added), len(removed))
+    
+    async def resubscribe(self):
+        """Replay the recorded subscriptions after a reconnect"""
+        count = await self.subscriptions.replay()
+        logger.info("Resubscribed to %s CEX.IO rooms", count)
     
     async def ping(self):
         """Send ping to keep connection alive"""
@@ -109,13 +126,21 @@ class CEXIOWebSocket:
         await self.send_message(ping_message)
     
     def register_callback(self, event_type: str, callback: Callable):
-        """Register callback for specific event types"""
-        self.callbacks[event_type] = callback
+        """Register callback for specific event types; every registered callback is called"""
+        return self.bus.subscribe(event_type, callback)
     
     async def handle_message(self, message: str):
         """Handle incoming WebSocket messages"""
         try:
             data = json.loads(message)
+        except json.JSONDecodeError as e:
+            logger.error("Failed to parse CEX.IO message: %s", e)
+            return
+        await self.dispatch(data)
+    
+    async def dispatch(self, data):
+        """Route a parsed message to its handlers and registered callbacks"""
+        try:
             
             # Handle different message types
             if 'e' in data:
@@ -123,60 +148,109 @@ class CEXIOWebSocket:
                 
                 if event_type == 'tick':
                     await self._handle_tick(data)
-                elif event_type == 'order_book':
+                elif event_type in ('order_book', 'order-book-subscribe', 'md_update'):
                     await self._handle_orderbook(data)
                 elif event_type == 'trade':
                     await self._handle_trade(data)
                 elif event_type == 'auth':
                     await self._handle_auth(data)
                 elif event_type == 'pong':
-                    print("Received pong from CEX.IO")
+                    # Reported through the 'pong' callback below
+                    pass
+                elif event_type == 'ping':
+                    # Server-initiated keepalive must be answered
+                    await self.send_message({"e": "pong"})
+                elif event_type in ('connected', 'disconnecting'):
+                    logger.info("CEX.IO connection event: %s", event_type)
                 else:
-                    print(f"Unknown event type: {event_type}")
+                    logger.warning("Unknown event type: %s", event_type)
             
             # Call registered callback if exists
-            if event_type in self.callbacks:
-                await self.callbacks[event_type](data)
+            await self.bus.publish(event_type, data)
                 
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse CEX.IO message: {e}")
         except Exception as e:
-            print(f"Error handling CEX.IO message: {e}")
+            logger.error("Error handling CEX.IO message: %s", e)
     
     async def _handle_tick(self, data: Dict):
         """Handle ticker data"""
-        print(f"CEX.IO Ticker: {data}")
+        log_sampled(logger, 'ticker', "CEX.IO Ticker: %s", data)
     
     async def _handle_orderbook(self, data: Dict):
         """Handle orderbook data"""
-        print(f"CEX.IO Orderbook: {data}")
+        log_sampled(logger, 'orderbook', "CEX.IO Orderbook: %s", data)
     
     async def _handle_trade(self, data: Dict):
         """Handle trade data"""
-        print(f"CEX.IO Trade: {data}")
+        log_sampled(logger, 'trade', "CEX.IO Trade: %s", data)
     
     async def _handle_auth(self, data: Dict):
         """Handle authentication response"""
         if data.get('ok') == 'ok':
-            print("CEX.IO authentication successful")
+            logger.info("CEX.IO authentication successful")
         else:
-            print(f"CEX.IO authentication failed: {data}")
+            logger.error("CEX.IO authentication failed: %s", data)
     
     async def listen(self):
-        """Main listening loop"""
+        """Main listening loop
+        
+        Frames are parsed here and handed to a conflating ingress queue that
+        a separate task drains, so slow callbacks never delay recv().
+        """
         if not self.is_connected:
             await self.connect()
         
+        consumer = asyncio.create_task(self._drain_ingress())
         try:
             while self.is_connected:
                 message = await self.websocket.recv()
-                await self.handle_message(message)
+                received = (time.time(), time.monotonic())
+                if self.recorder is not None:
+                    self.recorder.record('cex', received[0], message)
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError as e:
+                    logger.error("Failed to parse CEX.IO message: %s", e)
+                    continue
+                key = self._ingress_key(data)
+                if key is DISPATCH_INLINE:
+                    self.last_recv = received
+                    await self.dispatch(data)
+                else:
+                    self.ingress.put(key, (data, received))
         except websockets.exceptions.ConnectionClosed:
-            print("CEX.IO WebSocket connection closed")
+            logger.warning("CEX.IO WebSocket connection closed")
             self.is_connected = False
         except Exception as e:
-            print(f"Error in CEX.IO listen loop: {e}")
+            logger.error("Error in CEX.IO listen loop: %s", e)
             self.is_connected = False
+        finally:
+            consumer.cancel()
+            # Frames queued from a dead connection are stale
+            self.ingress.clear()
+    
+    async def _drain_ingress(self):
+        """Process queued frames in order"""
+        while True:
+            data, received = await self.ingress.get()
+            self.last_recv = received
+            await self.dispatch(data)
+    
+    def _ingress_key(self, data):
+        """Conflation key for the ingress queue
+        
+        Ticks and order book snapshots are superseded by the next frame for
+        the same pair; md_update diffs and trades must all be processed.
+        """
+        if not isinstance(data, dict):
+            return None
+        event_type = data.get('e')
+        if event_type in ('ping', 'pong', 'auth', 'connected', 'disconnecting'):
+            return DISPATCH_INLINE
+        payload = data.get('data')
+        pair = payload.get('pair') if isinstance(payload, dict) else None
+        if event_type in ('tick', 'order_book', 'order-book-subscribe') and pair is not None:
+            return (event_type, pair)
+        return None
 
 # Example usage
 async def main():
@@ -188,18 +262,50 @@ async def main():
 
 async def get_fees():
     """Fetch spot trading fees from CEX.IO REST API (requires API key/secret in env)."""
-    api_key = os.getenv('CEXIO_API_KEY')
-    api_secret = os.getenv('CEXIO_API_SECRET')
-    if not api_key or not api_secret:
+    client = get_client('cex')
+    if client.auth is None:
         return {'error': 'Missing CEX.IO API key or secret'}
-    url = 'https://cex.io/api/fees'
-    headers = {'Content-Type': 'application/json'}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            else:
-                return {'error': f'HTTP {resp.status}'}
+    status, data = await client.get('/api/fees', signed=True)
+    return data if status == 200 else {'error': f'HTTP {status}'}
+
+async def get_orderbook_snapshot(pair: str, depth: int = 100):
+    """Fetch an order book snapshot from CEX.IO REST API for local book resyncs."""
+    base, quote = pair.split(':')
+    status, data = await get_client('cex').get(f'/api/order_book/{base}/{quote}/', {'depth': depth},
+                                               priority=PRIORITY_SNAPSHOT)
+    if status == 200:
+        return {'bids': data['bids'], 'asks': data['asks'], 'update_id': data.get('id')}
+    return {'error': f'HTTP {status}'}
+
+async def get_symbols():
+    """Fetch the (base, quote) currencies of every CEX.IO pair."""
+    status, data = await get_client('cex').get('/api/currency_limits')
+    if status == 200:
+        return [(p['symbol1'], p['symbol2']) for p in data['data']['pairs']]
+    return {'error': f'HTTP {status}'}
+
+async def create_order(pair: str, side: str, amount: float, price: float, priority: int = PRIORITY_ORDER):
+    """Place a limit order on CEX.IO. Unwinds pass PRIORITY_URGENT."""
+    base, quote = pair.split(':')
+    body = {'type': side, 'amount': f'{amount:.8f}', 'price': f'{price:.8f}'}
+    status, data = await get_client('cex').post(f'/api/place_order/{base}/{quote}', body=body, signed=True,
+                                                priority=priority)
+    # CEX.IO reports rejected orders as {'error': ...} with HTTP 200
+    if status == 200 and isinstance(data, dict) and 'error' not in data:
+        return data
+    return {'error': f'HTTP {status}', 'details': data}
+
+async def get_order_status(order_id):
+    """Fetch one order's state from CEX.IO REST API."""
+    status, data = await get_client('cex').post('/api/get_order/', body={'id': str(order_id)}, signed=True,
+                                                priority=PRIORITY_ORDER)
+    return data if status == 200 else {'error': f'HTTP {status}', 'details': data}
+
+async def cancel_order(order_id):
+    """Cancel an open order; goes ahead of every other queued request."""
+    status, data = await get_client('cex').post('/api/cancel_order/', body={'id': str(order_id)}, signed=True,
+                                                priority=PRIORITY_URGENT)
+    return data if status == 200 else {'error': f'HTTP {status}', 'details': data}
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
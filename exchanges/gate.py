@@ -4,32 +4,54 @@ import hmac
 import hashlib
 import time
 import websockets
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
 import os
 from dotenv import load_dotenv
-import aiohttp
+from config.settings import CONFIG
+from .ingress import ConflatingQueue, DISPATCH_INLINE
+from .subscriptions import SubscriptionManager, chunks
+from .rate_limit import PRIORITY_URGENT, PRIORITY_ORDER, PRIORITY_SNAPSHOT
+from .rest import get_client
+from utils.event_bus import EventBus
+from utils.logger import get_logger, log_sampled
 
 load_dotenv()
 
+logger = get_logger('gate')
+
 class GateIOWebSocket:
+    # Channels whose payload is just a list of pairs
+    BATCHED_CHANNELS = ('spot.tickers', 'spot.trades')
+    # set_pairs() kind -> (channel, params)
+    KIND_CHANNELS = {
+        'ticker': ('spot.tickers', ()),
+        'orderbook': ('spot.order_book_update', ('100ms',)),
+        'trades': ('spot.trades', ())
+    }
+    
     def __init__(self):
-        self.ws_url = 'wss://api.gateio.ws/ws/v4/'
+        self.ws_url = CONFIG['ws_urls']['gate']
         self.api_key = os.getenv('GATEIO_API_KEY')
         self.api_secret = os.getenv('GATEIO_API_SECRET')
         self.websocket = None
         self.is_connected = False
-        self.callbacks = {}
+        self.bus = EventBus()  # event type -> subscribers
+        self.last_recv = None  # (wall clock, monotonic) receive time of the frame being handled
+        self.recorder = None   # FrameRecorder capturing raw frames, if any
+        self.ingress = ConflatingQueue(CONFIG['ingress_queue_size'])
         self.channel_id = 0
+        # Active subscriptions, replayed on reconnect
+        self.subscriptions = SubscriptionManager(self, CONFIG['gate_subscribe_rate'], CONFIG['subscribe_batch_size'])
         
     async def connect(self):
         """Establish WebSocket connection to Gate.io"""
         try:
             self.websocket = await websockets.connect(self.ws_url)
             self.is_connected = True
-            print("Connected to Gate.io WebSocket")
+            logger.info("Connected to Gate.io WebSocket")
             return True
         except Exception as e:
-            print(f"Failed to connect to Gate.io: {e}")
+            logger.error("Failed to connect to Gate.io: %s", e)
             return False
     
     async def disconnect(self):
@@ -37,7 +59,7 @@ class GateIOWebSocket:
         if self.websocket:
             await self.websocket.close()
             self.is_connected = False
-            print("Disconnected from Gate.io WebSocket")
+            logger.info("Disconnected from Gate.io WebSocket")
     
     async def send_message(self, message: Dict):
         """Send message to Gate.io WebSocket"""
@@ -54,7 +76,7 @@ class GateIOWebSocket:
     async def authenticate(self):
         """Authenticate with Gate.io using API credentials"""
         if not self.api_key or not self.api_secret:
-            print("Warning: Gate.io API credentials not found")
+            logger.warning("Gate.io API credentials not found")
             return False
         
         timestamp = int(time.time())
@@ -77,56 +99,62 @@ class GateIOWebSocket:
         }
         
         await self.send_message(auth_message)
-        print("Authentication sent to Gate.io")
+        logger.info("Authentication sent to Gate.io")
         return True
     
+    def build_subscription_messages(self, event: str, channel: str, pairs: List[str], params: Tuple,
+                                    batch_size: int) -> List[Dict]:
+        """Subscribe/unsubscribe messages for a channel
+        
+        Channels whose payload is a plain pair list take a batch of pairs per
+        message; the others carry per-pair parameters and need one each.
+        """
+        if channel in self.BATCHED_CHANNELS:
+            payloads = list(chunks(pairs, batch_size))
+        elif channel == 'spot.candlesticks':
+            payloads = [[*params, pair] for pair in pairs]
+        else:
+            payloads = [[pair, *params] for pair in pairs]
+        return [
+            {"time": int(time.time()), "channel": channel, "event": event, "payload": payload}
+            for payload in payloads
+        ]
+    
     async def subscribe_to_ticker(self, pairs: List[str]):
         """Subscribe to ticker data for specified pairs"""
-        for pair in pairs:
-            subscribe_message = {
-                "time": int(time.time()),
-                "channel": "spot.tickers",
-                "event": "subscribe",
-                "payload": [pair]
-            }
-            await self.send_message(subscribe_message)
-            print(f"Subscribed to {pair} ticker on Gate.io")
+        new = await self.subscriptions.subscribe("spot.tickers", pairs)
+        logger.info("Subscribed to %s tickers on Gate.io", len(new))
     
     async def subscribe_to_orderbook(self, pairs: List[str], level: int = 5):
         """Subscribe to orderbook data for specified pairs"""
-        for pair in pairs:
-            subscribe_message = {
-                "time": int(time.time()),
-                "channel": "spot.order_book",
-                "event": "subscribe",
-                "payload": [pair, str(level), "100ms"]
-            }
-            await self.send_message(subscribe_message)
-            print(f"Subscribed to {pair} orderbook on Gate.io")
+        new = await self.subscriptions.subscribe("spot.order_book", pairs, (str(level), "100ms"))
+        logger.info("Subscribed to %s orderbooks on Gate.io", len(new))
+    
+    async def subscribe_to_orderbook_updates(self, pairs: List[str], interval: str = "100ms"):
+        """Subscribe to incremental orderbook updates used to maintain a local order book"""
+        new = await self.subscriptions.subscribe("spot.order_book_update", pairs, (interval,))
+        logger.info("Subscribed to %s orderbook update streams on Gate.io", len(new))
     
     async def subscribe_to_trades(self, pairs: List[str]):
         """Subscribe to trade data for specified pairs"""
-        for pair in pairs:
-            subscribe_message = {
-                "time": int(time.time()),
-                "channel": "spot.trades",
-                "event": "subscribe",
-                "payload": [pair]
-            }
-            await self.send_message(subscribe_message)
-            print(f"Subscribed to {pair} trades on Gate.io")
+        new = await self.subscriptions.subscribe("spot.trades", pairs)
+        logger.info("Subscribed to %s trade streams on Gate.io", len(new))
     
     async def subscribe_to_candlesticks(self, pairs: List[str], interval: str = "1m"):
         """Subscribe to candlestick data for specified pairs"""
-        for pair in pairs:
-            subscribe_message = {
-                "time": int(time.time()),
-                "channel": "spot.candlesticks",
-                "event": "subscribe",
-                "payload": [interval, pair]
-            }
-            await self.send_message(subscribe_message)
-            print(f"Subscribed to {pair} candlesticks on Gate.io")
+        new = await self.subscriptions.subscribe("spot.candlesticks", pairs, (interval,))
+        logger.info("Subscribed to %s candlestick streams on Gate.io", len(new))
+    
+    async def set_pairs(self, kind: str, pairs: List[str]):
+        """Change the pairs of a 'ticker', 'orderbook' or 'trades' subscription in place"""
+        channel, params = self.KIND_CHANNELS[kind]
+        added, removed = await self.subscriptions.set(channel, pairs, params)
+        logger.info("Gate.io %s subscriptions: +%s -%s", kind, len(added), len(removed))
+    
+    async def resubscribe(self):
+        """Replay the recorded subscriptions after a reconnect"""
+        count = await self.subscriptions.replay()
+        logger.info("Resubscribed to %s Gate.io channels", count)
     
     async def ping(self):
         """Send ping to keep connection alive"""
@@ -139,13 +167,21 @@ class GateIOWebSocket:
         await self.send_message(ping_message)
     
     def register_callback(self, event_type: str, callback: Callable):
-        """Register callback for specific event types"""
-        self.callbacks[event_type] = callback
+        """Register callback for specific event types; every registered callback is called"""
+        return self.bus.subscribe(event_type, callback)
     
     async def handle_message(self, message: str):
         """Handle incoming WebSocket messages"""
         try:
             data = json.loads(message)
+        except json.JSONDecodeError as e:
+            logger.error("Failed to parse Gate.io message: %s", e)
+            return
+        await self.dispatch(data)
+    
+    async def dispatch(self, data):
+        """Route a parsed message to its handlers and registered callbacks"""
+        try:
             
             # Handle different message types
             if 'channel' in data:
@@ -153,7 +189,7 @@ class GateIOWebSocket:
                 
                 if channel == 'spot.tickers':
                     await self._handle_ticker(data)
-                elif channel == 'spot.order_book':
+                elif channel in ('spot.order_book', 'spot.order_book_update'):
                     await self._handle_orderbook(data)
                 elif channel == 'spot.trades':
                     await self._handle_trade(data)
@@ -161,75 +197,148 @@ class GateIOWebSocket:
                     await self._handle_candlestick(data)
                 elif channel == 'spot.ping':
                     await self._handle_ping(data)
+                elif channel == 'spot.pong':
+                    await self._handle_pong(data)
                 else:
-                    print(f"Unknown channel: {channel}")
+                    logger.warning("Unknown channel: %s", channel)
             
             # Call registered callback if exists
-            if channel in self.callbacks:
-                await self.callbacks[channel](data)
+            await self.bus.publish(channel, data)
                 
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse Gate.io message: {e}")
         except Exception as e:
-            print(f"Error handling Gate.io message: {e}")
+            logger.error("Error handling Gate.io message: %s", e)
     
     async def _handle_ticker(self, data: Dict):
         """Handle ticker data"""
-        print(f"Gate.io Ticker: {data}")
+        log_sampled(logger, 'ticker', "Gate.io Ticker: %s", data)
     
     async def _handle_orderbook(self, data: Dict):
         """Handle orderbook data"""
-        print(f"Gate.io Orderbook: {data}")
+        log_sampled(logger, 'orderbook', "Gate.io Orderbook: %s", data)
     
     async def _handle_trade(self, data: Dict):
         """Handle trade data"""
-        print(f"Gate.io Trade: {data}")
+        log_sampled(logger, 'trade', "Gate.io Trade: %s", data)
     
     async def _handle_candlestick(self, data: Dict):
         """Handle candlestick data"""
-        print(f"Gate.io Candlestick: {data}")
+        log_sampled(logger, 'kline', "Gate.io Candlestick: %s", data)
     
     async def _handle_ping(self, data: Dict):
         """Handle ping response"""
-        print("Received ping response from Gate.io")
+        logger.debug("Received ping response from Gate.io")
+    
+    async def _handle_pong(self, data: Dict):
+        """Handle pong response"""
+        await self.bus.publish('pong', data)
     
     async def listen(self):
-        """Main listening loop"""
+        """Main listening loop
+        
+        Frames are parsed here and handed to a conflating ingress queue that
+        a separate task drains, so slow callbacks never delay recv().
+        """
         if not self.is_connected:
             await self.connect()
         
+        consumer = asyncio.create_task(self._drain_ingress())
         try:
             while self.is_connected:
                 message = await self.websocket.recv()
-                await self.handle_message(message)
+                received = (time.time(), time.monotonic())
+                if self.recorder is not None:
+                    self.recorder.record('gate', received[0], message)
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError as e:
+                    logger.error("Failed to parse Gate.io message: %s", e)
+                    continue
+                key = self._ingress_key(data)
+                if key is DISPATCH_INLINE:
+                    self.last_recv = received
+                    await self.dispatch(data)
+                else:
+                    self.ingress.put(key, (data, received))
         except websockets.exceptions.ConnectionClosed:
-            print("Gate.io WebSocket connection closed")
+            logger.warning("Gate.io WebSocket connection closed")
             self.is_connected = False
         except Exception as e:
-            print(f"Error in Gate.io listen loop: {e}")
+            logger.error("Error in Gate.io listen loop: %s", e)
             self.is_connected = False
+        finally:
+            consumer.cancel()
+            # Frames queued from a dead connection are stale
+            self.ingress.clear()
+    
+    async def _drain_ingress(self):
+        """Process queued frames in order"""
+        while True:
+            data, received = await self.ingress.get()
+            self.last_recv = received
+            await self.dispatch(data)
+    
+    def _ingress_key(self, data):
+        """Conflation key for the ingress queue
+        
+        Tickers and full order book snapshots are superseded by the next
+        frame for the same pair; diffs and trades must all be processed.
+        """
+        if not isinstance(data, dict):
+            return None
+        channel = data.get('channel')
+        if channel in ('spot.ping', 'spot.pong') or data.get('event') != 'update':
+            # Pongs and subscribe/unsubscribe acks
+            return DISPATCH_INLINE
+        result = data.get('result')
+        if channel == 'spot.tickers' and isinstance(result, dict):
+            return (channel, result.get('currency_pair'))
+        if channel == 'spot.order_book' and isinstance(result, dict):
+            return (channel, result.get('s'))
+        return None
 
 async def get_fees():
     """Fetch spot trading fees from Gate.io REST API (requires API key/secret in env)."""
-    api_key = os.getenv('GATEIO_API_KEY')
-    api_secret = os.getenv('GATEIO_API_SECRET')
-    if not api_key or not api_secret:
+    client = get_client('gate')
+    if client.auth is None:
         return {'error': 'Missing Gate.io API key or secret'}
-    url = 'https://api.gateio.ws/api/v4/spot/accounts/fee'
-    headers = {
-        'Content-Type': 'application/json',
-        'KEY': api_key,
-        'Timestamp': str(int(time.time())),
-    }
-    sign_str = 'GET\n/api/v4/spot/accounts/fee\n\n' + headers['Timestamp']
-    signature = hmac.new(api_secret.encode(), sign_str.encode(), hashlib.sha512).hexdigest()
-    headers['SIGN'] = signature
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            else:
-                return {'error': f'HTTP {resp.status}'}
+    status, data = await client.get('/api/v4/spot/accounts/fee', signed=True)
+    return data if status == 200 else {'error': f'HTTP {status}'}
+
+async def get_orderbook_snapshot(pair: str, limit: int = 100):
+    """Fetch an order book snapshot from Gate.io REST API for local book resyncs."""
+    params = {'currency_pair': pair, 'limit': limit, 'with_id': 'true'}
+    status, data = await get_client('gate').get('/api/v4/spot/order_book', params, priority=PRIORITY_SNAPSHOT)
+    if status == 200:
+        return {'bids': data['bids'], 'asks': data['asks'], 'update_id': data['id']}
+    return {'error': f'HTTP {status}'}
+
+async def get_symbols():
+    """Fetch the (base, quote) currencies of every tradable Gate.io spot pair."""
+    status, data = await get_client('gate').get('/api/v4/spot/currency_pairs')
+    if status == 200:
+        return [(p['base'], p['quote']) for p in data if p.get('trade_status') == 'tradable']
+    return {'error': f'HTTP {status}'}
+
+async def create_order(pair: str, side: str, amount: float, price: float, time_in_force: str = 'ioc',
+                       priority: int = PRIORITY_ORDER):
+    """Place a limit order; arbitrage legs default to immediate-or-cancel. Unwinds pass PRIORITY_URGENT."""
+    body = {'currency_pair': pair, 'side': side, 'type': 'limit', 'time_in_force': time_in_force,
+            'amount': f'{amount:.8f}', 'price': f'{price:.8f}'}
+    status, data = await get_client('gate').post('/api/v4/spot/orders', body=body, signed=True,
+                                                 cost={'orders': 1}, priority=priority)
+    return data if status in (200, 201) else {'error': f'HTTP {status}', 'details': data}
+
+async def get_order_status(pair: str, order_id):
+    """Fetch one order's state from Gate.io REST API."""
+    status, data = await get_client('gate').get(f'/api/v4/spot/orders/{order_id}', {'currency_pair': pair},
+                                                signed=True, priority=PRIORITY_ORDER)
+    return data if status == 200 else {'error': f'HTTP {status}', 'details': data}
+
+async def cancel_order(pair: str, order_id):
+    """Cancel an open order; goes ahead of every other queued request."""
+    status, data = await get_client('gate').delete(f'/api/v4/spot/orders/{order_id}', {'currency_pair': pair},
+                                                   signed=True, cost={'orders': 1}, priority=PRIORITY_URGENT)
+    return data if status == 200 else {'error': f'HTTP {status}', 'details': data}
 
 # Example usage
 async def main():
@@ -0,0 +1,69 @@
+import asyncio
+from collections import deque
+from typing import Any, Dict, Hashable, Optional
+
+# Returned by an adapter's _ingress_key() for control frames (pongs, acks)
+# that are cheap and latency sensitive, so the reader handles them itself.
+DISPATCH_INLINE = object()
+
+
+class ConflatingQueue:
+    """Bounded ingress queue with latest-value-wins conflation per key.
+
+    Items with the same key (e.g. ('ticker', 'BTCUSDT')) replace each other
+    in place, so a burst collapses to the newest tick without losing its
+    place in line. Items with key None are never conflated. When the queue
+    is full the oldest entry is dropped.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._keys = deque()
+        self._items = {}
+        self._seq = 0
+        self._ready = asyncio.Event()
+        self.enqueued = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def put(self, key: Optional[Hashable], item: Any):
+        self.enqueued += 1
+        if key is None:
+            # Unique key so the item is never conflated
+            self._seq += 1
+            key = (None, self._seq)
+        elif key in self._items:
+            self._items[key] = item
+            self.conflated += 1
+            return
+        if len(self._keys) >= self.maxsize:
+            self._items.pop(self._keys.popleft())
+            self.dropped += 1
+        self._keys.append(key)
+        self._items[key] = item
+        if len(self._keys) > self.high_water:
+            self.high_water = len(self._keys)
+        self._ready.set()
+
+    async def get(self) -> Any:
+        while not self._keys:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.pop(self._keys.popleft())
+
+    def clear(self):
+        self._keys.clear()
+        self._items.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'depth': len(self._keys),
+            'high_water': self.high_water,
+            'enqueued': self.enqueued,
+            'conflated': self.conflated,
+            'dropped': self.dropped
+        }
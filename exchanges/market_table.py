@@ -0,0 +1,100 @@
+import numpy as np
+from typing import Dict, List, Optional
+from utils.symbols import registry
+
+
+def _changed(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Elementwise old != new where NaN equals NaN"""
+    return ~((old == new) | (np.isnan(old) & np.isnan(new)))
+
+
+class MarketTable:
+    """Columnar last/bid/ask table for one exchange, indexed by symbol ID
+
+    Bulk feeds (Binance !ticker@arr) are written in one vectorized pass per
+    frame. Rows whose quote changed are flagged dirty, so consumers only
+    look at what moved instead of receiving one callback per symbol.
+    """
+
+    def __init__(self, exchange: str, symbols=None, capacity: int = 1024):
+        self.exchange = exchange
+        self.symbols = symbols if symbols is not None else registry
+        self.last = np.full(capacity, np.nan)
+        self.bid = np.full(capacity, np.nan)
+        self.ask = np.full(capacity, np.nan)
+        self.event_time = np.zeros(capacity)  # exchange event time, ms
+        self.dirty = np.zeros(capacity, dtype=bool)
+
+    def _ensure(self, rows: int):
+        capacity = len(self.last)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2)
+        for name, fill in (('last', np.nan), ('bid', np.nan), ('ask', np.nan), ('event_time', 0.0)):
+            column = np.full(capacity, fill)
+            old = getattr(self, name)
+            column[:len(old)] = old
+            setattr(self, name, column)
+        dirty = np.zeros(capacity, dtype=bool)
+        dirty[:len(self.dirty)] = self.dirty
+        self.dirty = dirty
+
+    def update(self, rows: np.ndarray, last: np.ndarray, bid: np.ndarray, ask: np.ndarray,
+               event_time: np.ndarray) -> np.ndarray:
+        """Write a batch of quotes and return the rows that changed"""
+        if not len(rows):
+            return rows
+        self._ensure(int(rows.max()) + 1)
+        changed = _changed(self.last[rows], last) | _changed(self.bid[rows], bid) | _changed(self.ask[rows], ask)
+        self.last[rows] = last
+        self.bid[rows] = bid
+        self.ask[rows] = ask
+        self.event_time[rows] = event_time
+        rows = rows[changed]
+        self.dirty[rows] = True
+        return rows
+
+    def ingest_binance_tickers(self, data: List[Dict]) -> np.ndarray:
+        """Parse a !ticker@arr or !miniTicker@arr payload, returning the changed rows
+
+        Mini tickers carry no best bid/ask; those columns are left NaN.
+        """
+        resolve = self.symbols.resolve
+        nan = np.nan
+        n = len(data)
+        rows = np.empty(n, dtype=np.intp)
+        last = np.empty(n)
+        bid = np.empty(n)
+        ask = np.empty(n)
+        event_time = np.empty(n)
+        for i, item in enumerate(data):
+            rows[i] = resolve('binance', item['s'])
+            last[i] = item['c']
+            bid[i] = item.get('b', nan)
+            ask[i] = item.get('a', nan)
+            event_time[i] = item.get('E', 0)
+        return self.update(rows, last, bid, ask, event_time)
+
+    def take_dirty(self) -> np.ndarray:
+        """Rows changed since the last call, clearing their dirty flag"""
+        rows = np.flatnonzero(self.dirty)
+        self.dirty[rows] = False
+        return rows
+
+    def invalidate(self):
+        """Drop every quote, e.g. after the feed was interrupted"""
+        self.last[:] = np.nan
+        self.bid[:] = np.nan
+        self.ask[:] = np.nan
+        self.dirty[:] = False
+
+    def quote(self, symbol) -> Optional[Dict]:
+        row = self.symbols.id(symbol)
+        if row >= len(self.last) or np.isnan(self.last[row]):
+            return None
+        return {
+            'last': float(self.last[row]),
+            'bid': None if np.isnan(self.bid[row]) else float(self.bid[row]),
+            'ask': None if np.isnan(self.ask[row]) else float(self.ask[row]),
+            'event_time': float(self.event_time[row])
+        }
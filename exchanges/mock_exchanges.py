@@ -0,0 +1,835 @@
+# Local stand-ins for the Binance, Gate.io and CEX.IO endpoints
+
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import websockets
+from aiohttp import web
+from config.settings import CONFIG
+from utils.logger import get_logger
+from utils.symbols import normalize_symbol, split_symbol
+
+logger = get_logger('mock_exchanges')
+
+DEFAULT_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']
+# Publisher wakeups; each one sends however many messages are due
+PUBLISH_TICK = 0.001
+BOOK_LEVELS = 5
+
+
+class FeedProfile:
+    """How a mock venue paces and disturbs its feed
+
+    rate is market data messages per second per connection, spread
+    round-robin over that connection's subscriptions; burst_size extra
+    messages go out at once every burst_every seconds. Every outgoing frame
+    (replies included) is held back latency_ms plus up to jitter_ms, in
+    order. disconnect_every closes each connection after that many seconds,
+    and a connection whose unsent backlog exceeds max_backlog is closed as a
+    slow consumer, as the real venues do. skew offsets this venue's prices
+    so the engine sees spreads.
+    """
+
+    def __init__(self, rate: float = 100.0, burst_size: int = 0, burst_every: float = 1.0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, disconnect_every: Optional[float] = None,
+                 max_backlog: int = 10000, skew: float = 0.0):
+        self.rate = rate
+        self.burst_size = burst_size
+        self.burst_every = burst_every
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.disconnect_every = disconnect_every
+        self.max_backlog = max_backlog
+        self.skew = skew
+
+
+class MockMarket:
+    """Random-walk prices and book update IDs per canonical symbol, shared by the mock venues"""
+
+    def __init__(self, symbols: Optional[List[str]] = None, seed: Optional[int] = None,
+                 volatility: float = 0.0002, spread: float = 0.0002):
+        self.symbols = list(symbols or DEFAULT_SYMBOLS)
+        self.random = random.Random(seed)
+        self.volatility = volatility
+        self.spread = spread
+        self.prices = {}
+        self.update_ids = {}
+        self.trade_id = 0
+
+    def price(self, symbol: str) -> float:
+        """Next mid price of a symbol"""
+        price = self.prices.get(symbol)
+        if price is None:
+            price = 10 ** self.random.uniform(0, 4)
+        else:
+            price *= 1 + self.random.gauss(0, self.volatility)
+        self.prices[symbol] = price
+        return price
+
+    def quote(self, symbol: str, skew: float = 0.0) -> Tuple[float, float, float]:
+        """(bid, ask, last) of a symbol on a venue quoting `skew` away from the others"""
+        mid = self.price(symbol) * (1 + skew)
+        return mid * (1 - self.spread / 2), mid * (1 + self.spread / 2), mid
+
+    def next_update_id(self, symbol: str, count: int = 1) -> Tuple[int, int]:
+        """(first, last) update IDs of the next book event"""
+        first = self.update_ids.get(symbol, 1000) + 1
+        self.update_ids[symbol] = first + count - 1
+        return first, first + count - 1
+
+    def last_update_id(self, symbol: str) -> int:
+        return self.update_ids.setdefault(symbol, 1000)
+
+    def next_trade_id(self) -> int:
+        self.trade_id += 1
+        return self.trade_id
+
+    def levels(self, symbol: str, skew: float = 0.0, depth: int = BOOK_LEVELS) -> Tuple[List, List]:
+        """Bid and ask levels as [price, size] string pairs"""
+        bid, ask, _ = self.quote(symbol, skew)
+        step = bid * self.spread / 2
+        bids = [[_fmt(bid - i * step), _fmt(self.random.uniform(0.1, 5))] for i in range(depth)]
+        asks = [[_fmt(ask + i * step), _fmt(self.random.uniform(0.1, 5))] for i in range(depth)]
+        return bids, asks
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.8g}"
+
+
+class MockConnection:
+    """One client connection: its subscriptions and delayed outbound frames"""
+
+    def __init__(self, websocket, path: str):
+        self.websocket = websocket
+        self.path = path
+        self.streams = {}  # subscription -> None, in subscription order
+        self.state = {}    # per-subscription protocol state (e.g. snapshot sent)
+        self.outbox = deque()  # (due monotonic time, frame)
+        self.wakeup = asyncio.Event()
+        self.last_due = 0.0
+        self.sent = 0
+
+
+class MockExchangeServer:
+    """WebSocket and REST stand-in for one venue
+
+    Subclasses implement the venue's protocol: how clients subscribe, ping
+    and authenticate (handle_message), and what a message of each
+    subscription looks like (render). start() binds free local ports and
+    sets ws_url and rest_url. Orders placed over REST fill fill_ratio of
+    their amount at their limit price at once; the rest expires, and
+    order_frames() announces both on the private streams. With hold_orders
+    set, orders stay open and silent until cancel_order() closes them.
+    """
+
+    name = None
+    WS_PATH = '/ws/'
+
+    def __init__(self, profile: Optional[FeedProfile] = None, market: Optional[MockMarket] = None,
+                 host: str = '127.0.0.1', port: int = 0, rest_port: int = 0):
+        self.profile = profile or FeedProfile()
+        self.market = market or MockMarket()
+        self.host = host
+        self.port = port
+        self.rest_port = rest_port
+        self.connections = set()
+        self.ws_url = None
+        self.rest_url = None
+        self.messages_sent = 0
+        self.connections_accepted = 0
+        self.rest_requests = 0
+        self.rest_clients = set()  # (host, port) of every REST client connection seen
+        self.fill_ratio = 1.0
+        self.hold_orders = False
+        self.orders = {}  # order ID -> order dict, see create_order()
+        self._server = None
+        self._runner = None
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        port = self._server.sockets[0].getsockname()[1]
+        self.ws_url = f"ws://{self.host}:{port}{self.WS_PATH}"
+        app = web.Application(middlewares=[self._count_rest])
+        self.add_routes(app.router)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.rest_port).start()
+        self.rest_url = f"http://{self.host}:{self._runner.addresses[0][1]}"
+        logger.info("Mock %s listening on %s (REST %s)", self.name, self.ws_url, self.rest_url)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def drop_connections(self, code: int = 1001, reason: str = 'going away'):
+        """Close every client connection, e.g. to exercise reconnects"""
+        await asyncio.gather(*(conn.websocket.close(code, reason) for conn in list(self.connections)),
+                             return_exceptions=True)
+
+    # Protocol hooks
+
+    def on_connect(self, conn: MockConnection):
+        """Frames to send when a client connects"""
+        return []
+
+    def handle_message(self, conn: MockConnection, data) -> List:
+        """Apply a client message and return the reply frames"""
+        return []
+
+    def render(self, conn: MockConnection, stream):
+        """Next market data frame of a subscription, or None"""
+        return None
+
+    def add_routes(self, router: web.UrlDispatcher):
+        return
+
+    def order_frames(self, conn: MockConnection, order: Dict) -> List:
+        """Private stream frames announcing a new order and how it ended"""
+        return []
+
+    # Orders
+
+    def create_order(self, symbol: str, side: str, amount: float, price: float,
+                     client_id: Optional[str] = None) -> Dict:
+        order_id = str(len(self.orders) + 1001)
+        order = {'id': order_id, 'symbol': symbol, 'side': side, 'amount': amount, 'price': price,
+                 'filled': amount * self.fill_ratio, 'client_id': client_id or f'mock-{order_id}',
+                 'time': _now_ms(), 'open': self.hold_orders}
+        self.orders[order_id] = order
+        if not order['open']:
+            self._announce(order)
+        return order
+
+    def cancel_order(self, order_id) -> Optional[Dict]:
+        """Close a held order with what it filled; None if it is unknown or already closed"""
+        order = self.orders.get(str(order_id))
+        if order is None or not order['open']:
+            return None
+        order['open'] = False
+        self._announce(order)
+        return order
+
+    def _announce(self, order: Dict):
+        for conn in list(self.connections):
+            for frame in self.order_frames(conn, order):
+                self.send(conn, frame)
+
+    @staticmethod
+    async def request_params(request) -> Dict:
+        """Query string and JSON body of a REST request, merged"""
+        params = dict(request.query)
+        if request.can_read_body:
+            body = await request.json()
+            if isinstance(body, dict):
+                params.update(body)
+        return params
+
+    # Plumbing
+
+    @web.middleware
+    async def _count_rest(self, request, handler):
+        self.rest_requests += 1
+        self.rest_clients.add(request.transport.get_extra_info('peername'))
+        return await handler(request)
+
+    def send(self, conn: MockConnection, frame):
+        profile = self.profile
+        delay = profile.latency_ms
+        if profile.jitter_ms:
+            delay += self.market.random.uniform(0, profile.jitter_ms)
+        # Jitter never reorders frames
+        due = max(time.monotonic() + delay / 1000, conn.last_due)
+        conn.last_due = due
+        conn.outbox.append((due, frame if isinstance(frame, str) else json.dumps(frame)))
+        conn.wakeup.set()
+
+    async def _handle(self, websocket, path: Optional[str] = None):
+        request = getattr(websocket, 'request', None)
+        path = path or (request.path if request is not None else getattr(websocket, 'path', '/'))
+        conn = MockConnection(websocket, path)
+        self.connections.add(conn)
+        self.connections_accepted += 1
+        tasks = [asyncio.create_task(self._send_loop(conn)), asyncio.create_task(self._publish_loop(conn))]
+        if self.profile.disconnect_every:
+            tasks.append(asyncio.create_task(self._disconnect_later(conn)))
+        try:
+            for frame in self.on_connect(conn):
+                self.send(conn, frame)
+            async for message in websocket:
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError:
+                    continue
+                for reply in self.handle_message(conn, data):
+                    self.send(conn, reply)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.connections.discard(conn)
+
+    async def _send_loop(self, conn: MockConnection):
+        outbox = conn.outbox
+        try:
+            while True:
+                if not outbox:
+                    conn.wakeup.clear()
+                    await conn.wakeup.wait()
+                    continue
+                delay = outbox[0][0] - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await conn.websocket.send(outbox.popleft()[1])
+                conn.sent += 1
+                self.messages_sent += 1
+        except websockets.exceptions.ConnectionClosed:
+            return
+
+    async def _publish_loop(self, conn: MockConnection):
+        profile = self.profile
+        started, published, turn = time.monotonic(), 0, 0
+        next_burst = started + profile.burst_every
+        while True:
+            await asyncio.sleep(PUBLISH_TICK)
+            now = time.monotonic()
+            streams = list(conn.streams)
+            if not streams:
+                started, published = now, 0
+                next_burst = now + profile.burst_every
+                continue
+            # At most a second's worth after a stall
+            due = min(int((now - started) * profile.rate) - published, max(int(profile.rate), 1))
+            published += due
+            if profile.burst_size and now >= next_burst:
+                due += profile.burst_size
+                next_burst = now + profile.burst_every
+            for _ in range(due):
+                frame = self.render(conn, streams[turn % len(streams)])
+                turn += 1
+                if frame is not None:
+                    self.send(conn, frame)
+            if len(conn.outbox) > profile.max_backlog:
+                logger.warning("Mock %s closing slow consumer (%s frames queued)", self.name, len(conn.outbox))
+                conn.outbox.clear()
+                await conn.websocket.close(1008, 'slow consumer')
+                return
+
+    async def _disconnect_later(self, conn: MockConnection):
+        await asyncio.sleep(self.profile.disconnect_every)
+        await conn.websocket.close(1001, 'scheduled disconnect')
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class MockBinanceServer(MockExchangeServer):
+    """Binance /ws/ and /stream?streams= connections with SUBSCRIBE/UNSUBSCRIBE
+
+    Pings are protocol-level frames, answered by the WebSocket library.
+    """
+
+    name = 'binance'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.listen_keys = set()
+
+    def on_connect(self, conn: MockConnection):
+        query = parse_qs(urlparse(conn.path).query)
+        conn.state['combined'] = urlparse(conn.path).path.startswith('/stream')
+        # /ws/<listenKey> is a user data stream
+        conn.state['user'] = urlparse(conn.path).path[len(self.WS_PATH):] in self.listen_keys
+        for stream in '/'.join(query.get('streams', [])).split('/'):
+            if stream:
+                conn.streams[stream] = None
+        return []
+
+    def handle_message(self, conn: MockConnection, data) -> List:
+        method = data.get('method') if isinstance(data, dict) else None
+        if method == 'SUBSCRIBE':
+            for stream in data.get('params', []):
+                conn.streams[stream] = None
+        elif method == 'UNSUBSCRIBE':
+            for stream in data.get('params', []):
+                conn.streams.pop(stream, None)
+        elif method == 'LIST_SUBSCRIPTIONS':
+            return [{'result': list(conn.streams), 'id': data.get('id')}]
+        else:
+            return [{'error': {'code': 2, 'msg': 'Invalid request'}, 'id': data.get('id') if isinstance(data, dict) else None}]
+        return [{'result': None, 'id': data.get('id')}]
+
+    def _ticker(self, symbol: str, event_time: int, mini: bool = False) -> Dict:
+        bid, ask, last = self.market.quote(symbol, self.profile.skew)
+        if mini:
+            return {'e': '24hrMiniTicker', 'E': event_time, 's': symbol, 'c': _fmt(last), 'o': _fmt(last),
+                    'h': _fmt(ask), 'l': _fmt(bid), 'v': '1000', 'q': _fmt(1000 * last)}
+        return {'e': '24hrTicker', 'E': event_time, 's': symbol, 'c': _fmt(last), 'Q': '0.1',
+                'b': _fmt(bid), 'B': '1.5', 'a': _fmt(ask), 'A': '2.5', 'o': _fmt(last), 'h': _fmt(ask),
+                'l': _fmt(bid), 'v': '1000', 'q': _fmt(1000 * last), 'P': '0.0', 'p': '0'}
+
+    def render(self, conn: MockConnection, stream: str):
+        event_time = _now_ms()
+        market = self.market
+        name, _, kind = stream.partition('@')
+        symbol = name.upper()
+        if stream in ('!ticker@arr', '!miniTicker@arr'):
+            mini = stream.startswith('!mini')
+            payload = [self._ticker(s, event_time, mini) for s in market.symbols]
+        elif kind == 'ticker':
+            payload = self._ticker(symbol, event_time)
+        elif kind == 'miniTicker':
+            payload = self._ticker(symbol, event_time, mini=True)
+        elif kind == 'trade':
+            _, _, last = market.quote(symbol, self.profile.skew)
+            payload = {'e': 'trade', 'E': event_time, 's': symbol, 't': market.next_trade_id(),
+                       'p': _fmt(last), 'q': _fmt(market.random.uniform(0.01, 1)), 'T': event_time,
+                       'm': market.random.random() < 0.5}
+        elif kind in ('depth', 'depth@100ms'):
+            first, last_id = market.next_update_id(symbol)
+            bids, asks = market.levels(symbol, self.profile.skew, 2)
+            payload = {'e': 'depthUpdate', 'E': event_time, 's': symbol, 'U': first, 'u': last_id,
+                       'b': bids, 'a': asks}
+        elif kind.startswith('depth'):
+            # Partial book depth<levels>[@100ms]
+            levels = int(kind[5:].split('@')[0] or BOOK_LEVELS)
+            bids, asks = market.levels(symbol, self.profile.skew, levels)
+            payload = {'lastUpdateId': market.next_update_id(symbol)[1], 'bids': bids, 'asks': asks}
+        else:
+            return None
+        return {'stream': stream, 'data': payload} if conn.state['combined'] else payload
+
+    def add_routes(self, router: web.UrlDispatcher):
+        router.add_get('/api/v3/ping', self._ping)
+        router.add_get('/api/v3/time', self._time)
+        router.add_get('/api/v3/depth', self._depth)
+        router.add_get('/api/v3/exchangeInfo', self._exchange_info)
+        router.add_get('/sapi/v1/asset/tradeFee', self._trade_fee)
+        router.add_post('/api/v3/userDataStream', self._new_listen_key)
+        router.add_put('/api/v3/userDataStream', self._keep_listen_key)
+        router.add_post('/api/v3/order', self._new_order)
+        router.add_get('/api/v3/order', self._get_order)
+        router.add_delete('/api/v3/order', self._cancel_order)
+
+    async def _ping(self, request):
+        return web.json_response({})
+
+    async def _time(self, request):
+        return web.json_response({'serverTime': _now_ms()})
+
+    async def _depth(self, request):
+        symbol = request.query['symbol'].upper()
+        bids, asks = self.market.levels(symbol, self.profile.skew, min(int(request.query.get('limit', 100)), 20))
+        return web.json_response({'lastUpdateId': self.market.last_update_id(symbol), 'bids': bids, 'asks': asks})
+
+    async def _exchange_info(self, request):
+        symbols = []
+        for symbol in self.market.symbols:
+            base, quote = split_symbol(symbol)
+            symbols.append({'symbol': symbol, 'status': 'TRADING', 'baseAsset': base, 'quoteAsset': quote})
+        return web.json_response({'timezone': 'UTC', 'serverTime': _now_ms(), 'symbols': symbols})
+
+    async def _trade_fee(self, request):
+        return web.json_response([{'symbol': symbol, 'makerCommission': '0.001', 'takerCommission': '0.001'}
+                                  for symbol in self.market.symbols])
+
+    async def _new_listen_key(self, request):
+        listen_key = f'mock-listen-key-{len(self.listen_keys) + 1}'
+        self.listen_keys.add(listen_key)
+        return web.json_response({'listenKey': listen_key})
+
+    async def _keep_listen_key(self, request):
+        if request.query.get('listenKey') not in self.listen_keys:
+            return web.json_response({'code': -1125, 'msg': 'This listenKey does not exist.'}, status=400)
+        return web.json_response({})
+
+    def _status(self, order: Dict) -> str:
+        if order['open']:
+            return 'NEW'
+        return 'FILLED' if order['filled'] >= order['amount'] else 'EXPIRED'
+
+    def _rest_order(self, order: Dict, status: str) -> Dict:
+        filled = order['filled'] if status != 'NEW' else 0.0
+        return {'symbol': order['symbol'], 'orderId': int(order['id']), 'clientOrderId': order['client_id'],
+                'transactTime': order['time'], 'price': _fmt(order['price']), 'origQty': _fmt(order['amount']),
+                'executedQty': _fmt(filled), 'cummulativeQuoteQty': _fmt(filled * order['price']),
+                'status': status, 'timeInForce': 'IOC', 'type': 'LIMIT', 'side': order['side'].upper()}
+
+    async def _new_order(self, request):
+        params = await self.request_params(request)
+        order = self.create_order(params['symbol'], params['side'].lower(), float(params['quantity']),
+                                  float(params['price']), params.get('newClientOrderId'))
+        # Reported as accepted; the fill arrives on the user data stream
+        return web.json_response(self._rest_order(order, 'NEW'))
+
+    async def _get_order(self, request):
+        order = self.orders.get(request.query.get('orderId'))
+        if order is None:
+            return web.json_response({'code': -2013, 'msg': 'Order does not exist.'}, status=400)
+        return web.json_response(self._rest_order(order, self._status(order)))
+
+    async def _cancel_order(self, request):
+        order = self.cancel_order(request.query.get('orderId'))
+        if order is None:
+            return web.json_response({'code': -2011, 'msg': 'Unknown order sent.'}, status=400)
+        return web.json_response(self._rest_order(order, 'CANCELED'))
+
+    def order_frames(self, conn: MockConnection, order: Dict) -> List:
+        if not conn.state.get('user'):
+            return []
+        frames = []
+        for status, filled in (('NEW', 0.0), (self._status(order), order['filled'])):
+            frames.append({'e': 'executionReport', 'E': _now_ms(), 's': order['symbol'], 'c': order['client_id'],
+                           'S': order['side'].upper(), 'o': 'LIMIT', 'f': 'IOC', 'q': _fmt(order['amount']),
+                           'p': _fmt(order['price']), 'x': 'TRADE' if filled else status, 'X': status,
+                           'i': int(order['id']), 'l': _fmt(filled), 'z': _fmt(filled), 'L': _fmt(order['price']),
+                           'n': _fmt(filled * 0.001), 'N': split_symbol(order['symbol'])[0], 'T': order['time'],
+                           'Z': _fmt(filled * order['price'])})
+        return frames
+
+
+class MockGateServer(MockExchangeServer):
+    """Gate.io v4 WebSocket: subscribe/unsubscribe per channel, spot.ping, auth on spot.ping"""
+
+    name = 'gate'
+    WS_PATH = '/ws/v4/'
+    # Channels whose payload is a list of pairs; the others take [pair, *params]
+    BATCHED_CHANNELS = ('spot.tickers', 'spot.trades')
+    PRIVATE_CHANNELS = ('spot.orders', 'spot.usertrades')
+
+    def handle_message(self, conn: MockConnection, data) -> List:
+        if not isinstance(data, dict):
+            return []
+        channel, event = data.get('channel'), data.get('event')
+        now = time.time()
+        if channel in self.PRIVATE_CHANNELS:
+            private = conn.state.setdefault('private', set())
+            if 'auth' not in data:
+                return [{'time': int(now), 'channel': channel, 'event': event,
+                         'error': {'code': 2, 'message': 'Missing authentication'}, 'result': None}]
+            if event == 'subscribe':
+                private.add(channel)
+            else:
+                private.discard(channel)
+            return [{'time': int(now), 'time_ms': int(now * 1000), 'channel': channel, 'event': event,
+                     'result': {'status': 'success'}}]
+        if channel == 'spot.ping':
+            if 'auth' in data:
+                conn.state['authenticated'] = True
+            return [{'time': int(now), 'time_ms': int(now * 1000), 'channel': 'spot.pong', 'event': '',
+                     'result': None}]
+        payload = data.get('payload') or []
+        if channel in self.BATCHED_CHANNELS:
+            streams = [(channel, pair) for pair in payload]
+        elif channel == 'spot.candlesticks':
+            streams = [(channel, payload[-1])] if payload else []
+        else:
+            streams = [(channel, payload[0])] if payload else []
+        for stream in streams:
+            if event == 'subscribe':
+                conn.streams[stream] = None
+            elif event == 'unsubscribe':
+                conn.streams.pop(stream, None)
+        return [{'time': int(now), 'time_ms': int(now * 1000), 'channel': channel, 'event': event,
+                 'result': {'status': 'success'}}]
+
+    def render(self, conn: MockConnection, stream):
+        channel, pair = stream
+        market = self.market
+        symbol = normalize_symbol('gate', pair)
+        now_ms = _now_ms()
+        if channel == 'spot.tickers':
+            bid, ask, last = market.quote(symbol, self.profile.skew)
+            result = {'currency_pair': pair, 'last': _fmt(last), 'lowest_ask': _fmt(ask),
+                      'highest_bid': _fmt(bid), 'change_percentage': '0', 'base_volume': '1000',
+                      'quote_volume': _fmt(1000 * last), 'high_24h': _fmt(ask), 'low_24h': _fmt(bid)}
+        elif channel == 'spot.trades':
+            _, _, last = market.quote(symbol, self.profile.skew)
+            result = {'id': market.next_trade_id(), 'create_time': now_ms // 1000,
+                      'create_time_ms': str(now_ms), 'side': market.random.choice(('buy', 'sell')),
+                      'currency_pair': pair, 'amount': _fmt(market.random.uniform(0.01, 1)), 'price': _fmt(last)}
+        elif channel == 'spot.order_book_update':
+            first, last_id = market.next_update_id(symbol)
+            bids, asks = market.levels(symbol, self.profile.skew, 2)
+            result = {'t': now_ms, 'e': 'depthUpdate', 'E': now_ms // 1000, 's': pair, 'U': first, 'u': last_id,
+                      'b': bids, 'a': asks}
+        elif channel == 'spot.order_book':
+            bids, asks = market.levels(symbol, self.profile.skew)
+            result = {'t': now_ms, 'lastUpdateId': market.next_update_id(symbol)[1], 's': pair,
+                      'bids': bids, 'asks': asks}
+        else:
+            return None
+        return {'time': now_ms // 1000, 'time_ms': now_ms, 'channel': channel, 'event': 'update', 'result': result}
+
+    def add_routes(self, router: web.UrlDispatcher):
+        router.add_get('/api/v4/spot/time', self._time)
+        router.add_get('/api/v4/spot/order_book', self._order_book)
+        router.add_get('/api/v4/spot/currency_pairs', self._currency_pairs)
+        router.add_get('/api/v4/spot/accounts/fee', self._fee)
+        router.add_post('/api/v4/spot/orders', self._new_order)
+        router.add_get('/api/v4/spot/orders/{order_id}', self._get_order)
+        router.add_delete('/api/v4/spot/orders/{order_id}', self._cancel_order)
+
+    async def _time(self, request):
+        return web.json_response({'server_time': _now_ms()})
+
+    async def _order_book(self, request):
+        symbol = normalize_symbol('gate', request.query['currency_pair'])
+        bids, asks = self.market.levels(symbol, self.profile.skew, min(int(request.query.get('limit', 100)), 20))
+        return web.json_response({'id': self.market.last_update_id(symbol), 'current': _now_ms(),
+                                  'update': _now_ms(), 'bids': bids, 'asks': asks})
+
+    async def _currency_pairs(self, request):
+        pairs = []
+        for symbol in self.market.symbols:
+            base, quote = split_symbol(symbol)
+            pairs.append({'id': f'{base}_{quote}', 'base': base, 'quote': quote, 'trade_status': 'tradable'})
+        return web.json_response(pairs)
+
+    async def _fee(self, request):
+        return web.json_response({'user_id': 1, 'maker_fee': '0.002', 'taker_fee': '0.002'})
+
+    def _rest_order(self, order: Dict, finished: bool) -> Dict:
+        base, quote = split_symbol(order['symbol'])
+        filled = order['filled'] if finished else 0.0
+        result = {'id': order['id'], 'text': order['client_id'], 'currency_pair': f'{base}_{quote}',
+                  'side': order['side'], 'type': 'limit', 'time_in_force': 'ioc', 'amount': _fmt(order['amount']),
+                  'price': _fmt(order['price']), 'left': _fmt(order['amount'] - filled),
+                  'filled_total': _fmt(filled * order['price']), 'fee': _fmt(filled * 0.002),
+                  'fee_currency': base, 'create_time_ms': order['time'], 'update_time_ms': _now_ms(),
+                  'status': 'open', 'finish_as': 'open'}
+        if finished:
+            result['status'] = 'closed' if order['filled'] >= order['amount'] else 'cancelled'
+            result['finish_as'] = 'filled' if order['filled'] >= order['amount'] else 'ioc'
+        return result
+
+    async def _new_order(self, request):
+        params = await self.request_params(request)
+        order = self.create_order(normalize_symbol('gate', params['currency_pair']), params['side'],
+                                  float(params['amount']), float(params['price']), params.get('text'))
+        return web.json_response(self._rest_order(order, False), status=201)
+
+    async def _get_order(self, request):
+        order = self.orders.get(request.match_info['order_id'])
+        if order is None:
+            return web.json_response({'label': 'ORDER_NOT_FOUND', 'message': 'Order not found'}, status=404)
+        return web.json_response(self._rest_order(order, not order['open']))
+
+    async def _cancel_order(self, request):
+        order = self.cancel_order(request.match_info['order_id'])
+        if order is None:
+            return web.json_response({'label': 'ORDER_NOT_FOUND', 'message': 'Order not found'}, status=404)
+        return web.json_response(self._rest_order(order, True))
+
+    def order_frames(self, conn: MockConnection, order: Dict) -> List:
+        private = conn.state.get('private', ())
+        now_ms = _now_ms()
+        frames = []
+        if 'spot.orders' in private:
+            frames.append({'time': now_ms // 1000, 'time_ms': now_ms, 'channel': 'spot.orders', 'event': 'update',
+                           'result': [{**self._rest_order(order, False), 'event': 'put'}]})
+        if 'spot.usertrades' in private and order['filled']:
+            rest = self._rest_order(order, True)
+            frames.append({'time': now_ms // 1000, 'time_ms': now_ms, 'channel': 'spot.usertrades',
+                           'event': 'update', 'result': [{
+                               'id': self.market.next_trade_id(), 'order_id': order['id'], 'text': order['client_id'],
+                               'currency_pair': rest['currency_pair'], 'create_time_ms': str(now_ms),
+                               'side': order['side'], 'role': 'taker', 'amount': _fmt(order['filled']),
+                               'price': _fmt(order['price']), 'fee': rest['fee'], 'fee_currency': rest['fee_currency']}]})
+        if 'spot.orders' in private:
+            frames.append({'time': now_ms // 1000, 'time_ms': now_ms, 'channel': 'spot.orders', 'event': 'update',
+                           'result': [{**self._rest_order(order, True), 'event': 'finish'}]})
+        return frames
+
+
+class MockCexServer(MockExchangeServer):
+    """CEX.IO WebSocket: 'connected' greeting, auth, ping/pong and room subscriptions"""
+
+    name = 'cex'
+
+    def on_connect(self, conn: MockConnection):
+        return [{'e': 'connected'}]
+
+    def handle_message(self, conn: MockConnection, data) -> List:
+        event = data.get('e') if isinstance(data, dict) else None
+        if event == 'ping':
+            return [{'e': 'pong'}]
+        if event == 'auth':
+            conn.state['authenticated'] = True
+            return [{'e': 'auth', 'data': {'ok': 'ok'}, 'ok': 'ok', 'timestamp': int(time.time())}]
+        if event in ('subscribe', 'unsubscribe'):
+            for room in data.get('rooms', []):
+                if event == 'subscribe':
+                    conn.streams[room] = None
+                else:
+                    conn.streams.pop(room, None)
+                    conn.state.pop(room, None)
+        return []
+
+    def render(self, conn: MockConnection, room: str):
+        channel, _, pair = room.partition(':')
+        market = self.market
+        symbol = normalize_symbol('cex', pair)
+        if channel == 'tickers':
+            bid, ask, last = market.quote(symbol, self.profile.skew)
+            return {'e': 'tick', 'data': {'pair': pair, 'last': _fmt(last), 'price': _fmt(last),
+                                          'bid': _fmt(bid), 'ask': _fmt(ask)}}
+        if channel == 'order_book':
+            if room not in conn.state:
+                # A snapshot first, then md_update diffs continuing its ID
+                conn.state[room] = True
+                bids, asks = market.levels(symbol, self.profile.skew)
+                return {'e': 'order-book-subscribe', 'data': {'pair': pair, 'id': market.next_update_id(symbol)[1],
+                                                              'bids': bids, 'asks': asks}}
+            bids, asks = market.levels(symbol, self.profile.skew, 2)
+            return {'e': 'md_update', 'data': {'pair': pair, 'id': market.next_update_id(symbol)[1],
+                                               'bids': bids, 'asks': asks}}
+        if channel == 'trades':
+            _, _, last = market.quote(symbol, self.profile.skew)
+            return {'e': 'trade', 'data': {'pair': pair, 'id': market.next_trade_id(), 'time': _now_ms(),
+                                           'side': market.random.choice(('buy', 'sell')),
+                                           'amount': _fmt(market.random.uniform(0.01, 1)), 'price': _fmt(last)}}
+        return None
+
+    def add_routes(self, router: web.UrlDispatcher):
+        router.add_get('/api/order_book/{base}/{quote}/', self._order_book)
+        router.add_get('/api/currency_limits', self._currency_limits)
+        router.add_get('/api/fees', self._fees)
+        router.add_post('/api/place_order/{base}/{quote}', self._place_order)
+        router.add_post('/api/get_order/', self._get_order)
+        router.add_post('/api/cancel_order/', self._cancel_order)
+
+    async def _order_book(self, request):
+        pair = f"{request.match_info['base']}:{request.match_info['quote']}"
+        symbol = normalize_symbol('cex', pair)
+        bids, asks = self.market.levels(symbol, self.profile.skew, min(int(request.query.get('depth', 100)), 20))
+        return web.json_response({'id': self.market.last_update_id(symbol), 'pair': pair,
+                                  'timestamp': int(time.time()), 'bids': bids, 'asks': asks})
+
+    def _native_pairs(self) -> List[Tuple[str, str]]:
+        # USDT pairs are listed against USD on CEX.IO
+        pairs = []
+        for symbol in self.market.symbols:
+            base, quote = split_symbol(symbol)
+            pairs.append((base, 'USD' if quote == 'USDT' else quote))
+        return pairs
+
+    async def _currency_limits(self, request):
+        return web.json_response({'e': 'currency_limits', 'ok': 'ok', 'data': {
+            'pairs': [{'symbol1': base, 'symbol2': quote, 'minLotSize': 0.0001} for base, quote in self._native_pairs()]
+        }})
+
+    async def _place_order(self, request):
+        params = await self.request_params(request)
+        pair = f"{request.match_info['base']}:{request.match_info['quote']}"
+        order = self.create_order(normalize_symbol('cex', pair), params['type'], float(params['amount']),
+                                  float(params['price']))
+        return web.json_response({'id': order['id'], 'time': order['time'], 'type': order['side'],
+                                  'price': _fmt(order['price']), 'amount': _fmt(order['amount']),
+                                  'pending': _fmt(order['amount']), 'complete': False})
+
+    async def _get_order(self, request):
+        params = await self.request_params(request)
+        order = self.orders.get(str(params.get('id')))
+        if order is None:
+            return web.json_response({'error': 'Error: Order not found'})
+        remains = order['amount'] - order['filled']
+        if order['open']:
+            status, remains = 'a', order['amount']
+        else:
+            status = 'd' if not remains else ('cd' if order['filled'] else 'c')
+        return web.json_response({'id': order['id'], 'type': order['side'], 'time': order['time'], 'status': status,
+                                  'amount': _fmt(order['amount']), 'remains': _fmt(remains),
+                                  'price': _fmt(order['price'])})
+
+    async def _cancel_order(self, request):
+        params = await self.request_params(request)
+        if self.cancel_order(params.get('id')) is None:
+            return web.json_response({'error': 'Error: Order not found'})
+        return web.json_response(True)
+
+    def order_frames(self, conn: MockConnection, order: Dict) -> List:
+        if not conn.state.get('authenticated'):
+            return []
+        base, quote = split_symbol(order['symbol'])
+        quote = 'USD' if quote == 'USDT' else quote
+        pair = {'symbol1': base, 'symbol2': quote}
+        remains = order['amount'] - order['filled']
+        frames = [{'e': 'order', 'data': {'id': order['id'], 'remains': _fmt(order['amount']), 'pair': pair}}]
+        if order['filled']:
+            frames.append({'e': 'tx', 'data': {'id': str(self.market.next_trade_id()), 'order': order['id'],
+                                               'type': order['side'], 'symbol': base, 'symbol2': quote,
+                                               'amount': _fmt(order['filled']), 'price': _fmt(order['price']),
+                                               'fee_amount': _fmt(order['filled'] * order['price'] * 0.0025),
+                                               'time': _now_ms()}})
+        frames.append({'e': 'order', 'data': {'id': order['id'], 'remains': _fmt(remains), 'pair': pair,
+                                              **({'cancel': True} if remains else {})}})
+        return frames
+
+    async def _fees(self, request):
+        return web.json_response({'e': 'get_myfee', 'ok': 'ok', 'data': {
+            f'{base}:{quote}': {'buy': '0.25', 'sell': '0.25', 'buyMaker': '0.16', 'sellMaker': '0.16'}
+            for base, quote in self._native_pairs()
+        }})
+
+
+SERVERS = {'cex': MockCexServer, 'gate': MockGateServer, 'binance': MockBinanceServer}
+# Environment variables read by config.settings for each venue
+URL_ENV = {'cex': ('CEXIO_WS_URL', 'CEXIO_REST_URL'), 'gate': ('GATEIO_WS_URL', 'GATEIO_REST_URL'),
+           'binance': ('BINANCE_WS_URL', 'BINANCE_REST_URL')}
+
+
+class MockExchanges:
+    """All three mock venues over one shared market
+
+    profiles maps an exchange to its FeedProfile. Use as an async context
+    manager; configure() points CONFIG at the mocks for adapters created
+    afterwards in this process, env() gives the variables for other processes.
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, FeedProfile]] = None, market: Optional[MockMarket] = None,
+                 exchanges: Optional[List[str]] = None, host: str = '127.0.0.1'):
+        self.market = market or MockMarket()
+        profiles = profiles or {}
+        self.servers = {
+            name: SERVERS[name](profiles.get(name), self.market, host)
+            for name in (exchanges or SERVERS)
+        }
+
+    def __getitem__(self, name: str) -> MockExchangeServer:
+        return self.servers[name]
+
+    async def start(self):
+        await asyncio.gather(*(server.start() for server in self.servers.values()))
+        return self
+
+    async def stop(self):
+        await asyncio.gather(*(server.stop() for server in self.servers.values()), return_exceptions=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def env(self) -> Dict[str, str]:
+        env = {}
+        for name, server in self.servers.items():
+            ws_var, rest_var = URL_ENV[name]
+            env[ws_var] = server.ws_url
+            env[rest_var] = server.rest_url
+        return env
+
+    def configure(self):
+        for name, server in self.servers.items():
+            CONFIG['ws_urls'][name] = server.ws_url
+            CONFIG['rest_urls'][name] = server.rest_url
@@ -0,0 +1,254 @@
+import asyncio
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.logger import get_logger
+from .records import BookLevel
+from utils.symbols import registry
+
+logger = get_logger('order_book')
+
+
+class BookSide:
+    """One side of an L2 book kept as parallel sorted arrays.
+
+    Keys are stored ascending with the best level last, so the top of book is
+    an O(1) index and most updates (which land near the top) only shift a few
+    elements. Bids use the price as key and asks its negation.
+    """
+
+    __slots__ = ('sign', 'keys', 'sizes', 'max_depth')
+
+    def __init__(self, is_bid: bool, max_depth: Optional[int] = None):
+        self.sign = 1.0 if is_bid else -1.0
+        self.keys = []
+        self.sizes = []
+        self.max_depth = max_depth
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys.clear()
+        self.sizes.clear()
+
+    def load(self, levels):
+        """Replace the side with [[price, size], ...] levels in any order"""
+        sign = self.sign
+        pairs = sorted((sign * float(price), float(size)) for price, size in levels if float(size) > 0)
+        if self.max_depth and len(pairs) > self.max_depth:
+            pairs = pairs[-self.max_depth:]
+        self.keys = [key for key, _ in pairs]
+        self.sizes = [size for _, size in pairs]
+
+    def set(self, price: float, size: float):
+        """Set the size at a price level; a size of 0 removes the level"""
+        key = self.sign * price
+        keys = self.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if size > 0:
+                self.sizes[i] = size
+            else:
+                del keys[i]
+                del self.sizes[i]
+        elif size > 0:
+            keys.insert(i, key)
+            self.sizes.insert(i, size)
+            if self.max_depth and len(keys) > self.max_depth:
+                # Drop the worst level, which sits at the front
+                del keys[0]
+                del self.sizes[0]
+
+    def best(self) -> Optional[BookLevel]:
+        if not self.keys:
+            return None
+        return BookLevel(self.sign * self.keys[-1], self.sizes[-1])
+
+    def levels(self, n: Optional[int] = None):
+        """Yield (price, size) from the best level outwards"""
+        sign, keys, sizes = self.sign, self.keys, self.sizes
+        last = len(keys) - 1
+        stop = -1 if n is None else max(last - n, -1)
+        for i in range(last, stop, -1):
+            yield sign * keys[i], sizes[i]
+
+    def walk(self, quantity: float) -> Tuple[float, float]:
+        """Consume up to `quantity` from the top, returning (filled, notional)"""
+        filled = 0.0
+        notional = 0.0
+        for price, size in self.levels():
+            take = min(size, quantity - filled)
+            filled += take
+            notional += take * price
+            if filled >= quantity:
+                break
+        return filled, notional
+
+
+class OrderBook:
+    """Local L2 order book for one (exchange, symbol ID)"""
+
+    def __init__(self, exchange: str, symbol: int, max_depth: Optional[int] = None):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.bids = BookSide(True, max_depth)
+        self.asks = BookSide(False, max_depth)
+        self.last_update_id = None
+        self.is_synced = False
+
+    def apply_snapshot(self, bids, asks, update_id: Optional[int] = None):
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.last_update_id = update_id
+        self.is_synced = True
+
+    def apply_diff(self, bids, asks, first_id: Optional[int] = None, last_id: Optional[int] = None) -> bool:
+        """Apply a diff update, returning False if the book is out of sequence.
+
+        Diffs that end at or before the current update id are stale and are
+        skipped; a diff that starts after last_update_id + 1 means messages
+        were lost and the book needs a fresh snapshot.
+        """
+        if not self.is_synced:
+            return False
+        if last_id is not None and self.last_update_id is not None:
+            if last_id <= self.last_update_id:
+                return True
+            start = first_id if first_id is not None else last_id
+            if start > self.last_update_id + 1:
+                self.is_synced = False
+                return False
+        for price, size in bids:
+            self.bids.set(float(price), float(size))
+        for price, size in asks:
+            self.asks.set(float(price), float(size))
+        if last_id is not None:
+            self.last_update_id = last_id
+        return True
+
+    def invalidate(self):
+        """Drop the book contents, e.g. after the feed was interrupted"""
+        self.bids.clear()
+        self.asks.clear()
+        self.last_update_id = None
+        self.is_synced = False
+
+    def best_bid(self) -> Optional[BookLevel]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[BookLevel]:
+        return self.asks.best()
+
+    def top_of_book(self) -> Dict:
+        bid = self.bids.best()
+        ask = self.asks.best()
+        return {
+            'bid': bid[0] if bid else None,
+            'bid_size': bid[1] if bid else None,
+            'ask': ask[0] if ask else None,
+            'ask_size': ask[1] if ask else None
+        }
+
+
+class OrderBookManager:
+    """Owns the local books and resyncs them from REST snapshots on gaps
+
+    Books are keyed by symbol ID; every method also accepts the canonical
+    symbol name.
+    """
+
+    def __init__(self, max_depth: Optional[int] = None, symbols=None):
+        self.max_depth = max_depth
+        self.symbols = symbols if symbols is not None else registry
+        self.books = {}              # {(exchange, symbol_id): OrderBook}
+        self.snapshot_fetchers = {}  # {exchange: async fn(symbol_id) -> snapshot dict}
+        self._resyncing = {}         # {(exchange, symbol_id): [buffered diffs]}
+        self._resync_tasks = {}      # {(exchange, symbol_id): Task}
+
+    def register_snapshot_fetcher(self, exchange: str, fetcher: Callable):
+        self.snapshot_fetchers[exchange] = fetcher
+
+    def get_book(self, exchange: str, symbol) -> Optional[OrderBook]:
+        return self.books.get((exchange, self.symbols.id(symbol)))
+
+    def _book(self, exchange: str, symbol_id: int) -> OrderBook:
+        book = self.books.get((exchange, symbol_id))
+        if book is None:
+            book = self.books[(exchange, symbol_id)] = OrderBook(exchange, symbol_id, self.max_depth)
+        return book
+
+    def top_of_book(self, exchange: str, symbol) -> Optional[Dict]:
+        book = self.books.get((exchange, self.symbols.id(symbol)))
+        if book is None or not book.is_synced:
+            return None
+        return book.top_of_book()
+
+    def on_snapshot(self, exchange: str, symbol, bids, asks, update_id: Optional[int] = None):
+        self._book(exchange, self.symbols.id(symbol)).apply_snapshot(bids, asks, update_id)
+
+    def on_diff(self, exchange: str, symbol, bids, asks,
+                first_id: Optional[int] = None, last_id: Optional[int] = None):
+        symbol = self.symbols.id(symbol)
+        key = (exchange, symbol)
+        pending = self._resyncing.get(key)
+        if pending is not None:
+            pending.append((bids, asks, first_id, last_id))
+            return
+        book = self._book(exchange, symbol)
+        if not book.apply_diff(bids, asks, first_id, last_id):
+            if exchange in self.snapshot_fetchers:
+                self._resyncing[key] = [(bids, asks, first_id, last_id)]
+                self._start_resync(key)
+            else:
+                logger.warning("Order book gap on %s %s and no snapshot source", exchange, self.symbols.name(symbol))
+
+    def _start_resync(self, key):
+        # One resync per book; a gap seen while it is still running joins it
+        task = self._resync_tasks.get(key)
+        if task is None or task.done():
+            task = self._resync_tasks[key] = asyncio.create_task(self.resync(*key))
+            task.add_done_callback(lambda done: self._resync_done(key, done))
+        return task
+
+    def _resync_done(self, key, task: asyncio.Task):
+        if self._resync_tasks.get(key) is task:
+            del self._resync_tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to resync %s %s order book: %s", key[0], self.symbols.name(key[1]),
+                         task.exception())
+
+    async def close(self):
+        """Cancel the resyncs still in flight"""
+        tasks = list(self._resync_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._resync_tasks.clear()
+        self._resyncing.clear()
+
+    def invalidate_exchange(self, exchange: str):
+        for (book_exchange, _), book in self.books.items():
+            if book_exchange == exchange:
+                book.invalidate()
+
+    async def resync(self, exchange: str, symbol):
+        """Reload a book from a REST snapshot and replay the diffs buffered meanwhile"""
+        symbol = self.symbols.id(symbol)
+        key = (exchange, symbol)
+        self._resyncing.setdefault(key, [])
+        try:
+            snapshot = await self.snapshot_fetchers[exchange](symbol)
+            if 'error' in snapshot:
+                logger.error("Failed to resync %s %s order book: %s", exchange, self.symbols.name(symbol),
+                             snapshot['error'])
+                return False
+            book = self._book(exchange, symbol)
+            book.apply_snapshot(snapshot['bids'], snapshot['asks'], snapshot.get('update_id'))
+            for bids, asks, first_id, last_id in self._resyncing[key]:
+                if not book.apply_diff(bids, asks, first_id, last_id):
+                    logger.warning("Order book for %s %s still out of sequence after resync",
+                                   exchange, self.symbols.name(symbol))
+                    return False
+            return True
+        finally:
+            self._resyncing.pop(key, None)
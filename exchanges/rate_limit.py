@@ -0,0 +1,181 @@
+import asyncio
+import bisect
+import itertools
+import time
+from typing import Dict, Mapping, Optional
+from config.settings import CONFIG
+from utils.logger import get_logger
+
+logger = get_logger('rate_limit')
+
+# Request priorities, lowest value first. Cancels and unwinds close risk, so
+# they go ahead of new orders; fee and metadata refreshes can always wait.
+PRIORITY_URGENT = 0
+PRIORITY_ORDER = 1
+PRIORITY_SNAPSHOT = 2
+PRIORITY_REFRESH = 3
+
+# Cost of a request that names none: (public, signed)
+DEFAULT_COSTS = {
+    'cex': ({'requests': 1}, {'requests': 1}),
+    'gate': ({'public': 1}, {'private': 1}),
+    'binance': ({'weight': 1}, {'weight': 1})
+}
+
+# Response headers reporting usage: header -> (bucket, meaning). A bucket of
+# None applies the header to the buckets the request itself was charged to.
+USAGE_HEADERS = {
+    'cex': {},
+    'gate': {'X-Gate-RateLimit-Requests-Remain': (None, 'remaining')},
+    'binance': {'X-MBX-USED-WEIGHT-1M': ('weight', 'used'), 'X-MBX-ORDER-COUNT-10S': ('orders', 'used')}
+}
+
+
+def binance_depth_weight(limit: int) -> int:
+    """Request weight of GET /api/v3/depth for a given limit"""
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+class TokenBucket:
+    """capacity tokens, refilled continuously over period seconds"""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount tokens are available (after refill())"""
+        # A request larger than the bucket waits for a full bucket instead of forever
+        missing = min(amount, self.capacity) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+
+class RateLimiter:
+    """Token buckets for one exchange's REST limits, granted in priority order
+
+    CONFIG['rate_limits'][exchange] maps a bucket name to (limit, period
+    seconds); buckets are sized at CONFIG['rate_limit_headroom'] of the
+    published limit. acquire() charges a request's cost, e.g. {'weight': 5},
+    and waits in a queue ordered by (priority, arrival) until every bucket it
+    needs can pay. A waiting request only holds back lower priority requests
+    that need one of the same buckets. observe() lowers the buckets to the
+    usage the exchange reports, and pause() stops all grants after a 429.
+    """
+
+    def __init__(self, exchange: str, limits: Optional[Mapping] = None, headroom: Optional[float] = None):
+        self.exchange = exchange
+        self.headroom = headroom or CONFIG['rate_limit_headroom']
+        limits = limits if limits is not None else CONFIG['rate_limits'].get(exchange, {})
+        self.buckets = {name: TokenBucket(limit * self.headroom, period) for name, (limit, period) in limits.items()}
+        self.default_costs = DEFAULT_COSTS.get(exchange, ({}, {}))
+        self.usage_headers = USAGE_HEADERS.get(exchange, {})
+        self.paused_until = 0.0
+        self.granted = 0
+        self.queued = 0  # requests that had to wait
+        self._waiters = []  # sorted [(priority, seq, cost, future)]
+        self._seq = itertools.count()
+        self._timer = None
+
+    def default_cost(self, signed: bool = False) -> Dict[str, float]:
+        return self.default_costs[1 if signed else 0]
+
+    async def acquire(self, cost: Optional[Mapping[str, float]] = None, priority: int = PRIORITY_REFRESH):
+        """Wait until the request may be sent, charging its cost to the buckets"""
+        cost = {name: amount for name, amount in (cost or {}).items() if name in self.buckets}
+        now = time.monotonic()
+        if not self._waiters and now >= self.paused_until and self._affordable(cost, now):
+            self._charge(cost)
+            return
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self._seq), cost, future)
+        bisect.insort(self._waiters, waiter, key=lambda w: w[:2])
+        self.queued += 1
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._schedule()
+            raise
+
+    def observe(self, headers: Mapping[str, str], cost: Optional[Mapping[str, float]] = None):
+        """Lower the buckets to the usage reported in response headers"""
+        for header, (bucket, meaning) in self.usage_headers.items():
+            value = headers.get(header)
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                continue
+            for name in ([bucket] if bucket else list(cost or ())):
+                state = self.buckets.get(name)
+                if state is None:
+                    continue
+                # Usage counts against the published limit, our buckets keep headroom below it
+                if meaning == 'used':
+                    available = state.capacity - value
+                else:
+                    available = value - (state.capacity / self.headroom - state.capacity)
+                state.tokens = min(state.tokens, available)
+
+    def pause(self, seconds: float):
+        """Grant nothing for the next seconds, e.g. after HTTP 429 with Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        logger.warning('%s REST requests paused for %.1fs after hitting a rate limit', self.exchange, seconds)
+        if self._waiters:
+            self._schedule()
+
+    def _affordable(self, cost: Mapping[str, float], now: float) -> bool:
+        for name, amount in cost.items():
+            bucket = self.buckets[name]
+            bucket.refill(now)
+            if bucket.wait_time(amount) > 0:
+                return False
+        return True
+
+    def _charge(self, cost: Mapping[str, float]):
+        for name, amount in cost.items():
+            self.buckets[name].tokens -= amount
+        self.granted += 1
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        if now < self.paused_until:
+            delay = self.paused_until - now
+        else:
+            delay = None
+            blocked = set()
+            for waiter in list(self._waiters):
+                cost, future = waiter[2], waiter[3]
+                if future.done():
+                    self._waiters.remove(waiter)
+                    continue
+                if blocked.intersection(cost):
+                    continue
+                if self._affordable(cost, now):
+                    self._charge(cost)
+                    self._waiters.remove(waiter)
+                    future.set_result(None)
+                    continue
+                blocked.update(cost)
+                wait = max(self.buckets[name].wait_time(amount) for name, amount in cost.items())
+                delay = wait if delay is None else min(delay, wait)
+        if self._waiters and delay is not None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._schedule)
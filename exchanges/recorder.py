@@ -0,0 +1,141 @@
+import glob
+import gzip
+import heapq
+import itertools
+import os
+import queue
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+from config.settings import CONFIG
+from utils.logger import get_logger
+
+logger = get_logger('recorder')
+
+SEGMENT_SUFFIX = '.frames.gz'
+
+Frame = Tuple[float, str, str]  # (receive wall time, exchange, raw message)
+
+
+class FrameRecorder:
+    """Append-only capture of raw WebSocket frames into gzip segments
+
+    record() only formats a line and queues it; a background thread
+    compresses and writes, so the feed never waits on the disk. Each line is
+    "<receive time> <exchange> <raw frame>". A new segment file
+    (<prefix>-<first receive ms>.frames.gz) is started every
+    CONFIG['recorder_segment_seconds'] of receive time, and closed segments
+    are never touched again.
+    """
+
+    def __init__(self, directory: Optional[str] = None, prefix: str = 'frames',
+                 segment_seconds: Optional[float] = None, compresslevel: Optional[int] = None):
+        self.directory = directory or CONFIG['recorder_dir']
+        self.prefix = prefix
+        self.segment_seconds = segment_seconds or CONFIG['recorder_segment_seconds']
+        self.compresslevel = compresslevel or CONFIG['recorder_compresslevel']
+        self.frames = 0
+        self.segments = []
+        os.makedirs(self.directory, exist_ok=True)
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name='frame-recorder', daemon=True)
+        self._thread.start()
+
+    def record(self, exchange: str, recv_time: float, message):
+        """Queue one raw frame as received"""
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', 'replace')
+        # Newlines can only be insignificant whitespace in a JSON frame
+        self._queue.put((recv_time, f"{recv_time:.6f} {exchange} {message.replace(chr(10), ' ')}\n"))
+        self.frames += 1
+
+    def _write_loop(self):
+        segment = None
+        segment_end = 0.0
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Write whatever piled up in one go
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            stop = False
+            for entry in batch:
+                if entry is None:
+                    stop = True
+                    break
+                recv_time, line = entry
+                if segment is None or recv_time >= segment_end:
+                    if lines:
+                        segment.write(''.join(lines))
+                        lines = []
+                    if segment is not None:
+                        segment.close()
+                    segment = self._open_segment(recv_time)
+                    segment_end = recv_time + self.segment_seconds
+                lines.append(line)
+            if lines:
+                segment.write(''.join(lines))
+            if stop:
+                if segment is not None:
+                    segment.close()
+                return
+
+    def _open_segment(self, start: float):
+        path = os.path.join(self.directory, f"{self.prefix}-{int(start * 1000)}{SEGMENT_SUFFIX}")
+        self.segments.append(path)
+        logger.info("Recording frames to %s", path)
+        return gzip.open(path, 'at', compresslevel=self.compresslevel, encoding='utf-8')
+
+    def close(self):
+        """Flush queued frames and close the current segment"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+def read_segment(path: str) -> Iterator[Frame]:
+    """Yield the frames of one segment, stopping cleanly at a truncated tail"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as segment:
+            for line in segment:
+                recv_time, exchange, message = line.rstrip('\n').split(' ', 2)
+                yield float(recv_time), exchange, message
+    except (EOFError, gzip.BadGzipFile, ValueError) as e:
+        # The recorder was killed mid-write; everything before is usable
+        logger.warning("Segment %s ends early: %s", path, e)
+
+
+def find_segments(paths: Iterable[str]) -> List[str]:
+    """Expand directories and globs into segment files"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(glob.glob(os.path.join(path, f'*{SEGMENT_SUFFIX}')))
+        else:
+            found.extend(glob.glob(path) or [path])
+    return found
+
+
+def read_frames(paths: Iterable[str]) -> Iterator[Frame]:
+    """Frames from all segments in receive order
+
+    Segments of one recorder (same prefix) are read one after the other;
+    recorders running in different processes are merged by receive time.
+    """
+    chains = {}
+    for path in find_segments(paths):
+        prefix = os.path.basename(path).rsplit('-', 1)[0]
+        chains.setdefault(prefix, []).append(path)
+    streams = [
+        itertools.chain.from_iterable(read_segment(path) for path in sorted(chain, key=_segment_start))
+        for chain in chains.values()
+    ]
+    return heapq.merge(*streams, key=lambda frame: frame[0])
+
+
+def _segment_start(path: str) -> int:
+    name = os.path.basename(path)[:-len(SEGMENT_SUFFIX)]
+    return int(name.rsplit('-', 1)[1])
@@ -0,0 +1,109 @@
+from typing import Dict, NamedTuple, Optional
+
+
+class Quote:
+    """Normalized ticker for one (exchange, symbol ID), built once at parse time
+
+    Prices and sizes are floats (None when the venue doesn't send them);
+    exchange_ts is the venue's event time in ms, recv_ts/recv_mono the
+    local wall clock and monotonic receive time of the frame.
+    """
+    __slots__ = ('exchange', 'symbol', 'bid', 'ask', 'last', 'bid_size', 'ask_size',
+                 'exchange_ts', 'recv_ts', 'recv_mono')
+
+    def __init__(self, exchange: str, symbol: int, bid: Optional[float], ask: Optional[float],
+                 last: Optional[float], bid_size: Optional[float] = None, ask_size: Optional[float] = None,
+                 exchange_ts: Optional[float] = None, recv_ts: Optional[float] = None,
+                 recv_mono: Optional[float] = None):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.bid = bid
+        self.ask = ask
+        self.last = last
+        self.bid_size = bid_size
+        self.ask_size = ask_size
+        self.exchange_ts = exchange_ts
+        self.recv_ts = recv_ts
+        self.recv_mono = recv_mono
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return isinstance(other, Quote) and all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __repr__(self):
+        return (f"Quote({self.exchange}, {self.symbol}, bid={self.bid}, ask={self.ask}, "
+                f"last={self.last}, exchange_ts={self.exchange_ts})")
+
+
+class Trade:
+    """Normalized public trade"""
+    __slots__ = ('exchange', 'symbol', 'price', 'size', 'side', 'trade_id', 'exchange_ts', 'recv_ts')
+
+    def __init__(self, exchange: str, symbol: int, price: float, size: float, side: Optional[str] = None,
+                 trade_id=None, exchange_ts: Optional[float] = None, recv_ts: Optional[float] = None):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.price = price
+        self.size = size
+        self.side = side  # taker side, 'buy' or 'sell'
+        self.trade_id = trade_id
+        self.exchange_ts = exchange_ts
+        self.recv_ts = recv_ts
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Trade({self.exchange}, {self.symbol}, {self.side} {self.size}@{self.price})"
+
+
+class OrderUpdate:
+    """Normalized state of one of our own orders from a private stream
+
+    status is one of 'new', 'partially_filled', 'filled', 'cancelled',
+    'rejected' or 'expired'. filled and avg_price are cumulative; fields a
+    venue's event doesn't carry are None (CEX.IO only sends what remains).
+    """
+    __slots__ = ('exchange', 'order_id', 'symbol', 'side', 'status', 'amount', 'filled', 'remaining',
+                 'price', 'avg_price', 'fee', 'fee_asset', 'client_id', 'exchange_ts', 'recv_ts')
+
+    def __init__(self, exchange: str, order_id: str, status: str, symbol: Optional[str] = None,
+                 side: Optional[str] = None, amount: Optional[float] = None, filled: Optional[float] = None,
+                 remaining: Optional[float] = None, price: Optional[float] = None,
+                 avg_price: Optional[float] = None, fee: Optional[float] = None, fee_asset: Optional[str] = None,
+                 client_id: Optional[str] = None, exchange_ts: Optional[float] = None,
+                 recv_ts: Optional[float] = None):
+        self.exchange = exchange
+        self.order_id = order_id
+        self.status = status
+        self.symbol = symbol
+        self.side = side
+        self.amount = amount
+        self.filled = filled
+        self.remaining = remaining
+        self.price = price
+        self.avg_price = avg_price
+        self.fee = fee
+        self.fee_asset = fee_asset
+        self.client_id = client_id
+        self.exchange_ts = exchange_ts
+        self.recv_ts = recv_ts
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return (f"OrderUpdate({self.exchange}, {self.order_id}, {self.status}, "
+                f"{self.side} {self.filled}/{self.amount} {self.symbol})")
+
+
+class BookLevel(NamedTuple):
+    """One price level; unpacks and compares like a (price, size) tuple"""
+    price: float
+    size: float
+
+
+def to_float(value) -> Optional[float]:
+    return None if value is None or value == '' else float(value)
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+from .recorder import Frame
+from utils.logger import get_logger
+
+logger = get_logger('replay')
+
+# Yield to the event loop every this many frames at max speed, so queued
+# subscribers and other tasks keep running
+MAX_SPEED_YIELD = 256
+
+
+def connect_engine(manager, engine):
+    """Feed a manager's ticks, bulk frames and gaps into an ArbitrageEngine, as main.py does"""
+    manager.register_price_callback(lambda exchange, symbol, quote: engine.update_price(exchange, symbol, quote.last))
+    manager.register_bulk_callback(engine.update_rows)
+    manager.register_gap_callback(engine.invalidate_exchange)
+
+
+class FrameReplayer:
+    """Plays recorded frames through a WebSocketManager without a network
+
+    Each frame goes to its adapter's handle_message(), exactly as listen()
+    would have delivered it, with the recorded receive time as the frame's
+    last_recv. speed is a multiple of real time; None (or 0) replays as fast
+    as the handlers allow.
+    """
+
+    def __init__(self, manager, speed: Optional[float] = 1.0):
+        self.manager = manager
+        self.speed = speed or None
+        self.frames = 0
+        self.skipped = 0
+        manager.register_handlers()
+
+    async def run(self, frames: Iterable[Frame]) -> Dict:
+        """Replay frames (e.g. read_frames(paths)) and return throughput stats"""
+        adapters = self.manager.exchanges
+        speed = self.speed
+        first = None
+        started = time.monotonic()
+        for recv_time, exchange, message in frames:
+            adapter = adapters.get(exchange)
+            if adapter is None:
+                self.skipped += 1
+                continue
+            if first is None:
+                first = recv_time
+            if speed is not None:
+                delay = started + (recv_time - first) / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self.frames % MAX_SPEED_YIELD == 0:
+                await asyncio.sleep(0)
+            adapter.last_recv = (recv_time, time.monotonic())
+            await adapter.handle_message(message)
+            self.frames += 1
+        elapsed = time.monotonic() - started
+        stats = {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'elapsed': elapsed,
+            'frames_per_sec': self.frames / elapsed if elapsed > 0 else 0.0
+        }
+        logger.info("Replayed %s frames in %.2fs (%.0f/s)", self.frames, elapsed, stats['frames_per_sec'])
+        return stats
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+import aiohttp
+from yarl import URL
+from config.settings import CONFIG
+from .rate_limit import RateLimiter, PRIORITY_REFRESH
+from utils.logger import get_logger
+
+logger = get_logger('rest')
+
+# Cheap public endpoint per exchange, used to open connections ahead of use
+WARM_UP_PATHS = {
+    'cex': '/api/currency_limits',
+    'gate': '/api/v4/spot/time',
+    'binance': '/api/v3/ping'
+}
+
+
+class HmacSigner:
+    """HMAC whose key is absorbed once; every signature starts from a copy of that state"""
+
+    def __init__(self, secret: str, digestmod):
+        self._keyed = hmac.new(secret.encode(), digestmod=digestmod)
+
+    def sign(self, payload: str) -> str:
+        mac = self._keyed.copy()
+        mac.update(payload.encode())
+        return mac.hexdigest()
+
+
+class BinanceAuth:
+    """timestamp + HMAC-SHA256 signature over the query string, key in X-MBX-APIKEY"""
+
+    def __init__(self, api_key: str, api_secret: str):
+        self.api_key = api_key
+        self.signer = HmacSigner(api_secret, hashlib.sha256)
+
+    def sign(self, method: str, path: str, query: str, body: str) -> Tuple[str, str, Dict[str, str]]:
+        query = f"{query}&timestamp={int(time.time() * 1000)}" if query else f"timestamp={int(time.time() * 1000)}"
+        # Signed parameters all travel in the query string, the body stays empty
+        return f"{query}&signature={self.signer.sign(query + body)}", body, {'X-MBX-APIKEY': self.api_key}
+
+
+class GateAuth:
+    """APIv4 headers: HMAC-SHA512 over method, path, query, body hash and timestamp"""
+
+    def __init__(self, api_key: str, api_secret: str):
+        self.api_key = api_key
+        self.signer = HmacSigner(api_secret, hashlib.sha512)
+
+    def sign(self, method: str, path: str, query: str, body: str) -> Tuple[str, str, Dict[str, str]]:
+        timestamp = str(int(time.time()))
+        payload_hash = hashlib.sha512(body.encode()).hexdigest()
+        signature = self.signer.sign(f"{method}\n{path}\n{query}\n{payload_hash}\n{timestamp}")
+        return query, body, {'KEY': self.api_key, 'Timestamp': timestamp, 'SIGN': signature}
+
+
+class CexAuth:
+    """key, nonce and upper-case HMAC-SHA256 of nonce + user ID + key added to the parameters"""
+
+    def __init__(self, api_key: str, api_secret: str, user_id: str = ''):
+        self.api_key = api_key
+        self.user_id = user_id
+        self.signer = HmacSigner(api_secret, hashlib.sha256)
+
+    def sign(self, method: str, path: str, query: str, body: str) -> Tuple[str, str, Dict[str, str]]:
+        nonce = str(int(time.time() * 1000))
+        auth = {'key': self.api_key, 'nonce': nonce,
+                'signature': self.signer.sign(nonce + self.user_id + self.api_key).upper()}
+        if method == 'GET':
+            extra = urlencode(auth)
+            return f"{query}&{extra}" if query else extra, body, {}
+        return query, json.dumps({**(json.loads(body) if body else {}), **auth}), {}
+
+
+def auth_from_env(exchange: str):
+    """Signer for the exchange's API credentials, or None when they are not set"""
+    if exchange == 'binance':
+        api_key, api_secret = os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET')
+        return BinanceAuth(api_key, api_secret) if api_key and api_secret else None
+    if exchange == 'gate':
+        api_key, api_secret = os.getenv('GATEIO_API_KEY'), os.getenv('GATEIO_API_SECRET')
+        return GateAuth(api_key, api_secret) if api_key and api_secret else None
+    if exchange == 'cex':
+        api_key, api_secret = os.getenv('CEXIO_API_KEY'), os.getenv('CEXIO_API_SECRET')
+        return CexAuth(api_key, api_secret, os.getenv('CEXIO_USER_ID', '')) if api_key and api_secret else None
+    return None
+
+
+def _retry_after(headers) -> float:
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return CONFIG['rate_limit_backoff']
+
+
+class RestClient:
+    """One exchange's REST API over a long-lived pooled session
+
+    The session keeps up to CONFIG['rest_pool_size'] keep-alive connections
+    and caches DNS answers, so after warm_up() requests skip the DNS, TCP and
+    TLS setup. The base URL is read from CONFIG['rest_urls'] on every request
+    unless one is given. A session belongs to the event loop that opened it
+    and is reopened if used from another one. Every request first waits its
+    turn in the exchange's RateLimiter; requests rejected with 429/418 pause
+    the limiter and are queued again rather than failed.
+    """
+
+    def __init__(self, exchange: str, auth=None, base_url: Optional[str] = None,
+                 limiter: Optional[RateLimiter] = None):
+        self.exchange = exchange
+        self.auth = auth
+        self.base_url = base_url
+        self.limiter = limiter or RateLimiter(exchange)
+        self.requests = 0
+        self._session = None
+        self._loop = None
+
+    @property
+    def url(self) -> str:
+        return self.base_url or CONFIG['rest_urls'][self.exchange]
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=CONFIG['rest_pool_size'], ttl_dns_cache=CONFIG['rest_dns_ttl'],
+                                             keepalive_timeout=CONFIG['rest_keepalive'])
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=CONFIG['rest_timeout']))
+            self._loop = loop
+        return self._session
+
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                      body: Optional[Dict[str, Any]] = None, signed: bool = False,
+                      cost: Optional[Dict[str, float]] = None, priority: int = PRIORITY_REFRESH,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, Any]:
+        """Send one request; returns (HTTP status, decoded JSON or text body)
+
+        cost is what the request charges to the rate limit buckets, e.g.
+        {'weight': 5}; by default one unit of the exchange's public or
+        private bucket. headers are sent as given on top of any signature.
+        """
+        if signed and self.auth is None:
+            raise RuntimeError(f"No API credentials for {self.exchange}")
+        if cost is None:
+            cost = self.limiter.default_cost(signed)
+        query = urlencode(params or {})
+        data = json.dumps(body) if body is not None else ''
+        retries = CONFIG['rate_limit_retries']
+        for attempt in range(retries + 1):
+            await self.limiter.acquire(cost, priority)
+            # Sign after queueing so the timestamp is fresh when the request goes out
+            request_headers = dict(headers or {})
+            signed_query, signed_data = query, data
+            if signed:
+                signed_query, signed_data, auth_headers = self.auth.sign(method, path, query, data)
+                request_headers.update(auth_headers)
+            if signed_data:
+                request_headers['Content-Type'] = 'application/json'
+            url = URL(f"{self.url}{path}?{signed_query}" if signed_query else f"{self.url}{path}", encoded=True)
+            async with self.session.request(method, url, data=signed_data or None, headers=request_headers) as resp:
+                self.requests += 1
+                self.limiter.observe(resp.headers, cost)
+                if resp.status in (418, 429) and attempt < retries:
+                    self.limiter.pause(_retry_after(resp.headers))
+                    continue
+                try:
+                    payload = await resp.json(content_type=None)
+                except ValueError:
+                    payload = await resp.text()
+                return resp.status, payload
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None, signed: bool = False,
+                  cost: Optional[Dict[str, float]] = None, priority: int = PRIORITY_REFRESH) -> Tuple[int, Any]:
+        return await self.request('GET', path, params, signed=signed, cost=cost, priority=priority)
+
+    async def post(self, path: str, params: Optional[Dict[str, Any]] = None, body: Optional[Dict[str, Any]] = None,
+                   signed: bool = False, cost: Optional[Dict[str, float]] = None,
+                   priority: int = PRIORITY_REFRESH, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Any]:
+        return await self.request('POST', path, params, body, signed=signed, cost=cost, priority=priority,
+                                  headers=headers)
+
+    async def put(self, path: str, params: Optional[Dict[str, Any]] = None, signed: bool = False,
+                  cost: Optional[Dict[str, float]] = None, priority: int = PRIORITY_REFRESH,
+                  headers: Optional[Dict[str, str]] = None) -> Tuple[int, Any]:
+        return await self.request('PUT', path, params, signed=signed, cost=cost, priority=priority, headers=headers)
+
+    async def delete(self, path: str, params: Optional[Dict[str, Any]] = None, signed: bool = False,
+                     cost: Optional[Dict[str, float]] = None, priority: int = PRIORITY_REFRESH) -> Tuple[int, Any]:
+        return await self.request('DELETE', path, params, signed=signed, cost=cost, priority=priority)
+
+    async def warm_up(self, connections: Optional[int] = None) -> int:
+        """Open connections with concurrent cheap requests; returns how many succeeded"""
+        count = connections or CONFIG['rest_warm_connections']
+        results = await asyncio.gather(*(self.get(WARM_UP_PATHS[self.exchange]) for _ in range(count)),
+                                       return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning('Warm-up of %s REST connections failed: %s', self.exchange, failed[0])
+        return count - len(failed)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            if self._loop is asyncio.get_running_loop():
+                await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+_clients: Dict[str, RestClient] = {}
+
+
+def get_client(exchange: str) -> RestClient:
+    """The process-wide client for an exchange"""
+    client = _clients.get(exchange)
+    if client is None:
+        client = _clients[exchange] = RestClient(exchange)
+    if client.auth is None:
+        client.auth = auth_from_env(exchange)
+    return client
+
+
+async def warm_up(exchanges: Iterable[str] = ('cex', 'gate', 'binance')) -> Dict[str, int]:
+    """Warm every exchange's pool at once; returns open connections per exchange"""
+    exchanges = list(exchanges)
+    counts = await asyncio.gather(*(get_client(name).warm_up() for name in exchanges))
+    return dict(zip(exchanges, counts))
+
+
+async def keep_warm(exchanges: Iterable[str] = ('cex', 'gate', 'binance'), interval: Optional[float] = None):
+    """Re-warm the pools periodically so idle connections are not dropped by the exchanges"""
+    interval = interval or CONFIG['rest_keep_warm_interval']
+    while True:
+        await asyncio.sleep(interval)
+        await warm_up(exchanges)
+
+
+async def close_clients():
+    for client in _clients.values():
+        await client.close()
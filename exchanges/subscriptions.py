@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Iterable, List, Tuple
+
+
+class Pacer:
+    """Spaces out outgoing messages to at most `rate` per second"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next_send = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            delay = self._next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_send = max(self._next_send, time.monotonic()) + 1 / self.rate
+
+
+def chunks(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SubscriptionManager:
+    """Batched, paced and diff-based subscriptions for one exchange adapter
+
+    The adapter turns (event, channel, pairs, params) into protocol messages
+    through build_subscription_messages(), packing as many pairs per message
+    as the channel allows. Active topics are tracked per (channel, params) so
+    subscribe/unsubscribe only send the difference, and replay() restores
+    everything after a reconnect.
+    """
+
+    def __init__(self, adapter, rate: float, batch_size: int):
+        self.adapter = adapter
+        self.pacer = Pacer(rate)
+        self.batch_size = batch_size
+        self.active = {}  # {(channel, params): [pairs]}
+
+    def pairs(self, channel: str, params: Tuple = ()) -> List[str]:
+        return list(self.active.get((channel, params), []))
+
+    def __len__(self):
+        return sum(len(pairs) for pairs in self.active.values())
+
+    async def _send(self, event: str, channel: str, pairs: List[str], params: Tuple):
+        for message in self.adapter.build_subscription_messages(event, channel, pairs, params, self.batch_size):
+            await self.pacer.wait()
+            await self.adapter.send_message(message)
+
+    async def subscribe(self, channel: str, pairs: List[str], params: Tuple = ()) -> List[str]:
+        """Subscribe to the pairs not subscribed yet, returning them"""
+        active = self.active.setdefault((channel, params), [])
+        new = [pair for pair in dict.fromkeys(pairs) if pair not in active]
+        if new:
+            # Record first so a reconnect mid-send replays them
+            active.extend(new)
+            await self._send('subscribe', channel, new, params)
+        return new
+
+    async def unsubscribe(self, channel: str, pairs: List[str], params: Tuple = ()) -> List[str]:
+        """Unsubscribe from the given pairs that are active, returning them"""
+        active = self.active.get((channel, params), [])
+        removed = [pair for pair in dict.fromkeys(pairs) if pair in active]
+        if removed:
+            self.active[(channel, params)] = [pair for pair in active if pair not in removed]
+            await self._send('unsubscribe', channel, removed, params)
+        return removed
+
+    async def set(self, channel: str, pairs: List[str], params: Tuple = ()) -> Tuple[List[str], List[str]]:
+        """Make `pairs` the exact subscription set of a channel"""
+        wanted = set(pairs)
+        removed = await self.unsubscribe(channel, [p for p in self.pairs(channel, params) if p not in wanted], params)
+        added = await self.subscribe(channel, pairs, params)
+        return added, removed
+
+    async def replay(self) -> int:
+        """Resend every active subscription, batched, after a reconnect"""
+        for (channel, params), pairs in self.active.items():
+            if pairs:
+                await self._send('subscribe', channel, pairs, params)
+        return len(self)
@@ -0,0 +1,366 @@
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+import websockets
+from config.settings import CONFIG
+from . import binance, cex, gate
+from .rate_limit import PRIORITY_ORDER
+from .records import OrderUpdate, to_float
+from .rest import RestClient, get_client
+from .websocket_manager import reconnect_with_backoff
+from utils.logger import get_logger
+from utils.symbols import normalize_symbol, registry
+
+logger = get_logger('user_streams')
+
+BINANCE_STATUSES = {
+    'NEW': 'new',
+    'PARTIALLY_FILLED': 'partially_filled',
+    'FILLED': 'filled',
+    'CANCELED': 'cancelled',
+    'PENDING_CANCEL': 'new',
+    'REJECTED': 'rejected',
+    'EXPIRED': 'expired',
+    'EXPIRED_IN_MATCH': 'expired'
+}
+# Gate.io finish_as of a 'finish' order event
+GATE_FINISHES = {'filled': 'filled', 'cancelled': 'cancelled', 'ioc': 'expired', 'stp': 'cancelled'}
+
+
+class UserStream(ABC):
+    """Authenticated private feed of one exchange, applied to an OrderStore
+
+    run() connects, authenticates and subscribes, then applies every order
+    event until stop(), reconnecting with the market data supervisor's
+    backoff (see websocket_manager.reconnect_with_backoff). On every connect,
+    the first included, the orders still open in the store are fetched once
+    over REST, for events missed while no stream was up. Subclasses
+    implement open(), handle() and fetch_order().
+    """
+
+    name = None
+
+    def __init__(self, store, client: Optional[RestClient] = None):
+        self.store = store
+        self.client = client or get_client(self.name)
+        self.websocket = None
+        self.is_connected = False
+        self.events = 0
+        self.reconnects = 0
+        self.task = None
+        self._reconcile = None
+        self._stopped = False
+
+    @property
+    def ws_url(self) -> str:
+        return CONFIG['ws_urls'][self.name]
+
+    @abstractmethod
+    async def open(self):
+        """Connect, authenticate and subscribe to the private channels"""
+
+    @abstractmethod
+    async def handle(self, data, recv_time: float):
+        """Apply one decoded message to the store"""
+
+    @abstractmethod
+    async def fetch_order(self, order: OrderUpdate) -> Optional[OrderUpdate]:
+        """Current state of an order over REST, or None if it cannot be fetched"""
+
+    async def reconcile(self):
+        for order in self.store.open_orders(self.name):
+            try:
+                update = await self.fetch_order(order)
+            except Exception as e:
+                logger.warning("Could not fetch %s order %s: %s", self.name, order.order_id, e)
+                continue
+            if update is not None:
+                self._apply(update)
+
+    async def connect(self) -> bool:
+        try:
+            await self.open()
+        except Exception as e:
+            logger.warning("%s user data stream could not connect: %s", self.name, e)
+            await self.close()
+            return False
+        self.is_connected = True
+        logger.info("%s user data stream connected", self.name)
+        self._reconcile = asyncio.create_task(self.reconcile())
+        return True
+
+    async def listen(self):
+        try:
+            async for message in self.websocket:
+                recv_time = time.time()
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError:
+                    continue
+                await self.handle(data, recv_time)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("%s user data stream dropped: %s", self.name, e)
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._reconcile is not None:
+            self._reconcile.cancel()
+            self._reconcile = None
+        if self.websocket is not None:
+            await self.websocket.close()
+        self.is_connected = False
+
+    async def run(self):
+        connected = await self.connect()
+        while not self._stopped:
+            if connected:
+                await self.listen()
+            if self._stopped:
+                break
+            connected = await reconnect_with_backoff(self.name, self.connect, lambda: self._stopped)
+            if not connected:
+                if not self._stopped:
+                    logger.warning("Giving up on %s user data stream after %s reconnect attempts", self.name,
+                                   CONFIG['max_reconnect_attempts'])
+                break
+            self.reconnects += 1
+
+    def start(self) -> asyncio.Task:
+        self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def stop(self):
+        self._stopped = True
+        await self.close()
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def _apply(self, update: OrderUpdate):
+        self.events += 1
+        self.store.apply(update)
+
+
+class BinanceUserStream(UserStream):
+    """User data stream on a listenKey, kept alive with a PUT every CONFIG['listen_key_keepalive'] seconds"""
+
+    name = 'binance'
+
+    def __init__(self, store, client: Optional[RestClient] = None):
+        super().__init__(store, client)
+        self.listen_key = None
+        self._keepalive = None
+
+    def _key_headers(self) -> Dict[str, str]:
+        if self.client.auth is None:
+            raise RuntimeError("No API credentials for binance")
+        return {'X-MBX-APIKEY': self.client.auth.api_key}
+
+    async def open(self):
+        status, data = await self.client.post('/api/v3/userDataStream', headers=self._key_headers(),
+                                              cost={'weight': 2}, priority=PRIORITY_ORDER)
+        if status != 200:
+            raise RuntimeError(f"listenKey request failed: HTTP {status} {data}")
+        self.listen_key = data['listenKey']
+        self.websocket = await websockets.connect(f"{self.ws_url}{self.listen_key}")
+        self._keepalive = asyncio.create_task(self._keep_alive(self.listen_key))
+
+    async def _keep_alive(self, listen_key: str):
+        while True:
+            await asyncio.sleep(CONFIG['listen_key_keepalive'])
+            try:
+                status, data = await self.client.put('/api/v3/userDataStream', {'listenKey': listen_key},
+                                                     headers=self._key_headers(), cost={'weight': 2},
+                                                     priority=PRIORITY_ORDER)
+            except Exception as e:
+                logger.warning("listenKey keepalive failed: %s", e)
+                continue
+            if status != 200:
+                # The key is gone; reconnecting fetches a new one
+                logger.warning("listenKey keepalive rejected: HTTP %s %s", status, data)
+                if self.websocket is not None:
+                    await self.websocket.close()
+                return
+
+    async def close(self):
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            self._keepalive = None
+        await super().close()
+
+    async def handle(self, data, recv_time: float):
+        event = data.get('e') if isinstance(data, dict) else None
+        if event == 'executionReport':
+            self._apply(parse_binance_execution(data, recv_time))
+        elif event == 'listenKeyExpired':
+            logger.warning("Binance listenKey expired, reconnecting")
+            await self.websocket.close()
+
+    async def fetch_order(self, order: OrderUpdate) -> Optional[OrderUpdate]:
+        if order.symbol is None:
+            return None
+        data = await binance.get_order_status(registry.native('binance', order.symbol), order.order_id)
+        return None if 'error' in data else parse_binance_order(data, time.time())
+
+
+def parse_binance_execution(data: Dict, recv_time: Optional[float] = None) -> OrderUpdate:
+    filled = float(data['z'])
+    quote = to_float(data.get('Z'))
+    return OrderUpdate('binance', str(data['i']), BINANCE_STATUSES.get(data['X'], 'new'), symbol=data['s'],
+                       side=data['S'].lower(), amount=to_float(data.get('q')), filled=filled,
+                       price=to_float(data.get('p')), avg_price=quote / filled if quote and filled else None,
+                       fee=to_float(data.get('n')), fee_asset=data.get('N'), client_id=data.get('c'),
+                       exchange_ts=data.get('E'), recv_ts=recv_time)
+
+
+def parse_binance_order(data: Dict, recv_time: Optional[float] = None) -> OrderUpdate:
+    # REST order fields under their executionReport names
+    return parse_binance_execution({'i': data['orderId'], 'X': data['status'], 's': data['symbol'],
+                                    'S': data['side'], 'q': data['origQty'], 'z': data['executedQty'],
+                                    'Z': data.get('cummulativeQuoteQty'), 'p': data.get('price'),
+                                    'c': data.get('clientOrderId'), 'E': data.get('transactTime')}, recv_time)
+
+
+class GateUserStream(UserStream):
+    """spot.orders and spot.usertrades for all pairs, subscribed with signed requests"""
+
+    name = 'gate'
+    CHANNELS = ('spot.orders', 'spot.usertrades')
+
+    def _subscription(self, channel: str) -> Dict:
+        auth = self.client.auth
+        if auth is None:
+            raise RuntimeError("No API credentials for gate")
+        now = int(time.time())
+        signature = auth.signer.sign(f"channel={channel}&event=subscribe&time={now}")
+        return {'time': now, 'channel': channel, 'event': 'subscribe', 'payload': ['!all'],
+                'auth': {'method': 'api_key', 'KEY': auth.api_key, 'SIGN': signature}}
+
+    async def open(self):
+        self.websocket = await websockets.connect(self.ws_url)
+        for channel in self.CHANNELS:
+            await self.websocket.send(json.dumps(self._subscription(channel)))
+
+    async def handle(self, data, recv_time: float):
+        if not isinstance(data, dict) or data.get('event') != 'update':
+            if isinstance(data, dict) and data.get('error'):
+                logger.error("Gate.io private subscription failed: %s", data['error'])
+            return
+        channel = data.get('channel')
+        result = data.get('result') or []
+        if channel == 'spot.orders':
+            for order in result:
+                self._apply(parse_gate_order(order, recv_time))
+        elif channel == 'spot.usertrades':
+            for trade in result:
+                self.events += 1
+                self.store.apply_fill('gate', trade['order_id'], trade['id'], float(trade['amount']),
+                                      float(trade['price']), fee=to_float(trade.get('fee')),
+                                      fee_asset=trade.get('fee_currency'),
+                                      symbol=normalize_symbol('gate', trade['currency_pair']),
+                                      side=trade.get('side'), client_id=trade.get('text'),
+                                      exchange_ts=to_float(trade.get('create_time_ms')))
+
+    async def fetch_order(self, order: OrderUpdate) -> Optional[OrderUpdate]:
+        if order.symbol is None:
+            return None
+        data = await gate.get_order_status(registry.native('gate', order.symbol), order.order_id)
+        return None if 'error' in data else parse_gate_order(data, time.time())
+
+
+def parse_gate_order(data: Dict, recv_time: Optional[float] = None) -> OrderUpdate:
+    amount = float(data['amount'])
+    left = float(data['left'])
+    # Stream events say 'finish'; REST orders have status 'closed' or 'cancelled'
+    if data.get('event') == 'finish' or data.get('status') in ('closed', 'cancelled'):
+        status = GATE_FINISHES.get(data.get('finish_as'), 'filled' if data.get('status') == 'closed' else 'cancelled')
+    else:
+        status = 'partially_filled' if left < amount else 'new'
+    filled = amount - left
+    quote = to_float(data.get('filled_total'))
+    return OrderUpdate('gate', str(data['id']), status, symbol=normalize_symbol('gate', data['currency_pair']),
+                       side=data.get('side'), amount=amount, filled=filled, remaining=left,
+                       price=to_float(data.get('price')),
+                       avg_price=to_float(data.get('avg_deal_price')) or (quote / filled if quote and filled else None),
+                       fee=to_float(data.get('fee')), fee_asset=data.get('fee_currency'), client_id=data.get('text'),
+                       exchange_ts=to_float(data.get('update_time_ms')), recv_ts=recv_time)
+
+
+class CexUserStream(UserStream):
+    """Authenticated CEX.IO connection: 'order' events for our orders and 'tx' events for fills"""
+
+    name = 'cex'
+
+    async def open(self):
+        auth = self.client.auth
+        if auth is None:
+            raise RuntimeError("No API credentials for cex")
+        self.websocket = await websockets.connect(self.ws_url)
+        timestamp = int(time.time())
+        signature = auth.signer.sign(f"{timestamp}{auth.api_key}")
+        await self.websocket.send(json.dumps({'e': 'auth', 'auth': {'key': auth.api_key, 'signature': signature,
+                                                                    'timestamp': timestamp}}))
+
+    async def handle(self, data, recv_time: float):
+        event = data.get('e') if isinstance(data, dict) else None
+        if event == 'ping':
+            await self.websocket.send(json.dumps({'e': 'pong'}))
+        elif event == 'auth' and data.get('ok') != 'ok':
+            logger.error("CEX.IO authentication failed: %s", data.get('data'))
+        elif event == 'order':
+            self._apply(parse_cex_order(data['data'], recv_time))
+        elif event == 'tx':
+            tx = data['data']
+            if tx.get('order') and tx.get('price'):
+                self.events += 1
+                self.store.apply_fill('cex', tx['order'], tx['id'], float(tx['amount']), float(tx['price']),
+                                      fee=to_float(tx.get('fee_amount')),
+                                      symbol=normalize_symbol('cex', f"{tx['symbol']}:{tx['symbol2']}"),
+                                      side=tx.get('type'))
+
+    async def fetch_order(self, order: OrderUpdate) -> Optional[OrderUpdate]:
+        data = await cex.get_order_status(order.order_id)
+        return None if 'error' in data else parse_cex_rest_order(data, time.time())
+
+
+def parse_cex_order(data: Dict, recv_time: Optional[float] = None) -> OrderUpdate:
+    remains = to_float(data.get('remains'))
+    if data.get('cancel'):
+        status = 'cancelled'
+    elif remains == 0:
+        status = 'filled'
+    else:
+        status = 'new'  # the store works out partial fills from the amount it tracked
+    pair = data.get('pair')
+    symbol = normalize_symbol('cex', f"{pair['symbol1']}:{pair['symbol2']}") if pair else None
+    return OrderUpdate('cex', str(data['id']), status, symbol=symbol, remaining=remains, recv_ts=recv_time)
+
+
+def parse_cex_rest_order(data: Dict, recv_time: Optional[float] = None) -> OrderUpdate:
+    # place_order replies with 'pending', get_order with 'remains' and a status:
+    # 'd' done, 'c' cancelled, 'cd' cancelled after a partial fill, 'a' active
+    update = parse_cex_order({'id': data['id'], 'remains': data.get('remains', data.get('pending')),
+                              'cancel': data.get('status') in ('c', 'cd')}, recv_time)
+    update.amount = to_float(data.get('amount'))
+    return update
+
+
+USER_STREAMS = {'cex': CexUserStream, 'gate': GateUserStream, 'binance': BinanceUserStream}
+
+
+def start_user_streams(store, exchanges: Iterable[str] = ('cex', 'gate', 'binance')) -> List[UserStream]:
+    """Run the private stream of every exchange with API credentials"""
+    streams = []
+    for name in exchanges:
+        if get_client(name).auth is None:
+            logger.info("No %s API credentials, user data stream not started", name)
+            continue
+        stream = USER_STREAMS[name](store)
+        stream.start()
+        streams.append(stream)
+    return streams
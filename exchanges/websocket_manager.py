@@ -1,26 +1,115 @@
 import asyncio
 import json
+import random
 import time
-from typing import Dict, List, Optional, Callable
+import numpy as np
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from .cex import CEXIOWebSocket
 from .gate import GateIOWebSocket
-from .binance import BinanceWebSocket
+from .binance_pool import BinanceStreamPool
+from . import cex, gate, binance
+from .order_book import OrderBookManager
+from .market_table import MarketTable
+from .records import Quote, Trade, to_float
+from .workers import ExchangeWorker, TICK, BULK, SNAPSHOT, DIFF, GAP, RTT, STATS, TRADE as TRADE_RECORD
+from utils.symbols import registry, load_symbol_registry
+from config.settings import CONFIG
+from utils.latency import LatencyHistogram, RollingHistogram
+from utils import event_bus as events
+from utils.logger import get_logger
+
+logger = get_logger('websocket_manager')
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff in seconds with equal jitter"""
+    base = CONFIG['reconnect_delay'] / 1000
+    delay = min(base * 2 ** (attempt - 1), CONFIG['max_reconnect_delay'] / 1000)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def reconnect_with_backoff(name: str, connect: Callable[[], Awaitable[bool]],
+                                 stopping: Callable[[], bool]) -> bool:
+    """Retry connect() after backoff_delay() until it returns True
+
+    Gives up (returns False) after CONFIG['max_reconnect_attempts'] failed
+    attempts, or as soon as stopping() is true. Exceptions count as failures.
+    """
+    for attempt in range(1, CONFIG['max_reconnect_attempts'] + 1):
+        delay = backoff_delay(attempt)
+        logger.warning("Reconnecting to %s in %.1fs (attempt %s)", name, delay, attempt)
+        await asyncio.sleep(delay)
+        if stopping():
+            return False
+        try:
+            if await connect():
+                return True
+        except Exception as e:
+            logger.error("Error reconnecting to %s: %s", name, e)
+    return False
 
 class WebSocketManager:
-    def __init__(self):
+    def __init__(self, symbols=None, exchanges: Optional[List[str]] = None, workers: Optional[bool] = None):
+        """exchanges limits the manager to some venues; with workers (default
+        CONFIG['exchange_workers']) each venue's feed runs in its own process
+        and this manager only applies the records the workers send back.
+        """
+        # Symbol state below is keyed by registry ID; callbacks get canonical names
+        self.symbols = symbols if symbols is not None else registry
         self.cex = CEXIOWebSocket()
         self.gate = GateIOWebSocket()
-        self.binance = BinanceWebSocket()
+        # Combined-stream connections sharded by load
+        self.binance = BinanceStreamPool()
         self.exchanges = {
             'cex': self.cex,
             'gate': self.gate,
             'binance': self.binance
         }
+        if exchanges is not None:
+            self.exchanges = {name: self.exchanges[name] for name in exchanges}
+        if workers is None:
+            workers = CONFIG['exchange_workers']
+        self.workers = {name: ExchangeWorker(name) for name in self.exchanges} if workers else {}
+        self._worker_stats = {}
         self.price_data = {}
-        self.callbacks = {}
+        # 'price', 'bulk' and 'gap' events, each with any number of subscribers
+        self.bus = events.EventBus()
+        self.order_books = OrderBookManager(symbols=self.symbols)
+        # Whole-market quotes from bulk ticker streams
+        self.market_tables = {'binance': MarketTable('binance', self.symbols)}
+        # Optional SharedPriceTable that other processes read top of book from
+        self.price_table = None
+        self.connection_status = {
+            name: {'connected': False, 'reconnects': 0, 'last_gap': None}
+            for name in self.exchanges
+        }
+        self.rtt = {name: RollingHistogram(CONFIG['rtt_window']) for name in self.exchanges}
+        # Exchange event time -> local receive time, per exchange and per (exchange, symbol)
+        self.feed_latency = {name: LatencyHistogram() for name in self.exchanges}
+        self.symbol_feed_latency = {}
+        self._pong_events = {}
+        self._stopping = False
+        self._symbols_loaded = False
+        for name, module in (('cex', cex), ('gate', gate), ('binance', binance)):
+            self.order_books.register_snapshot_fetcher(name, self._snapshot_fetcher(name, module))
         
     async def connect_all(self):
-        """Connect to all exchanges"""
+        """Connect to all exchanges
+        
+        The symbol registry is filled from the exchanges' market listings
+        first, so later subscriptions and ticks resolve with one lookup.
+        """
+        if self.workers:
+            # Workers load their own venue's symbols and connect themselves
+            for worker in self.workers.values():
+                if not worker.is_alive:
+                    worker.start()
+            return
+        
+        if not self._symbols_loaded:
+            await load_symbol_registry(self.symbols, list(self.exchanges))
+            self._symbols_loaded = True
+        
         tasks = []
         for name, exchange in self.exchanges.items():
             task = asyncio.create_task(self._connect_exchange(name, exchange))
@@ -30,9 +119,9 @@ class WebSocketManager:
         
         for name, result in zip(self.exchanges.keys(), results):
             if isinstance(result, Exception):
-                print(f"Failed to connect to {name}: {result}")
+                logger.error("Failed to connect to %s: %s", name, result)
             else:
-                print(f"Successfully connected to {name}")
+                logger.info("Successfully connected to %s", name)
     
     async def _connect_exchange(self, name: str, exchange):
         """Connect to a specific exchange"""
@@ -44,137 +133,524 @@ class WebSocketManager:
                 await exchange.authenticate()
             return True
         except Exception as e:
-            print(f"Error connecting to {name}: {e}")
+            logger.error("Error connecting to %s: %s", name, e)
             return False
     
     async def subscribe_to_tickers(self, pairs: Dict[str, List[str]]):
         """Subscribe to ticker data for all exchanges"""
+        if self.workers:
+            return self._command_workers('subscribe_to_tickers', pairs)
         tasks = []
         
-        # CEX.IO pairs (format: BTC:USD)
+        # Native formats: CEX.IO BTC:USD, Gate.io BTC_USDT, Binance BTCUSDT
         if 'cex' in pairs:
-            cex_pairs = [pair.replace('USDT', 'USD') for pair in pairs['cex']]
+            cex_pairs = [self.native_symbol('cex', pair) for pair in pairs['cex']]
             tasks.append(self.cex.subscribe_to_ticker(cex_pairs))
         
-        # Gate.io pairs (format: BTC_USDT)
         if 'gate' in pairs:
-            gate_pairs = [pair.replace('USDT', '_USDT') for pair in pairs['gate']]
+            gate_pairs = [self.native_symbol('gate', pair) for pair in pairs['gate']]
             tasks.append(self.gate.subscribe_to_ticker(gate_pairs))
         
-        # Binance pairs (format: BTCUSDT)
         if 'binance' in pairs:
-            tasks.append(self.binance.subscribe_to_ticker(pairs['binance']))
+            binance_pairs = [self.native_symbol('binance', pair) for pair in pairs['binance']]
+            tasks.append(self.binance.subscribe_to_ticker(binance_pairs))
         
         await asyncio.gather(*tasks, return_exceptions=True)
     
     async def subscribe_to_orderbooks(self, pairs: Dict[str, List[str]]):
-        """Subscribe to orderbook data for all exchanges"""
+        """Subscribe to orderbook data for all exchanges
+        
+        Gate.io and Binance use their diff streams, which feed the local
+        order books in self.order_books together with REST snapshots.
+        """
+        if self.workers:
+            return self._command_workers('subscribe_to_orderbooks', pairs)
         tasks = []
         
         if 'cex' in pairs:
-            cex_pairs = [pair.replace('USDT', 'USD') for pair in pairs['cex']]
+            cex_pairs = [self.native_symbol('cex', pair) for pair in pairs['cex']]
             tasks.append(self.cex.subscribe_to_orderbook(cex_pairs))
         
         if 'gate' in pairs:
-            gate_pairs = [pair.replace('USDT', '_USDT') for pair in pairs['gate']]
-            tasks.append(self.gate.subscribe_to_orderbook(gate_pairs))
+            gate_pairs = [self.native_symbol('gate', pair) for pair in pairs['gate']]
+            tasks.append(self.gate.subscribe_to_orderbook_updates(gate_pairs))
         
         if 'binance' in pairs:
-            tasks.append(self.binance.subscribe_to_orderbook(pairs['binance']))
+            binance_pairs = [self.native_symbol('binance', pair) for pair in pairs['binance']]
+            tasks.append(self.binance.subscribe_to_orderbook(binance_pairs, depth=""))
         
         await asyncio.gather(*tasks, return_exceptions=True)
     
     async def subscribe_to_trades(self, pairs: Dict[str, List[str]]):
         """Subscribe to trade data for all exchanges"""
+        if self.workers:
+            return self._command_workers('subscribe_to_trades', pairs)
         tasks = []
         
         if 'cex' in pairs:
-            cex_pairs = [pair.replace('USDT', 'USD') for pair in pairs['cex']]
+            cex_pairs = [self.native_symbol('cex', pair) for pair in pairs['cex']]
             tasks.append(self.cex.subscribe_to_trades(cex_pairs))
         
         if 'gate' in pairs:
-            gate_pairs = [pair.replace('USDT', '_USDT') for pair in pairs['gate']]
+            gate_pairs = [self.native_symbol('gate', pair) for pair in pairs['gate']]
             tasks.append(self.gate.subscribe_to_trades(gate_pairs))
         
         if 'binance' in pairs:
-            tasks.append(self.binance.subscribe_to_trades(pairs['binance']))
+            binance_pairs = [self.native_symbol('binance', pair) for pair in pairs['binance']]
+            tasks.append(self.binance.subscribe_to_trades(binance_pairs))
+        
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def subscribe_to_all_market_tickers(self):
+        """Subscribe to Binance's !ticker@arr stream, ingested into market_tables['binance']"""
+        if self.workers:
+            return self.workers['binance'].command('subscribe_to_all_market_tickers')
+        await self.binance.subscribe_to_all_market_tickers()
+    
+    async def set_pairs(self, kind: str, pairs: Dict[str, List[str]]):
+        """Change 'ticker', 'orderbook' or 'trades' subscriptions at runtime
         
+        Each listed exchange is brought to exactly the given pairs: only the
+        added and removed pairs are sent, on the live connections.
+        """
+        if self.workers:
+            return self._command_workers('set_pairs', pairs, kind)
+        tasks = []
+        for name, symbols in pairs.items():
+            native = [self.native_symbol(name, symbol) for symbol in symbols]
+            tasks.append(self.exchanges[name].set_pairs(kind, native))
         await asyncio.gather(*tasks, return_exceptions=True)
     
-    def register_price_callback(self, callback: Callable):
-        """Register callback for price updates"""
-        self.price_callback = callback
+    def _command_workers(self, method: str, pairs: Dict[str, List[str]], *args):
+        """Forward a subscription call to each listed exchange's worker"""
+        for name, symbols in pairs.items():
+            if name in self.workers:
+                self.workers[name].command(method, *args, {name: list(symbols)})
+    
+    def native_symbol(self, exchange: str, symbol) -> str:
+        """Convert a BTCUSDT style symbol (or its ID) to the exchange's own format"""
+        return self.symbols.native(exchange, symbol)
+    
+    def _snapshot_fetcher(self, exchange: str, module):
+        """Wrap an exchange's REST snapshot call to take symbol IDs"""
+        async def fetch(symbol: str):
+            return await module.get_orderbook_snapshot(self.native_symbol(exchange, symbol))
+        return fetch
+    
+    def set_price_table(self, table):
+        """Publish every quote into a SharedPriceTable for out-of-process readers"""
+        self.price_table = table
     
-    async def handle_price_update(self, exchange: str, symbol: str, price_data: Dict):
-        """Handle price updates from any exchange"""
-        if not hasattr(self, 'price_callback'):
+    def set_recorder(self, recorder):
+        """Capture every raw frame of every exchange with a FrameRecorder
+        
+        In worker mode each worker process records its own exchange instead
+        (see CONFIG['recorder_dir']), since a recorder can't cross processes.
+        """
+        if self.workers:
+            logger.warning("Frames are recorded by the exchange workers; set RECORD_FRAMES_DIR instead")
             return
+        for adapter in self.exchanges.values():
+            adapter.recorder = recorder
+    
+    def register_price_callback(self, callback: Callable, queue_size: Optional[int] = None):
+        """Add a callback(exchange, symbol, quote) for price updates
         
-        # Normalize symbol format
-        normalized_symbol = symbol.replace('_', '').replace(':', '')
+        Callbacks run inline unless queue_size is given, in which case the
+        callback gets its own queue and can't hold up the feed.
+        """
+        return self.bus.subscribe(events.PRICE, lambda event: callback(event.exchange, event.symbol, event.quote),
+                                  queue_size, getattr(callback, '__qualname__', None))
+    
+    def register_trade_callback(self, callback: Callable, queue_size: Optional[int] = None):
+        """Add a callback(trade) for public trades (Trade records)"""
+        return self.bus.subscribe(events.TRADE, callback, queue_size, getattr(callback, '__qualname__', None))
+    
+    def _recv_time(self, exchange: str) -> Tuple[float, float]:
+        """(wall, monotonic) receive time of the frame being handled"""
+        return self.exchanges[exchange].last_recv or (time.time(), time.monotonic())
+    
+    def _quote(self, exchange: str, native: str, bid, ask, last, bid_size=None, ask_size=None,
+               exchange_ts: Optional[float] = None) -> Quote:
+        """Build the Quote record for a ticker message, parsing prices once"""
+        recv_wall, recv_mono = self._recv_time(exchange)
+        return Quote(exchange, self.symbols.resolve(exchange, native), to_float(bid), to_float(ask),
+                     to_float(last), to_float(bid_size), to_float(ask_size), exchange_ts, recv_wall, recv_mono)
+    
+    async def handle_price_update(self, quote: Quote):
+        """Store a quote from any exchange and hand it to the price subscribers
         
-        if normalized_symbol not in self.price_data:
-            self.price_data[normalized_symbol] = {}
+        The quote's exchange event time (ms), if the venue sends one, is
+        paired with its local receive time to track feed latency.
+        """
+        exchange, symbol_id = quote.exchange, quote.symbol
+        prices = self.price_data.get(symbol_id)
+        if prices is None:
+            prices = self.price_data[symbol_id] = {}
+        prices[exchange] = quote
+        if quote.exchange_ts is not None:
+            self._record_feed_latency(exchange, symbol_id, quote.recv_ts * 1000 - quote.exchange_ts)
+        if self.price_table is not None:
+            self.price_table.publish(exchange, symbol_id, quote.bid, quote.ask, quote.last,
+                                     quote.exchange_ts, quote.recv_ts)
         
-        self.price_data[normalized_symbol][exchange] = price_data
+        if not self.bus.has_subscribers(events.PRICE):
+            return
         
-        # Call the registered callback
-        await self.price_callback(exchange, normalized_symbol, price_data)
+        # One event object, shared by every subscriber
+        await self.bus.publish(events.PRICE, events.PriceEvent(exchange, self.symbols.names[symbol_id], quote))
     
-    async def start_listening(self):
-        """Start listening to all exchanges"""
-        tasks = []
+    def _record_feed_latency(self, exchange: str, symbol: int, latency_ms: float):
+        self.feed_latency[exchange].record(latency_ms)
+        histogram = self.symbol_feed_latency.get((exchange, symbol))
+        if histogram is None:
+            histogram = self.symbol_feed_latency[(exchange, symbol)] = LatencyHistogram()
+        histogram.record(latency_ms)
+    
+    def get_feed_latency_stats(self, per_symbol: bool = False) -> Dict:
+        """Exchange-to-local latency percentiles (ms) per exchange, or per (exchange, symbol)"""
+        if per_symbol:
+            return {f"{exchange}:{self.symbols.names[symbol]}": histogram.summary()
+                    for (exchange, symbol), histogram in self.symbol_feed_latency.items()}
+        return {name: histogram.summary() for name, histogram in self.feed_latency.items()}
+    
+    def register_bulk_callback(self, callback: Callable):
+        """Register callback(exchange, rows, prices) for bulk ticker frames
         
-        # Set up message handlers for each exchange
+        rows are the symbol IDs whose quote changed in the frame and prices
+        their last prices, both as arrays; it is called once per frame.
+        """
+        return self.bus.subscribe(events.BULK, lambda event: callback(event.exchange, event.rows, event.prices),
+                                  name=getattr(callback, '__qualname__', None))
+    
+    def register_gap_callback(self, callback: Callable):
+        """Register callback(exchange) invoked when a feed drops and its data is invalidated"""
+        return self.bus.subscribe(events.GAP, lambda event: callback(event.exchange),
+                                  name=getattr(callback, '__qualname__', None))
+    
+    def register_handlers(self):
+        """Set up message handlers for each exchange"""
         for name, exchange in self.exchanges.items():
             if name == 'cex':
                 exchange.register_callback('tick', lambda data: self._handle_cex_tick(data))
+                for event_type in ('order_book', 'order-book-subscribe', 'md_update'):
+                    exchange.register_callback(event_type, lambda data: self._handle_cex_orderbook(data))
             elif name == 'gate':
                 exchange.register_callback('spot.tickers', lambda data: self._handle_gate_tick(data))
+                exchange.register_callback('spot.trades', lambda data: self._handle_gate_trade(data))
+                for channel in ('spot.order_book', 'spot.order_book_update'):
+                    exchange.register_callback(channel, lambda data: self._handle_gate_orderbook(data))
             elif name == 'binance':
                 exchange.register_callback('ticker', lambda data: self._handle_binance_tick(data))
+                exchange.register_callback('trade', lambda data: self._handle_binance_trade(data))
+                exchange.register_callback('depth', lambda data: self._handle_binance_orderbook(data))
+                for kind in ('tickerArray', 'miniTickerArray'):
+                    exchange.register_callback(kind, lambda data: self._handle_binance_ticker_array(data))
             
-            # Start listening
-            task = asyncio.create_task(exchange.listen())
+            exchange.register_callback('pong', lambda data, name=name: self._handle_pong(name, data))
+    
+    async def start_listening(self):
+        """Start listening to all exchanges"""
+        self._stopping = False
+        if self.workers:
+            await asyncio.gather(*(self._run_worker(name, worker) for name, worker in self.workers.items()),
+                                 return_exceptions=True)
+            return
+        self.register_handlers()
+        
+        # Each exchange runs under a supervisor that reconnects dropped feeds
+        tasks = []
+        heartbeats = []
+        for name, exchange in self.exchanges.items():
+            task = asyncio.create_task(self._supervise(name, exchange))
             tasks.append(task)
+            heartbeats.append(asyncio.create_task(self._heartbeat(name, exchange)))
         
         # Wait for all listening tasks
         await asyncio.gather(*tasks, return_exceptions=True)
+        for heartbeat in heartbeats:
+            heartbeat.cancel()
+    
+    async def _run_worker(self, name: str, worker: ExchangeWorker):
+        """Apply a worker's records, restarting the process if it dies"""
+        attempt = 0
+        while not self._stopping:
+            if not worker.is_alive:
+                worker.start()
+            async for batch in worker.records():
+                attempt = 0
+                for record in batch:
+                    try:
+                        await self._apply_record(record)
+                    except Exception as e:
+                        logger.error("Error applying %s record: %s", name, e)
+            if self._stopping:
+                break
+            attempt += 1
+            logger.warning("%s feed worker exited, restarting", name)
+            self._mark_gap(name)
+            worker.stop()
+            await asyncio.sleep(backoff_delay(attempt))
+    
+    async def _apply_record(self, record: tuple):
+        """Apply one record from an exchange worker (see exchanges.workers)"""
+        tag, name = record[0], record[1]
+        status = self.connection_status[name]
+        if not status['connected'] and tag != GAP:
+            status['connected'] = True
+            if status['last_gap'] is not None:
+                status['reconnects'] += 1
+        if tag == TICK:
+            _, _, symbol, bid, ask, last, bid_size, ask_size, exchange_ts, recv_wall, recv_mono = record
+            await self.handle_price_update(Quote(name, self.symbols.id(symbol), bid, ask, last, bid_size, ask_size,
+                                                 exchange_ts, recv_wall, recv_mono))
+        elif tag == TRADE_RECORD:
+            _, _, symbol, price, size, side, trade_id, exchange_ts, recv_wall = record
+            self.bus.publish_nowait(events.TRADE, Trade(name, self.symbols.id(symbol), price, size, side,
+                                                        trade_id, exchange_ts, recv_wall))
+        elif tag == BULK:
+            _, _, symbols, last, bid, ask, event_time, recv_wall = record
+            table = self.market_tables.get(name)
+            if table is None:
+                table = self.market_tables[name] = MarketTable(name, self.symbols)
+            rows = np.array([self.symbols.id(symbol) for symbol in symbols], dtype=np.intp)
+            rows = table.update(rows, np.array(last), np.array(bid), np.array(ask), np.array(event_time))
+            if event_time:
+                self.feed_latency[name].record(recv_wall * 1000 - max(event_time))
+            self._publish_rows(name, table, rows, recv_wall)
+        elif tag == SNAPSHOT:
+            _, _, symbol, bids, asks, update_id = record
+            self.order_books.on_snapshot(name, symbol, bids, asks, update_id)
+        elif tag == DIFF:
+            _, _, symbol, bids, asks, first_id, last_id = record
+            self.order_books.on_diff(name, symbol, bids, asks, first_id, last_id)
+        elif tag == GAP:
+            self._mark_gap(name)
+        elif tag == RTT:
+            self.rtt[name].record(record[2])
+        elif tag == STATS:
+            self._worker_stats[name] = record[2]
+    
+    async def _supervise(self, name: str, exchange):
+        """Keep an exchange feed alive, reconnecting whenever listen() returns"""
+        while not self._stopping:
+            self.connection_status[name]['connected'] = exchange.is_connected
+            await exchange.listen()
+            if self._stopping:
+                break
+            self._mark_gap(name)
+            if not await self._reconnect(name, exchange):
+                logger.warning("Giving up on %s after %s reconnect attempts", name, CONFIG['max_reconnect_attempts'])
+                break
+    
+    async def _reconnect(self, name: str, exchange) -> bool:
+        """Reconnect, re-authenticate and replay subscriptions"""
+        async def connect() -> bool:
+            if not await exchange.connect():
+                return False
+            if name in ('cex', 'gate'):
+                await exchange.authenticate()
+            await exchange.resubscribe()
+            return True
+        if not await reconnect_with_backoff(name, connect, lambda: self._stopping):
+            return False
+        self.connection_status[name]['reconnects'] += 1
+        return True
+    
+    async def _heartbeat(self, name: str, exchange):
+        """Ping an exchange on a fixed interval and record the round-trip time
+        
+        A pong that doesn't arrive within CONFIG['pong_timeout'] is treated as
+        a dead connection: the socket is closed so the supervisor reconnects.
+        """
+        while not self._stopping:
+            await asyncio.sleep(CONFIG['heartbeat_interval'])
+            if not exchange.is_connected:
+                continue
+            pong = asyncio.Event()
+            self._pong_events[name] = pong
+            sent_at = time.monotonic()
+            try:
+                await exchange.ping()
+                await asyncio.wait_for(pong.wait(), CONFIG['pong_timeout'])
+            except asyncio.TimeoutError:
+                logger.warning("Missed pong from %s, treating connection as dead", name)
+                await exchange.disconnect()
+                continue
+            except Exception as e:
+                logger.error("Error pinging %s: %s", name, e)
+                continue
+            finally:
+                self._pong_events.pop(name, None)
+            self.rtt[name].record((time.monotonic() - sent_at) * 1000)
+    
+    async def _handle_pong(self, name: str, data: Dict):
+        pong = self._pong_events.get(name)
+        if pong is not None:
+            pong.set()
+    
+    def get_rtt_stats(self) -> Dict:
+        """Round-trip time summary (ms) per exchange"""
+        return {name: histogram.summary() for name, histogram in self.rtt.items()}
+    
+    def get_venue_latency(self, exchange: str) -> Optional[float]:
+        """Median heartbeat round-trip time (ms) for an exchange, if measured"""
+        histogram = self.rtt.get(exchange)
+        return histogram.percentile(50) if histogram else None
+    
+    def get_ingress_stats(self) -> Dict:
+        """Ingress queue depth, conflation and drop counters per exchange"""
+        if self.workers:
+            return {name: self._worker_stats.get(name, {}) for name in self.workers}
+        return {name: exchange.ingress.stats() for name, exchange in self.exchanges.items()}
+    
+    def _mark_gap(self, name: str):
+        """Invalidate everything derived from a feed that just dropped"""
+        logger.warning("%s feed interrupted, invalidating cached prices and order books", name)
+        status = self.connection_status[name]
+        status['connected'] = False
+        status['last_gap'] = time.time()
+        self.order_books.invalidate_exchange(name)
+        if name in self.market_tables:
+            self.market_tables[name].invalidate()
+        if self.price_table is not None:
+            self.price_table.invalidate_exchange(name)
+        for prices in self.price_data.values():
+            prices.pop(name, None)
+        self.bus.publish_nowait(events.GAP, events.GapEvent(name))
     
     async def _handle_cex_tick(self, data: Dict):
         """Handle CEX.IO ticker data"""
         if 'data' in data and 'pair' in data['data']:
-            symbol = data['data']['pair']
-            await self.handle_price_update('cex', symbol, data['data'])
+            # CEX.IO ticks carry no event time
+            tick = data['data']
+            await self.handle_price_update(self._quote(
+                'cex', tick['pair'], tick.get('bid'), tick.get('ask'), tick.get('last', tick.get('price'))
+            ))
     
     async def _handle_gate_tick(self, data: Dict):
         """Handle Gate.io ticker data"""
         if 'result' in data and 'currency_pair' in data['result']:
-            symbol = data['result']['currency_pair']
-            await self.handle_price_update('gate', symbol, data['result'])
+            result = data['result']
+            exchange_ts = data.get('time_ms')
+            if exchange_ts is None and 'time' in data:
+                exchange_ts = data['time'] * 1000
+            await self.handle_price_update(self._quote(
+                'gate', result['currency_pair'], result.get('highest_bid'), result.get('lowest_ask'),
+                result.get('last'), exchange_ts=exchange_ts
+            ))
     
     async def _handle_binance_tick(self, data: Dict):
         """Handle Binance ticker data"""
         if 's' in data:  # Symbol
-            symbol = data['s']
-            await self.handle_price_update('binance', symbol, data)
+            await self.handle_price_update(self._quote(
+                'binance', data['s'], data.get('b'), data.get('a'), data.get('c'),
+                data.get('B'), data.get('A'), data.get('E')
+            ))
+    
+    async def _handle_gate_trade(self, data: Dict):
+        """Publish Gate.io spot.trades updates as Trade records"""
+        result = data.get('result')
+        if data.get('event') != 'update' or not isinstance(result, dict) or not self.bus.has_subscribers(events.TRADE):
+            return
+        self.bus.publish_nowait(events.TRADE, Trade(
+            'gate', self.symbols.resolve('gate', result['currency_pair']), float(result['price']),
+            float(result['amount']), result.get('side'), result.get('id'),
+            to_float(result.get('create_time_ms')), self._recv_time('gate')[0]
+        ))
+    
+    async def _handle_binance_trade(self, data: Dict):
+        """Publish Binance trade events as Trade records"""
+        if 's' not in data or not self.bus.has_subscribers(events.TRADE):
+            return
+        # m: the buyer was the maker, so the taker sold
+        self.bus.publish_nowait(events.TRADE, Trade(
+            'binance', self.symbols.resolve('binance', data['s']), float(data['p']), float(data['q']),
+            'sell' if data.get('m') else 'buy', data.get('t'), data.get('T', data.get('E')),
+            self._recv_time('binance')[0]
+        ))
+    
+    async def _handle_binance_ticker_array(self, data: List):
+        """Write an all-market ticker frame into the market table in one pass"""
+        if not data:
+            return
+        table = self.market_tables['binance']
+        rows = table.ingest_binance_tickers(data)
+        recv = self.binance.last_recv
+        recv_wall = recv[0] if recv else time.time()
+        if 'E' in data[0]:
+            # One latency sample per frame; every entry shares the event time
+            self.feed_latency['binance'].record(recv_wall * 1000 - data[0]['E'])
+        self._publish_rows('binance', table, rows, recv_wall)
+    
+    def _publish_rows(self, exchange: str, table: MarketTable, rows: np.ndarray, recv_wall: float):
+        """Hand the rows a bulk frame changed to the price table and bulk callbacks"""
+        if not len(rows):
+            return
+        if self.price_table is not None:
+            for row in rows.tolist():
+                self.price_table.publish(
+                    exchange, row, float(table.bid[row]), float(table.ask[row]), float(table.last[row]),
+                    float(table.event_time[row]), recv_wall
+                )
+        self.bus.publish_nowait(events.BULK, events.BulkEvent(exchange, rows, table.last[rows]))
+    
+    async def _handle_cex_orderbook(self, data: Dict):
+        """Feed CEX.IO order book snapshots and md_update diffs into the local book"""
+        book_data = data.get('data')
+        if not isinstance(book_data, dict) or 'pair' not in book_data:
+            return
+        symbol = self.symbols.resolve('cex', book_data['pair'])
+        update_id = book_data.get('id')
+        bids, asks = book_data.get('bids', []), book_data.get('asks', [])
+        if data['e'] == 'md_update':
+            self.order_books.on_diff('cex', symbol, bids, asks, update_id, update_id)
+        else:
+            self.order_books.on_snapshot('cex', symbol, bids, asks, update_id)
+    
+    async def _handle_gate_orderbook(self, data: Dict):
+        """Feed Gate.io order book snapshots and diffs into the local book"""
+        result = data.get('result')
+        if data.get('event') != 'update' or not isinstance(result, dict):
+            return
+        symbol = self.symbols.resolve('gate', result['s'])
+        if data['channel'] == 'spot.order_book_update':
+            self.order_books.on_diff('gate', symbol, result.get('b', []), result.get('a', []),
+                                     result.get('U'), result.get('u'))
+        else:
+            self.order_books.on_snapshot('gate', symbol, result['bids'], result['asks'],
+                                         result.get('lastUpdateId'))
+    
+    async def _handle_binance_orderbook(self, data: Dict):
+        """Feed Binance depth diffs (or partial depth snapshots) into the local book"""
+        symbol = self.symbols.resolve('binance', data['s'])
+        if data.get('e') == 'depthUpdate':
+            self.order_books.on_diff('binance', symbol, data['b'], data['a'], data['U'], data['u'])
+        else:
+            self.order_books.on_snapshot('binance', symbol, data['bids'], data['asks'],
+                                         data.get('lastUpdateId'))
     
     async def disconnect_all(self):
         """Disconnect from all exchanges"""
+        self._stopping = True
+        for worker in self.workers.values():
+            await asyncio.get_running_loop().run_in_executor(None, worker.stop)
         tasks = []
         for exchange in self.exchanges.values():
             task = asyncio.create_task(exchange.disconnect())
             tasks.append(task)
         
         await asyncio.gather(*tasks, return_exceptions=True)
+        await self.order_books.close()
     
-    def get_price_data(self, symbol: str) -> Dict:
-        """Get current price data for a symbol across all exchanges"""
-        return self.price_data.get(symbol, {})
+    def get_price_data(self, symbol) -> Dict:
+        """Get current price data for a symbol (name or ID) across all exchanges"""
+        return self.price_data.get(self.symbols.id(symbol), {})
     
-    def get_arbitrage_opportunities(self, symbol: str, min_profit_threshold: float = 0.001):
+    def get_arbitrage_opportunities(self, symbol, min_profit_threshold: float = 0.001):
         """Find arbitrage opportunities for a symbol"""
-        prices = self.price_data.get(symbol, {})
+        prices = self.price_data.get(self.symbols.id(symbol), {})
+        symbol = self.symbols.name(symbol)
         if len(prices) < 2:
             return []
         
@@ -204,19 +680,14 @@ class WebSocketManager:
         
         return opportunities
     
-    def _extract_price(self, price_data: Dict) -> Optional[float]:
-        """Extract price from exchange-specific data structure"""
-        # This is a simplified version - you'll need to adapt based on actual data
-        if 'last' in price_data:
-            return float(price_data['last'])
-        elif 'c' in price_data:  # Binance close price
-            return float(price_data['c'])
-        return None
+    def _extract_price(self, quote: Quote) -> Optional[float]:
+        """Last traded price of a quote"""
+        return quote.last
 
 # Example usage
-async def price_callback(exchange: str, symbol: str, price_data: Dict):
+async def price_callback(exchange: str, symbol: str, quote: Quote):
     """Example callback for price updates"""
-    print(f"Price update - {exchange}: {symbol} = {price_data}")
+    print(f"Price update - {exchange}: {symbol} = {quote.last} ({quote.bid}/{quote.ask})")
 
 async def main():
     manager = WebSocketManager()
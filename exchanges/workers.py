@@ -0,0 +1,218 @@
+import asyncio
+import multiprocessing
+import time
+from typing import Dict, List, Optional
+from config.settings import CONFIG
+from .recorder import FrameRecorder
+from utils.latency import RollingHistogram
+from utils.logger import get_logger
+
+logger = get_logger('workers')
+
+# Record tags. Records are plain tuples, shipped in batches (one pickled list
+# per event loop iteration) with symbols as canonical names, since each
+# process interns its own symbol IDs:
+#   (TICK, exchange, symbol, bid, ask, last, bid_size, ask_size, exchange_ts, recv_wall, recv_mono)
+#   (TRADE, exchange, symbol, price, size, side, trade_id, exchange_ts, recv_wall)
+#   (BULK, exchange, symbols, last, bid, ask, event_time, recv_wall)  columns as lists
+#   (SNAPSHOT, exchange, symbol, bids, asks, update_id)
+#   (DIFF, exchange, symbol, bids, asks, first_id, last_id)
+#   (GAP, exchange)
+#   (RTT, exchange, ms)
+#   (STATS, exchange, ingress_stats)
+TICK, BULK, SNAPSHOT, DIFF, GAP, RTT, STATS, TRADE = range(8)
+
+
+class RecordSender:
+    """Batches records and sends them once per event loop iteration"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pending = []
+
+    def send(self, record: tuple):
+        if not self.pending:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.pending.append(record)
+
+    def flush(self):
+        batch, self.pending = self.pending, []
+        if batch:
+            self.conn.send(batch)
+
+
+class BookForwarder:
+    """Stands in for the worker's OrderBookManager and ships book events instead"""
+
+    def __init__(self, sender: RecordSender, exchange: str, symbols):
+        self.sender = sender
+        self.exchange = exchange
+        self.symbols = symbols
+
+    def on_snapshot(self, exchange: str, symbol, bids, asks, update_id: Optional[int] = None):
+        self.sender.send((SNAPSHOT, exchange, self.symbols.name(symbol), bids, asks, update_id))
+
+    def on_diff(self, exchange: str, symbol, bids, asks,
+                first_id: Optional[int] = None, last_id: Optional[int] = None):
+        self.sender.send((DIFF, exchange, self.symbols.name(symbol), bids, asks, first_id, last_id))
+
+    def invalidate_exchange(self, exchange: str):
+        # The engine process invalidates its books on the GAP record
+        return
+
+
+class ForwardingHistogram(RollingHistogram):
+    """RTT histogram that also reports each sample to the engine process"""
+
+    def __init__(self, sender: RecordSender, exchange: str, size: int):
+        super().__init__(size)
+        self.sender = sender
+        self.exchange = exchange
+
+    def record(self, value: float):
+        super().record(value)
+        self.sender.send((RTT, self.exchange, value))
+
+
+def run_exchange_worker(exchange: str, conn):
+    """Process entry point: run one exchange's feed and ship normalized records"""
+    asyncio.run(_worker_main(exchange, conn))
+
+
+async def _worker_main(exchange: str, conn):
+    from .websocket_manager import WebSocketManager
+
+    manager = WebSocketManager(exchanges=[exchange], workers=False)
+    sender = RecordSender(conn)
+    manager.order_books = BookForwarder(sender, exchange, manager.symbols)
+    manager.rtt[exchange] = ForwardingHistogram(sender, exchange, CONFIG['rtt_window'])
+
+    def on_price(name, symbol, quote):
+        sender.send((TICK, name, symbol, quote.bid, quote.ask, quote.last, quote.bid_size, quote.ask_size,
+                     quote.exchange_ts, quote.recv_ts, quote.recv_mono))
+
+    def on_trade(trade):
+        sender.send((TRADE, trade.exchange, manager.symbols.names[trade.symbol], trade.price, trade.size,
+                     trade.side, trade.trade_id, trade.exchange_ts, trade.recv_ts))
+
+    def on_bulk(name, rows, prices):
+        table = manager.market_tables[name]
+        recv = manager.exchanges[name].last_recv or (time.time(), time.monotonic())
+        names = manager.symbols.names
+        sender.send((BULK, name, [names[row] for row in rows.tolist()], prices.tolist(),
+                     table.bid[rows].tolist(), table.ask[rows].tolist(),
+                     table.event_time[rows].tolist(), recv[0]))
+
+    manager.register_price_callback(on_price)
+    manager.register_bulk_callback(on_bulk)
+    manager.register_trade_callback(on_trade)
+    manager.register_gap_callback(lambda name: sender.send((GAP, name)))
+    recorder = None
+    if CONFIG['recorder_dir']:
+        recorder = FrameRecorder(prefix=exchange)
+        manager.set_recorder(recorder)
+
+    commands = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def read_commands():
+        try:
+            while conn.poll():
+                commands.put_nowait(conn.recv())
+        except EOFError:
+            loop.remove_reader(conn.fileno())
+            commands.put_nowait(('stop',))
+
+    loop.add_reader(conn.fileno(), read_commands)
+
+    async def report_stats():
+        while True:
+            await asyncio.sleep(CONFIG['heartbeat_interval'])
+            sender.send((STATS, exchange, manager.exchanges[exchange].ingress.stats()))
+
+    await manager.connect_all()
+    listener = asyncio.create_task(manager.start_listening())
+    stats = asyncio.create_task(report_stats())
+    try:
+        while True:
+            command, *args = await commands.get()
+            if command == 'stop':
+                break
+            try:
+                await getattr(manager, command)(*args)
+            except Exception as e:
+                logger.error("%s worker failed to run %s: %s", exchange, command, e)
+    finally:
+        stats.cancel()
+        await manager.disconnect_all()
+        listener.cancel()
+        sender.flush()
+        if recorder is not None:
+            recorder.close()
+
+
+class ExchangeWorker:
+    """Engine-side handle of one exchange's worker process
+
+    Subscription commands are remembered and replayed if the process has
+    to be restarted.
+    """
+
+    def __init__(self, exchange: str):
+        self.exchange = exchange
+        self.context = multiprocessing.get_context('spawn')
+        self.process = None
+        self.conn = None
+        self.commands = []
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        self.conn, child = self.context.Pipe()
+        self.process = self.context.Process(
+            target=run_exchange_worker, args=(self.exchange, child),
+            name=f'{self.exchange}-feed', daemon=True
+        )
+        self.process.start()
+        child.close()
+        for command in self.commands:
+            self.conn.send(command)
+        logger.info("Started %s feed worker (pid %s)", self.exchange, self.process.pid)
+
+    def command(self, method: str, *args):
+        """Run a WebSocketManager method in the worker, e.g. ('subscribe_to_tickers', pairs)"""
+        command = (method, *args)
+        self.commands.append(command)
+        if self.is_alive:
+            self.conn.send(command)
+
+    async def records(self):
+        """Yield record batches until the worker exits"""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        loop.add_reader(self.conn.fileno(), ready.set)
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                while self.conn.poll():
+                    yield self.conn.recv()
+        except (EOFError, OSError):
+            return
+        finally:
+            loop.remove_reader(self.conn.fileno())
+
+    def stop(self, timeout: float = 5):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(('stop',))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.process = None
@@ -16,19 +16,33 @@ load_dotenv()
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from services.price_monitor import PriceMonitor
-from services.arbitrage_engine import ArbitrageEngine
+from services.vectorized_engine import VectorizedArbitrageEngine
 from services.order_manager import OrderManager
+from services.order_store import OrderStore
 from services.safety_controller import SafetyController
+from utils.shared_prices import SharedPriceTable
+from exchanges.recorder import FrameRecorder
+from exchanges.replay import connect_engine
+from exchanges import rest
+from exchanges.user_streams import start_user_streams
+from config.settings import CONFIG
 
 async def main():
     """Main function to start the arbitrage trading system"""
     print("🚀 Multi-Exchange Arbitrage Trading System starting...")
     
+    price_table = None
+    recorder = None
+    keep_warm = None
+    user_streams = []
     try:
         # Initialize services
-        price_monitor = PriceMonitor()
-        arbitrage_engine = ArbitrageEngine()
-        order_manager = OrderManager()
+        price_monitor = PriceMonitor(all_market_tickers=True)
+        # Array-backed engine: bulk ticker frames land in one indexed write and
+        # only the rows they changed are scanned
+        arbitrage_engine = VectorizedArbitrageEngine(incremental=True)
+        order_store = OrderStore()
+        order_manager = OrderManager(order_store=order_store)
         safety_controller = SafetyController()
         
         print("✅ All services initialized successfully")
@@ -37,9 +51,29 @@ async def main():
         def on_opportunity(opportunity):
             print(f"🎯 Arbitrage opportunity detected: {opportunity}")
             # Here you would typically submit the opportunity to order manager
-            # asyncio.create_task(order_manager.submit_arbitrage_opportunity(opportunity, amount=0.01))
+            # asyncio.create_task(order_manager.submit_arbitrage_opportunity(opportunity))
         
         arbitrage_engine.set_opportunity_callback(on_opportunity)
+        # Size opportunities against the local order books fed by the depth streams
+        arbitrage_engine.set_order_books(price_monitor.ws_manager.order_books)
+        # Ticks and bulk ticker frames into the engine; prices from a feed that
+        # dropped are invalidated until it reconnects
+        connect_engine(price_monitor.ws_manager, arbitrage_engine)
+        arbitrage_engine.set_latency_provider(price_monitor.ws_manager.get_venue_latency)
+        # Top of book for the web UI and CLI tools, read from shared memory
+        price_table = SharedPriceTable.create()
+        price_monitor.ws_manager.set_price_table(price_table)
+        # Raw frames for offline replay (exchange workers record their own)
+        if CONFIG['recorder_dir'] and not price_monitor.ws_manager.workers:
+            recorder = FrameRecorder()
+            price_monitor.ws_manager.set_recorder(recorder)
+        # Open the REST connections used for snapshots, fees and orders now,
+        # so the first order does not pay for DNS, TCP and TLS setup
+        warmed = await rest.warm_up()
+        print(f"🔥 REST connections warmed: {warmed}")
+        keep_warm = asyncio.create_task(rest.keep_warm())
+        # Order updates and fills from the authenticated private streams
+        user_streams = start_user_streams(order_store)
         
         # Start the price monitor
         print("📊 Starting price monitoring...")
@@ -50,6 +84,16 @@ async def main():
     except Exception as e:
         print(f"❌ Error in main system: {e}")
         raise
+    finally:
+        for stream in user_streams:
+            await stream.stop()
+        if keep_warm is not None:
+            keep_warm.cancel()
+        await rest.close_clients()
+        if price_table is not None:
+            price_table.close()
+        if recorder is not None:
+            recorder.close()
 
 if __name__ == "__main__":
     try:
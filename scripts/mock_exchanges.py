@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Mock Exchanges for Arbitrage Trading System
+Runs local Binance, Gate.io and CEX.IO WebSocket and REST stand-ins and
+prints the environment variables that point main.py at them.
+
+Usage: scripts/mock_exchanges.py [--rate N] [--burst-size N --burst-every S]
+                                 [--latency-ms MS] [--jitter-ms MS]
+                                 [--disconnect-every S] [--skew EXCHANGE=FRACTION]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exchanges.mock_exchanges import MockExchanges, MockMarket, FeedProfile, DEFAULT_SYMBOLS
+
+async def serve(args):
+    skews = dict(item.split('=', 1) for item in args.skew)
+    profiles = {
+        name: FeedProfile(rate=args.rate, burst_size=args.burst_size, burst_every=args.burst_every,
+                          latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          disconnect_every=args.disconnect_every, skew=float(skews.get(name, 0)))
+        for name in ('cex', 'gate', 'binance')
+    }
+    async with MockExchanges(profiles, MockMarket(args.symbols, seed=args.seed), host=args.host) as mocks:
+        print("✅ Mock exchanges running. Point the system at them with:")
+        for variable, value in mocks.env().items():
+            print(f"export {variable}={value}")
+        try:
+            while True:
+                await asyncio.sleep(10)
+                sent = ', '.join(f"{name} {server.messages_sent}" for name, server in mocks.servers.items())
+                print(f"📊 Messages sent: {sent}")
+        except asyncio.CancelledError:
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local mock exchange servers")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--rate', type=float, default=100.0, help="messages/second per connection")
+    parser.add_argument('--burst-size', type=int, default=0)
+    parser.add_argument('--burst-every', type=float, default=1.0)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--disconnect-every', type=float, help="close connections after this many seconds")
+    parser.add_argument('--skew', action='append', default=[], help="price offset, e.g. gate=0.01")
+    parser.add_argument('--symbols', nargs='+', default=DEFAULT_SYMBOLS)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n🛑 Mock exchanges stopped")
+
+if __name__ == "__main__":
+    main()
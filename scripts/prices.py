@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Price Table Viewer for Arbitrage Trading System
+Prints the top of book that a running main.py publishes to shared memory.
+"""
+
+import os
+import sys
+import time
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.shared_prices import SharedPriceTable
+
+def format_price(value):
+    return f"{value:.8g}" if value is not None else "-"
+
+def print_table(table):
+    """Print one line per symbol and exchange"""
+    now = time.time()
+    print(f"{'SYMBOL':<14}{'EXCHANGE':<10}{'BID':>16}{'ASK':>16}{'LAST':>16}{'AGE':>8}")
+    for symbol, quotes in sorted(table.snapshot().items()):
+        for exchange, quote in sorted(quotes.items()):
+            print(f"{symbol:<14}{exchange:<10}{format_price(quote['bid']):>16}"
+                  f"{format_price(quote['ask']):>16}{format_price(quote['last']):>16}"
+                  f"{now - quote['recv_ts']:>7.1f}s")
+
+def main():
+    watch = '--watch' in sys.argv
+    try:
+        table = SharedPriceTable.attach()
+    except FileNotFoundError:
+        print("❌ No price table found. Is main.py running?")
+        sys.exit(1)
+    try:
+        while True:
+            if watch:
+                print("\033[2J\033[H", end="")
+            print_table(table)
+            if not watch:
+                break
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Frame Replay for Arbitrage Trading System
+Plays frames recorded with RECORD_FRAMES_DIR through the WebSocket manager
+and arbitrage engine, without a network.
+
+Usage: scripts/replay.py [--speed N | --max] PATH...
+PATH may be a recording directory, a segment file or a glob.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exchanges.websocket_manager import WebSocketManager
+from exchanges.recorder import read_frames
+from exchanges.replay import FrameReplayer, connect_engine
+from services.arbitrage_engine import ArbitrageEngine
+
+async def replay(paths, speed):
+    manager = WebSocketManager(workers=False)
+    engine = ArbitrageEngine(incremental=True)
+    opportunities = []
+    engine.set_opportunity_callback(opportunities.append)
+    connect_engine(manager, engine)
+    stats = await FrameReplayer(manager, speed).run(read_frames(paths))
+    stats['opportunities'] = len(opportunities)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded WebSocket frames")
+    parser.add_argument('paths', nargs='+')
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument('--speed', type=float, default=1.0, help="multiple of real time (default 1)")
+    pace.add_argument('--max', action='store_true', help="replay as fast as possible")
+    args = parser.parse_args()
+    try:
+        stats = asyncio.run(replay(args.paths, None if args.max else args.speed))
+    except KeyboardInterrupt:
+        print("\n🛑 Replay stopped")
+        return
+    print(f"✅ Replayed {stats['frames']} frames in {stats['elapsed']:.2f}s "
+          f"({stats['frames_per_sec']:.0f} frames/s), {stats['opportunities']} opportunities")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,115 @@
-# Placeholder for Arbitrage Engine Service 
+# Placeholder for Arbitrage Engine Service
 
 import asyncio
-from utils.fees import get_all_fees
+from utils.fees import FeeTable
+from utils.symbols import registry
+from utils.logger import get_logger
+
+logger = get_logger('arbitrage_engine')
 
 class ArbitrageEngine:
-    def __init__(self, min_profit_threshold=0.001):
-        self.price_data = {}  # {symbol: {exchange: price}}
-        self.fees = {}        # {exchange: {symbol: {maker, taker}}}
+    def __init__(self, min_profit_threshold=0.001, incremental=False, fee_table=None, order_books=None,
+                 max_notional=None, max_venue_latency=None, symbols=None):
+        # Symbols are interned to registry IDs; public methods take either form
+        self.symbols = symbols if symbols is not None else registry
+        self.price_data = {}  # {symbol_id: {exchange: price}}
+        self.fee_table = fee_table or FeeTable()  # {(exchange, symbol): (maker, taker)}
+        self._fees = {}
         self.min_profit_threshold = min_profit_threshold
         self.opportunity_callback = None
+        # In incremental mode every update_price() re-evaluates only the
+        # affected symbol, and only the pairs involving the updated exchange.
+        self.incremental = incremental
+        self.best_prices = {}  # {symbol_id: {'bid': (price, exchange), 'ask': (price, exchange)}}
+        self.order_books = order_books  # OrderBookManager fed by the depth streams
+        self.max_notional = max_notional  # cap on the buy-side notional of depth-sized opportunities
+        # fn(exchange) -> latency in ms (e.g. WebSocketManager.get_venue_latency)
+        self.latency_provider = None
+        self.max_venue_latency = max_venue_latency  # ms; slower venues are skipped
+
+    @property
+    def fees(self):
+        """Raw fee payloads ({exchange: fees}) last assigned to the engine"""
+        return self._fees
+
+    @fees.setter
+    def fees(self, all_fees):
+        # Explicit fees win over whatever the background refresh would fetch
+        self._fees = all_fees
+        self.fee_table.stop()
+        self.fee_table.load(all_fees)
 
     async def load_fees(self):
-        self.fees = await get_all_fees()
+        """Load cached fees and keep them refreshed in the background"""
+        await self.fee_table.ensure_loaded()
 
     def update_price(self, exchange, symbol, price):
+        symbol = self.symbols.id(symbol)
         if symbol not in self.price_data:
             self.price_data[symbol] = {}
-        self.price_data[symbol][exchange] = price
+        prices = self.price_data[symbol]
+        prices[exchange] = price
+        self._update_best_prices(symbol, exchange, price)
+        if self.incremental:
+            self.check_symbol(symbol, exchange)
+
+    def update_rows(self, exchange, rows, prices):
+        """Apply a bulk ticker frame: symbol IDs and their last prices as arrays
+
+        This applies the rows one update_price() at a time; for all-market
+        feeds use VectorizedArbitrageEngine, which writes them in one go.
+        """
+        for symbol, price in zip(rows.tolist(), prices.tolist()):
+            self.update_price(exchange, symbol, price)
+
+    def invalidate_exchange(self, exchange):
+        """Drop an exchange's prices, e.g. after its feed was interrupted"""
+        for symbol, prices in self.price_data.items():
+            if prices.pop(exchange, None) is None:
+                continue
+            if prices:
+                self.best_prices[symbol] = {
+                    'bid': max(((p, ex) for ex, p in prices.items()), key=lambda item: item[0]),
+                    'ask': min(((p, ex) for ex, p in prices.items()), key=lambda item: item[0])
+                }
+            else:
+                self.best_prices.pop(symbol, None)
+
+    def get_best_prices(self, symbol):
+        """Return {'bid': (price, exchange), 'ask': (price, exchange)} for a symbol"""
+        return self.best_prices.get(self.symbols.id(symbol), {})
+
+    def _update_best_prices(self, symbol, exchange, price):
+        # Highest price is the best venue to sell on (bid), lowest the best to buy on (ask)
+        best = self.best_prices.get(symbol)
+        if best is None:
+            self.best_prices[symbol] = {'bid': (price, exchange), 'ask': (price, exchange)}
+            return
+        bid_price, bid_ex = best['bid']
+        ask_price, ask_ex = best['ask']
+        # A move away from the current best on the same venue needs a rescan
+        # of this symbol's row; everything else is a single comparison.
+        if (bid_ex == exchange and price < bid_price) or (ask_ex == exchange and price > ask_price):
+            prices = self.price_data[symbol]
+            best['bid'] = max(((p, ex) for ex, p in prices.items()), key=lambda item: item[0])
+            best['ask'] = min(((p, ex) for ex, p in prices.items()), key=lambda item: item[0])
+            return
+        if price >= bid_price:
+            best['bid'] = (price, exchange)
+        if price <= ask_price:
+            best['ask'] = (price, exchange)
+
+    def set_order_books(self, order_books):
+        self.order_books = order_books
+
+    def get_top_of_book(self, exchange, symbol):
+        """Return the local book's best bid/ask for a venue, or None if unavailable"""
+        if self.order_books is None:
+            return None
+        return self.order_books.top_of_book(exchange, symbol)
+
+    def set_latency_provider(self, provider):
+        self.latency_provider = provider
 
     def set_opportunity_callback(self, callback):
         self.opportunity_callback = callback
@@ -35,45 +128,153 @@ class ArbitrageEngine:
                 for j in range(len(exchanges)):
                     if i == j:
                         continue
-                    buy_ex = exchanges[i]
-                    sell_ex = exchanges[j]
-                    buy_price = prices[buy_ex]
-                    sell_price = prices[sell_ex]
-                    # Get fees (default to 0.001 if unknown)
-                    buy_fee = self._get_fee(buy_ex, symbol, 'taker')
-                    sell_fee = self._get_fee(sell_ex, symbol, 'taker')
-                    profit = self.calculate_profit(buy_price, sell_price, buy_fee, sell_fee)
-                    profit_pct = profit / buy_price if buy_price else 0
-                    if profit_pct >= self.min_profit_threshold:
-                        opportunity = {
-                            'symbol': symbol,
-                            'buy_exchange': buy_ex,
-                            'sell_exchange': sell_ex,
-                            'buy_price': buy_price,
-                            'sell_price': sell_price,
-                            'buy_fee': buy_fee,
-                            'sell_fee': sell_fee,
-                            'profit': profit,
-                            'profit_pct': profit_pct
-                        }
-                        if self.opportunity_callback:
-                            self.opportunity_callback(opportunity)
-                        else:
-                            print('Arbitrage Opportunity:', opportunity)
+                    self._evaluate_pair(symbol, exchanges[i], exchanges[j])
+
+    def check_symbol(self, symbol, exchange):
+        """Evaluate only the pairs of `symbol` that involve `exchange`"""
+        symbol = self.symbols.id(symbol)
+        prices = self.price_data.get(symbol, {})
+        if exchange not in prices:
+            return
+        for other in prices:
+            if other == exchange:
+                continue
+            self._evaluate_pair(symbol, exchange, other)
+            self._evaluate_pair(symbol, other, exchange)
+
+    def _evaluate_pair(self, symbol, buy_ex, sell_ex):
+        prices = self.price_data[symbol]
+        # Taker fees from the precompiled table (default to 0.001 if unknown)
+        name = self.symbols.names[symbol]
+        buy_fee = self.fee_table.get(buy_ex, name)[1]
+        sell_fee = self.fee_table.get(sell_ex, name)[1]
+        opportunity = self._build_opportunity(symbol, buy_ex, sell_ex, prices[buy_ex], prices[sell_ex],
+                                              buy_fee, sell_fee)
+        if opportunity:
+            self._publish(opportunity)
+
+    def _build_opportunity(self, symbol, buy_ex, sell_ex, buy_price, sell_price, buy_fee, sell_fee):
+        """Return the opportunity dict for a pair (symbol is an ID), or None if it is below threshold.
+
+        When both venues have a synced local order book the opportunity is
+        sized against depth instead of the last price.
+        """
+        buy_book = self.order_books.get_book(buy_ex, symbol) if self.order_books else None
+        sell_book = self.order_books.get_book(sell_ex, symbol) if self.order_books else None
+        if buy_book and sell_book and buy_book.is_synced and sell_book.is_synced:
+            return self._depth_opportunity(symbol, buy_ex, sell_ex, buy_book, sell_book, buy_fee, sell_fee)
+        profit = self.calculate_profit(buy_price, sell_price, buy_fee, sell_fee)
+        profit_pct = profit / buy_price if buy_price else 0
+        if profit_pct < self.min_profit_threshold:
+            return None
+        return {
+            'symbol': self.symbols.names[symbol],
+            'buy_exchange': buy_ex,
+            'sell_exchange': sell_ex,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'buy_fee': buy_fee,
+            'sell_fee': sell_fee,
+            'profit': profit,
+            'profit_pct': profit_pct
+        }
+
+    def executable_fill(self, buy_book, sell_book, buy_fee, sell_fee):
+        """Walk the buy venue's asks against the sell venue's bids.
+
+        Levels are consumed while the marginal unit still clears
+        min_profit_threshold after fees (and until max_notional is reached).
+        Returns {'size', 'buy_vwap', 'sell_vwap', 'buy_limit_price',
+        'sell_limit_price', 'cost', 'revenue'} or None if nothing is fillable.
+        """
+        asks = buy_book.asks.levels()
+        bids = sell_book.bids.levels()
+        ask = next(asks, None)
+        bid = next(bids, None)
+        if ask is None or bid is None:
+            return None
+        ask_price, ask_left = ask
+        bid_price, bid_left = bid
+        size = cost = revenue = 0.0
+        buy_limit = sell_limit = None
+        while True:
+            marginal = bid_price * (1 - sell_fee) - ask_price * (1 + buy_fee)
+            if marginal / ask_price < self.min_profit_threshold:
+                break
+            take = min(ask_left, bid_left)
+            if self.max_notional is not None:
+                take = min(take, (self.max_notional - cost) / ask_price)
+            if take <= 0:
+                break
+            size += take
+            cost += take * ask_price
+            revenue += take * bid_price
+            buy_limit, sell_limit = ask_price, bid_price
+            ask_left -= take
+            bid_left -= take
+            if ask_left <= 0:
+                ask = next(asks, None)
+                if ask is None:
+                    break
+                ask_price, ask_left = ask
+            if bid_left <= 0:
+                bid = next(bids, None)
+                if bid is None:
+                    break
+                bid_price, bid_left = bid
+        if size <= 0:
+            return None
+        return {
+            'size': size,
+            'buy_vwap': cost / size,
+            'sell_vwap': revenue / size,
+            'buy_limit_price': buy_limit,
+            'sell_limit_price': sell_limit,
+            'cost': cost,
+            'revenue': revenue
+        }
+
+    def _depth_opportunity(self, symbol, buy_ex, sell_ex, buy_book, sell_book, buy_fee, sell_fee):
+        fill = self.executable_fill(buy_book, sell_book, buy_fee, sell_fee)
+        if fill is None:
+            return None
+        buy_vwap, sell_vwap = fill['buy_vwap'], fill['sell_vwap']
+        profit = self.calculate_profit(buy_vwap, sell_vwap, buy_fee, sell_fee)
+        return {
+            'symbol': self.symbols.names[symbol],
+            'buy_exchange': buy_ex,
+            'sell_exchange': sell_ex,
+            'buy_price': buy_vwap,
+            'sell_price': sell_vwap,
+            'buy_limit_price': fill['buy_limit_price'],
+            'sell_limit_price': fill['sell_limit_price'],
+            'executable_size': fill['size'],
+            'buy_fee': buy_fee,
+            'sell_fee': sell_fee,
+            'profit': profit,
+            'profit_pct': profit / buy_vwap,
+            'expected_profit': profit * fill['size']
+        }
+
+    def _publish(self, opportunity):
+        if self.latency_provider is not None:
+            buy_latency = self.latency_provider(opportunity['buy_exchange'])
+            sell_latency = self.latency_provider(opportunity['sell_exchange'])
+            opportunity['buy_latency_ms'] = buy_latency
+            opportunity['sell_latency_ms'] = sell_latency
+            if self.max_venue_latency is not None and any(
+                latency is not None and latency > self.max_venue_latency
+                for latency in (buy_latency, sell_latency)
+            ):
+                return
+        if self.opportunity_callback:
+            self.opportunity_callback(opportunity)
+        else:
+            logger.info('Arbitrage Opportunity: %s', opportunity)
 
     def _get_fee(self, exchange, symbol, fee_type):
-        # Try to get the fee for the symbol, else default to 0.001 (0.1%)
-        ex_fees = self.fees.get(exchange, {})
-        if isinstance(ex_fees, dict):
-            # Binance returns a list of dicts per symbol
-            if exchange == 'binance' and isinstance(ex_fees, list):
-                for entry in ex_fees:
-                    if entry.get('symbol', '').upper() == symbol.upper():
-                        return float(entry.get(fee_type + 'Commission', 0.001))
-            # CEX/Gate: try symbol, else default
-            symbol_fees = ex_fees.get(symbol) or ex_fees.get(symbol.replace('USDT', 'USD')) or {}
-            return float(symbol_fees.get(fee_type, 0.001))
-        return 0.001
+        maker, taker = self.fee_table.get(exchange, self.symbols.name(symbol))
+        return taker if fee_type == 'taker' else maker
 
 # Example usage
 async def main():
@@ -86,4 +287,4 @@ async def main():
     engine.check_opportunities()
 
 if __name__ == '__main__':
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
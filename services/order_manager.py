@@ -1,21 +1,50 @@
 # Placeholder for Order Management System 
 
 import asyncio
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, List, Optional
 
-# You should implement these async functions in each exchange module:
-#   - create_order(exchange, symbol, side, amount, price)
-#   - get_order_status(exchange, order_id)
+# Each exchange module implements create_order(...), get_order_status(...)
+# and cancel_order(...). With an OrderStore fed by the private streams
+# (exchanges/user_streams.py) an order that comes back open is awaited there;
+# without one its status is polled every CONFIG['order_poll_interval'] seconds.
 from exchanges import cex, gate, binance
+from exchanges.rate_limit import PRIORITY_ORDER, PRIORITY_URGENT
+from exchanges.user_streams import parse_binance_order, parse_cex_rest_order, parse_gate_order
+from config.settings import CONFIG
+from services.order_store import OrderStore, OPEN_STATUSES
+from utils.logger import get_logger
+from utils.symbols import registry
+
+logger = get_logger('order_manager')
+
+VENUES = {'cex': cex, 'gate': gate, 'binance': binance}
+# REST order replies of each venue as OrderUpdates
+ORDER_PARSERS = {'cex': parse_cex_rest_order, 'gate': parse_gate_order, 'binance': parse_binance_order}
+
+def filled_amount(order: Optional[Dict[str, Any]], requested: float) -> float:
+    """Base amount a leg filled; orders without a 'filled' field fill all or nothing"""
+    if not order:
+        return 0.0
+    if order.get('filled') is not None:
+        return float(order['filled'])
+    return requested if order.get('status') == 'filled' else 0.0
 
 class OrderManager:
-    def __init__(self):
+    def __init__(self, concurrent: Optional[bool] = None, order_timeout: Optional[float] = None,
+                 unwind_mode: Optional[str] = None, order_store: Optional[OrderStore] = None):
         self.order_callbacks = []  # List of callbacks to notify on order status
+        self.order_store = order_store  # final order states from the private streams
+        # Fire both legs at once instead of waiting for the buy to fill first
+        self.concurrent = CONFIG['concurrent_legs'] if concurrent is None else concurrent
+        self.order_timeout = order_timeout or CONFIG['order_timeout']  # seconds per leg
+        # 'unwind' reverses an unmatched fill on its own venue; 'hedge' first
+        # retries the missing amount on the other venue
+        self.unwind_mode = unwind_mode or CONFIG['unwind_mode']
 
     def register_callback(self, callback: Callable[[Dict[str, Any]], None]):
         self.order_callbacks.append(callback)
 
-    async def submit_arbitrage_opportunity(self, opportunity: Dict[str, Any], amount: float):
+    async def submit_arbitrage_opportunity(self, opportunity: Dict[str, Any], amount: Optional[float] = None):
         """
         Receives an arbitrage opportunity dict and attempts to execute it.
         Example opportunity dict:
@@ -27,21 +56,36 @@ class OrderManager:
             'sell_price': 60200,
             ...
         }
+        Depth-sized opportunities also carry 'executable_size' and the worst
+        level prices ('buy_limit_price', 'sell_limit_price'); when amount is
+        omitted the executable size is used.
         """
         symbol = opportunity['symbol']
         buy_ex = opportunity['buy_exchange']
         sell_ex = opportunity['sell_exchange']
-        buy_price = opportunity['buy_price']
-        sell_price = opportunity['sell_price']
+        buy_price = opportunity.get('buy_limit_price', opportunity['buy_price'])
+        sell_price = opportunity.get('sell_limit_price', opportunity['sell_price'])
+        if amount is None:
+            amount = opportunity.get('executable_size')
+        if not amount:
+            self._notify({'status': 'failed', 'reason': 'no_executable_size', 'details': opportunity})
+            return
+        if self.concurrent:
+            await self._execute_concurrently(opportunity, symbol, buy_ex, sell_ex, buy_price, sell_price, amount)
+            return
 
         # Place buy order
         buy_order = await self.place_order(buy_ex, symbol, 'buy', amount, buy_price)
+        if self._is_open(buy_order):
+            buy_order = await self._await_fill(buy_order)
         if not buy_order or buy_order.get('status') != 'filled':
             self._notify({'status': 'failed', 'reason': 'buy_failed', 'details': buy_order})
             return
 
         # Place sell order
         sell_order = await self.place_order(sell_ex, symbol, 'sell', amount, sell_price)
+        if self._is_open(sell_order):
+            sell_order = await self._await_fill(sell_order)
         if not sell_order or sell_order.get('status') != 'filled':
             self._notify({'status': 'failed', 'reason': 'sell_failed', 'details': sell_order})
             return
@@ -49,28 +93,204 @@ class OrderManager:
         # Success
         self._notify({'status': 'success', 'buy_order': buy_order, 'sell_order': sell_order})
 
-    async def place_order(self, exchange: str, symbol: str, side: str, amount: float, price: float) -> Dict[str, Any]:
-        """Place an order on the specified exchange. Returns order info dict."""
-        # Placeholder: call the correct exchange's order function
+    async def _execute_concurrently(self, opportunity: Dict[str, Any], symbol: str, buy_ex: str, sell_ex: str,
+                                    buy_price: float, sell_price: float, amount: float):
+        """Place both legs at once, then flatten whatever one leg filled beyond the other
+
+        Both legs fully filled is a success. Otherwise the difference between
+        the bought and sold amounts is unwound (or hedged, see unwind_mode),
+        so the only position left is a matched one. A leg that timed out is
+        cancelled first and counts with what it filled by then. Every order
+        that timed out, including hedges and unwinds, is listed under
+        'unresolved' with the outcome of its cancel.
+        """
+        buy_order, sell_order = await asyncio.gather(
+            self._place_leg(buy_ex, symbol, 'buy', amount, buy_price),
+            self._place_leg(sell_ex, symbol, 'sell', amount, sell_price)
+        )
+        bought = filled_amount(buy_order, amount)
+        sold = filled_amount(sell_order, amount)
+        if bought >= amount and sold >= amount:
+            self._notify({'status': 'success', 'buy_order': buy_order, 'sell_order': sell_order})
+            return
+
+        result = {
+            'status': 'partial' if min(bought, sold) > 0 else 'failed',
+            'reason': self._leg_failure(buy_order, sell_order, bought, sold, amount),
+            'buy_order': buy_order,
+            'sell_order': sell_order,
+            'bought': bought,
+            'sold': sold,
+            'unresolved': [order for order in (buy_order, sell_order) if order.get('status') == 'timeout'],
+            'details': opportunity
+        }
+        excess = bought - sold
+        if excess > 0:
+            result.update(await self._flatten(symbol, 'sell', excess, buy_ex, sell_ex, buy_price, sell_price,
+                                              result['unresolved']))
+        elif excess < 0:
+            result.update(await self._flatten(symbol, 'buy', -excess, sell_ex, buy_ex, sell_price, buy_price,
+                                              result['unresolved']))
+        if result.get('hedge') and filled_amount(result['hedge'], abs(excess)) >= abs(excess):
+            # The missing leg was completed on the other venue after all
+            result['status'] = 'success' if max(bought, sold) >= amount else 'partial'
+        self._notify(result)
+
+    @staticmethod
+    def _leg_failure(buy_order: Dict[str, Any], sell_order: Dict[str, Any], bought: float, sold: float,
+                     amount: float) -> str:
+        buy_short, sell_short = bought < amount, sold < amount
+        if buy_short and sell_short:
+            return 'both_failed' if not bought and not sold else 'partial_fill'
+        side, order = ('buy', buy_order) if buy_short else ('sell', sell_order)
+        return f"{side}_timeout" if order.get('status') == 'timeout' else f"{side}_failed"
+
+    async def _flatten(self, symbol: str, side: str, amount: float, own_ex: str, other_ex: str,
+                       own_price: float, other_price: float, unresolved: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Close `amount` left over from the filled leg
+
+        side is the closing side: 'sell' when more was bought than sold. A
+        hedge places it on the venue of the missing leg, an unwind reverses
+        the fill on its own venue; both cross by CONFIG['unwind_slippage']
+        and go ahead of all other queued requests. Either one timing out is
+        cancelled and added to unresolved.
+        """
+        slippage = CONFIG['unwind_slippage']
+        factor = 1 - slippage if side == 'sell' else 1 + slippage
+        result = {}
+        if self.unwind_mode == 'hedge':
+            hedge = result['hedge'] = await self._place_leg(other_ex, symbol, side, amount, other_price * factor,
+                                                            PRIORITY_URGENT)
+            if hedge.get('status') == 'timeout':
+                unresolved.append(hedge)
+            hedged = filled_amount(hedge, amount)
+            if hedged >= amount:
+                return result
+            amount -= hedged
+        unwind = result['unwind'] = await self._place_leg(own_ex, symbol, side, amount, own_price * factor,
+                                                          PRIORITY_URGENT)
+        if unwind.get('status') == 'timeout':
+            unresolved.append(unwind)
+        if filled_amount(unwind, amount) < amount:
+            logger.error('Unwind of %s %s %s on %s failed, position left open: %s',
+                         side, amount, symbol, own_ex, unwind)
+        return result
+
+    async def _place_leg(self, exchange: str, symbol: str, side: str, amount: float, price: float,
+                         priority: int = PRIORITY_ORDER) -> Dict[str, Any]:
+        """place_order() and its fill; errors come back as failed orders"""
+        try:
+            order = await self.place_order(exchange, symbol, side, amount, price, priority=priority)
+        except Exception as e:
+            return {'exchange': exchange, 'symbol': symbol, 'side': side, 'status': 'failed', 'reason': str(e)}
+        if not order:
+            return {'exchange': exchange, 'symbol': symbol, 'side': side, 'status': 'failed'}
+        return await self._await_fill(order) if self._is_open(order) else order
+
+    @staticmethod
+    def _is_open(order: Optional[Dict[str, Any]]) -> bool:
+        return bool(order) and order.get('order_id') is not None and order.get('status') in OPEN_STATUSES
+
+    async def _await_fill(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait up to order_timeout for an accepted order to finish, cancelling it if it does not
+
+        Only orders that come back open get here, so legs that fill or fail
+        outright never arm a timer; the REST call itself is bounded by the
+        client's CONFIG['rest_timeout']. A timed-out order keeps status
+        'timeout' and gains 'filled' and 'cancel', the final state the
+        exchange confirmed for it (None if the cancel could not be confirmed).
+        """
         try:
-            if exchange == 'binance':
-                # await binance.create_order(symbol, side, amount, price)
-                return {'exchange': 'binance', 'symbol': symbol, 'side': side, 'amount': amount, 'price': price, 'status': 'filled', 'order_id': 'bin123'}
-            elif exchange == 'cex':
-                # await cex.create_order(symbol, side, amount, price)
-                return {'exchange': 'cex', 'symbol': symbol, 'side': side, 'amount': amount, 'price': price, 'status': 'filled', 'order_id': 'cex123'}
-            elif exchange == 'gate':
-                # await gate.create_order(symbol, side, amount, price)
-                return {'exchange': 'gate', 'symbol': symbol, 'side': side, 'amount': amount, 'price': price, 'status': 'filled', 'order_id': 'gate123'}
-            else:
-                return {'status': 'failed', 'reason': 'unknown_exchange'}
+            return await asyncio.wait_for(self._settle(order), self.order_timeout)
+        except asyncio.TimeoutError:
+            pass
+        final = await self.cancel_order(order)
+        if final is None:
+            logger.error('Timed-out %s order on %s could not be cancelled, it may still fill: %s',
+                         order['side'], order['exchange'], order)
+        return {**order, 'status': 'timeout', 'filled': final['filled'] if final else 0.0, 'cancel': final}
+
+    async def _settle(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait for an accepted order to finish: on the order store, or by polling without one"""
+        if self.order_store is None:
+            while True:
+                await asyncio.sleep(CONFIG['order_poll_interval'])
+                state = await self.get_order_status(order)
+                if state is not None and state['status'] not in OPEN_STATUSES:
+                    return state
+        exchange, order_id = order['exchange'], order['order_id']
+        self.order_store.track(exchange, order_id, order['symbol'], order['side'], order['amount'], order['price'])
+        state = await self.order_store.wait(exchange, order_id)
+        return {**order, 'status': state.status, 'filled': state.filled, 'avg_price': state.avg_price,
+                'fee': state.fee}
+
+    async def place_order(self, exchange: str, symbol: str, side: str, amount: float, price: float,
+                          priority: int = PRIORITY_ORDER) -> Dict[str, Any]:
+        """Place a limit order on the specified exchange. Returns order info dict."""
+        venue = VENUES.get(exchange)
+        if venue is None:
+            return {'status': 'failed', 'reason': 'unknown_exchange'}
+        order = {'exchange': exchange, 'symbol': symbol, 'side': side, 'amount': amount, 'price': price}
+        try:
+            response = await venue.create_order(registry.native(exchange, symbol), side, amount, price,
+                                                priority=priority)
         except Exception as e:
-            return {'status': 'failed', 'reason': str(e)}
+            return {**order, 'status': 'failed', 'reason': str(e)}
+        if 'error' in response:
+            return {**order, 'status': 'failed', 'reason': response['error'], 'details': response.get('details')}
+        return self._order_result(order, response)
+
+    async def get_order_status(self, order: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The order as the exchange reports it now, or None if it cannot be fetched"""
+        try:
+            response = await VENUES[order['exchange']].get_order_status(*self._order_args(order))
+        except Exception as e:
+            logger.warning('Status of %s order %s unavailable: %s', order['exchange'], order['order_id'], e)
+            return None
+        if not isinstance(response, dict) or 'error' in response:
+            logger.warning('Status of %s order %s unavailable: %s', order['exchange'], order['order_id'], response)
+            return None
+        return self._order_result(order, response)
+
+    async def cancel_order(self, order: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cancel an open order ahead of every queued request; returns its final state, or None if unknown
+
+        A rejected cancel usually means the order already finished, so its
+        status is fetched either way; so it is when the reply does not say
+        what filled (CEX.IO answers true).
+        """
+        try:
+            response = await VENUES[order['exchange']].cancel_order(*self._order_args(order))
+        except Exception as e:
+            response = {'error': str(e)}
+        if isinstance(response, dict) and 'error' not in response:
+            result = self._order_result(order, response)
+            if result['status'] not in OPEN_STATUSES:
+                return result
+        state = await self.get_order_status(order)
+        return state if state is not None and state['status'] not in OPEN_STATUSES else None
+
+    @staticmethod
+    def _order_args(order: Dict[str, Any]) -> tuple:
+        # CEX.IO addresses orders by ID alone
+        if order['exchange'] == 'cex':
+            return (order['order_id'],)
+        return registry.native(order['exchange'], order['symbol']), order['order_id']
+
+    @staticmethod
+    def _order_result(order: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        update = ORDER_PARSERS[order['exchange']](response)
+        filled = update.filled
+        if filled is None:
+            filled = order['amount'] - update.remaining if update.remaining is not None else 0.0
+        status = 'partially_filled' if update.status == 'new' and filled else update.status
+        return {**order, 'status': status, 'order_id': update.order_id, 'filled': filled,
+                'avg_price': update.avg_price, 'fee': update.fee}
 
     def _notify(self, result: Dict[str, Any]):
         for cb in self.order_callbacks:
             cb(result)
-        print('OrderManager:', result)
+        logger.info('OrderManager: %s', result)
 
 # Example usage
 def print_order_status(result):
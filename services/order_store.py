@@ -0,0 +1,145 @@
+# In-memory state of our own orders, fed by the private exchange streams
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from config.settings import CONFIG
+from exchanges.records import OrderUpdate
+from utils.logger import get_logger
+
+logger = get_logger('order_store')
+
+OPEN_STATUSES = ('new', 'open', 'partially_filled')
+FINAL_STATUSES = ('filled', 'cancelled', 'rejected', 'expired')
+
+class OrderStore:
+    """Latest OrderUpdate per (exchange, order ID), with waiters for final states
+
+    Private streams call apply() for order events and apply_fill() for
+    individual executions; OrderManager tracks what it placed and awaits
+    wait() instead of polling get_order_status. Events can arrive before the
+    REST response that names the order, and out of order: a final state is
+    never reopened and the filled amount never goes down. Only the newest
+    CONFIG['order_store_size'] orders are kept.
+    """
+
+    def __init__(self, max_orders: Optional[int] = None):
+        self.max_orders = max_orders or CONFIG['order_store_size']
+        self.orders = OrderedDict()  # {(exchange, order_id): OrderUpdate}
+        self.updates = 0
+        self._fills = {}  # {(exchange, order_id): {trade_id: (amount, price, fee)}}
+        self._client_ids = {}  # {(exchange, client_id): order_id}
+        self._waiters = {}  # {(exchange, order_id): [Future]}
+
+    def get(self, exchange: str, order_id) -> Optional[OrderUpdate]:
+        return self.orders.get((exchange, str(order_id)))
+
+    def by_client_id(self, exchange: str, client_id: str) -> Optional[OrderUpdate]:
+        order_id = self._client_ids.get((exchange, client_id))
+        return None if order_id is None else self.get(exchange, order_id)
+
+    def open_orders(self, exchange: Optional[str] = None) -> List[OrderUpdate]:
+        return [order for (ex, _), order in self.orders.items()
+                if order.status not in FINAL_STATUSES and (exchange is None or ex == exchange)]
+
+    def track(self, exchange: str, order_id, symbol: Optional[str] = None, side: Optional[str] = None,
+              amount: Optional[float] = None, price: Optional[float] = None, client_id: Optional[str] = None):
+        """Record an order we just placed, so events that omit its size can be resolved"""
+        self.apply(OrderUpdate(exchange, str(order_id), 'new', symbol=symbol, side=side, amount=amount,
+                               price=price, client_id=client_id, recv_ts=time.time()))
+
+    def apply(self, update: OrderUpdate) -> OrderUpdate:
+        """Merge one order event into the stored state and wake its waiters"""
+        update.order_id = str(update.order_id)
+        key = (update.exchange, update.order_id)
+        current = self.orders.get(key)
+        if current is not None:
+            for name in OrderUpdate.__slots__:
+                if getattr(update, name) is None:
+                    setattr(update, name, getattr(current, name))
+            if current.filled is not None and (update.filled is None or update.filled < current.filled):
+                update.filled = current.filled
+                update.avg_price = current.avg_price
+            if current.status in FINAL_STATUSES:
+                update.status = current.status
+            elif update.status == 'new' and current.status != 'new':
+                update.status = current.status
+        if update.filled is None and update.remaining is not None and update.amount is not None:
+            update.filled = update.amount - update.remaining
+        if update.status == 'new' and update.filled:
+            update.status = 'partially_filled'
+        self.orders[key] = update
+        self.orders.move_to_end(key)
+        self.updates += 1
+        if update.client_id:
+            self._client_ids[(update.exchange, update.client_id)] = update.order_id
+        if update.status in FINAL_STATUSES:
+            for future in self._waiters.pop(key, ()):
+                if not future.done():
+                    future.set_result(update)
+        self._evict()
+        return update
+
+    def apply_fill(self, exchange: str, order_id, trade_id, amount: float, price: float, fee: Optional[float] = None,
+                   fee_asset: Optional[str] = None, symbol: Optional[str] = None, side: Optional[str] = None,
+                   client_id: Optional[str] = None, exchange_ts: Optional[float] = None) -> OrderUpdate:
+        """Add one execution; repeated trade IDs are ignored"""
+        key = (exchange, str(order_id))
+        fills = self._fills.setdefault(key, {})
+        fills[trade_id] = (amount, price, fee or 0.0)
+        filled = sum(fill[0] for fill in fills.values())
+        avg_price = sum(fill[0] * fill[1] for fill in fills.values()) / filled if filled else None
+        current = self.orders.get(key)
+        status = 'partially_filled'
+        if current is not None and current.amount is not None and filled >= current.amount:
+            status = 'filled'
+        return self.apply(OrderUpdate(exchange, str(order_id), status, symbol=symbol, side=side, filled=filled,
+                                      avg_price=avg_price, fee=sum(fill[2] for fill in fills.values()),
+                                      fee_asset=fee_asset, client_id=client_id, exchange_ts=exchange_ts,
+                                      recv_ts=time.time()))
+
+    async def wait(self, exchange: str, order_id, timeout: Optional[float] = None) -> OrderUpdate:
+        """The order's final state, as soon as a stream reports it"""
+        key = (exchange, str(order_id))
+        current = self.orders.get(key)
+        if current is not None and current.status in FINAL_STATUSES:
+            return current
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[key]
+
+    def _evict(self):
+        excess = len(self.orders) - self.max_orders
+        if excess <= 0:
+            return
+        # Oldest first, skipping orders somebody is still waiting on
+        victims = []
+        for key in self.orders:
+            if len(victims) == excess:
+                break
+            if key not in self._waiters:
+                victims.append(key)
+        for key in victims:
+            order = self.orders.pop(key)
+            self._fills.pop(key, None)
+            if order.client_id:
+                self._client_ids.pop((order.exchange, order.client_id), None)
+
+# Example usage
+async def main():
+    store = OrderStore()
+    store.track('binance', 1, 'BTCUSDT', 'buy', 0.01, 60000)
+    waiter = asyncio.create_task(store.wait('binance', 1))
+    store.apply_fill('binance', 1, trade_id=7, amount=0.01, price=59990)
+    print('Final state:', await waiter)
+
+if __name__ == '__main__':
+    asyncio.run(main())
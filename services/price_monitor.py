@@ -2,21 +2,33 @@
 
 import asyncio
 from exchanges.websocket_manager import WebSocketManager
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional
+from utils.event_bus import EventBus, PriceEvent, PRICE
+from utils.logger import get_logger, log_sampled
+
+logger = get_logger('price_monitor')
 
 class PriceMonitor:
-    def __init__(self, pairs=None):
+    def __init__(self, pairs=None, all_market_tickers=False):
         self.ws_manager = WebSocketManager()
-        self.price_callback = None
+        self.bus = EventBus()
         self.pairs = pairs or {
             'cex': ['BTCUSDT', 'ETHUSDT'],
             'gate': ['BTCUSDT', 'ETHUSDT'],
             'binance': ['BTCUSDT', 'ETHUSDT']
         }
+        # Also take Binance's whole-market !ticker@arr stream, delivered as bulk frames
+        self.all_market_tickers = all_market_tickers
 
-    def register_callback(self, callback: Callable[[str, str, Dict[str, Any]], None]):
-        """Register a callback for price updates"""
-        self.price_callback = callback
+    def register_callback(self, callback: Callable[[str, str, Dict[str, Any]], None],
+                          queue_size: Optional[int] = None):
+        """Add a callback for price updates; sync and async callbacks are both fine
+        
+        Slow consumers (the UI, recorders) should pass queue_size so they get
+        their own queue instead of delaying the feed and other callbacks.
+        """
+        return self.bus.subscribe(PRICE, lambda event: callback(event.exchange, event.symbol, event.quote),
+                                  queue_size, getattr(callback, '__qualname__', None))
 
     async def start(self):
         """Start the price monitoring system"""
@@ -26,6 +38,8 @@ class PriceMonitor:
             
             print("📡 Subscribing to tickers...")
             await self.ws_manager.subscribe_to_tickers(self.pairs)
+            if self.all_market_tickers:
+                await self.ws_manager.subscribe_to_all_market_tickers()
             
             print("👂 Registering price callback...")
             self.ws_manager.register_price_callback(self._on_price_update)
@@ -37,20 +51,17 @@ class PriceMonitor:
             print(f"❌ Error starting price monitor: {e}")
             raise
 
-    async def _on_price_update(self, exchange, symbol, price_data):
-        """Handle price updates from exchanges"""
-        try:
-            if self.price_callback:
-                # Call the callback (it's now synchronous)
-                self.price_callback(exchange, symbol, price_data)
-            else:
-                print(f'Price update: {exchange} {symbol} {price_data}')
-        except Exception as e:
-            print(f"❌ Error in price callback: {e}")
+    async def _on_price_update(self, exchange, symbol, quote):
+        """Handle price updates (Quote records) from exchanges"""
+        if self.bus.has_subscribers(PRICE):
+            # Subscriber errors are logged by the bus
+            await self.bus.publish(PRICE, PriceEvent(exchange, symbol, quote))
+        else:
+            log_sampled(logger, 'price', 'Price update: %s %s %s', exchange, symbol, quote)
 
 # Example usage
-async def print_price(exchange, symbol, price_data):
-    print(f'[{exchange}] {symbol}: {price_data}')
+async def print_price(exchange, symbol, quote):
+    print(f'[{exchange}] {symbol}: {quote.last} ({quote.bid}/{quote.ask})')
 
 async def main():
     monitor = PriceMonitor()
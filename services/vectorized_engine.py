@@ -0,0 +1,222 @@
+# Vectorized Arbitrage Engine Service
+
+import asyncio
+import numpy as np
+from services.arbitrage_engine import ArbitrageEngine
+
+class VectorizedArbitrageEngine(ArbitrageEngine):
+    """ArbitrageEngine variant that scans the whole universe in one batched NumPy pass.
+
+    Prices live in a dense symbols x exchanges array (NaN where a venue has not
+    quoted a symbol yet), indexed by symbol registry ID, and taker fees in a
+    matching array, so
+    check_opportunities() builds the full buy x sell profit tensor for every
+    symbol at once instead of looping over exchange pairs in Python.
+    """
+
+    def __init__(self, min_profit_threshold=0.001, exchanges=None, symbols=None, capacity=64,
+                 fee_table=None, order_books=None, max_notional=None, max_venue_latency=None,
+                 symbol_registry=None, incremental=False):
+        super().__init__(min_profit_threshold=min_profit_threshold, incremental=incremental, fee_table=fee_table,
+                         order_books=order_books, max_notional=max_notional, max_venue_latency=max_venue_latency,
+                         symbols=symbol_registry)
+        self.exchanges = []      # column -> exchange
+        self.exchange_index = {}  # exchange -> column
+        self.rows = []           # symbol IDs quoted so far; a symbol's row is its ID
+        self.n_rows = 0          # highest row in use + 1
+        self._active = set()
+        n_exchanges = max(len(exchanges or []), 4)
+        self.prices = np.full((capacity, n_exchanges), np.nan)
+        self.taker_fees = np.full((capacity, n_exchanges), 0.001)
+        for exchange in exchanges or []:
+            self._exchange_column(exchange)
+        for symbol in symbols or []:
+            self._symbol_row(symbol)
+        self.fee_table.add_listener(self.rebuild_fee_matrix)
+
+    def rebuild_fee_matrix(self):
+        """Recompute the taker fee array from the fee table"""
+        for row in self.rows:
+            for col, exchange in enumerate(self.exchanges):
+                self.taker_fees[row, col] = self._get_fee(exchange, row, 'taker')
+
+    def _exchange_column(self, exchange):
+        col = self.exchange_index.get(exchange)
+        if col is None:
+            col = len(self.exchanges)
+            if col == self.prices.shape[1]:
+                self._grow(self.prices.shape[0], col * 2)
+            self.exchanges.append(exchange)
+            self.exchange_index[exchange] = col
+            for row in self.rows:
+                self.taker_fees[row, col] = self._get_fee(exchange, row, 'taker')
+        return col
+
+    def _symbol_row(self, symbol):
+        row = self.symbols.id(symbol)
+        if row not in self._active:
+            if row >= self.prices.shape[0]:
+                self._grow(max(row + 1, self.prices.shape[0] * 2), self.prices.shape[1])
+            self.rows.append(row)
+            self._active.add(row)
+            self.n_rows = max(self.n_rows, row + 1)
+            for col, exchange in enumerate(self.exchanges):
+                self.taker_fees[row, col] = self._get_fee(exchange, row, 'taker')
+        return row
+
+    def _grow(self, rows, cols):
+        prices = np.full((rows, cols), np.nan)
+        taker_fees = np.full((rows, cols), 0.001)
+        old_rows, old_cols = self.prices.shape
+        prices[:old_rows, :old_cols] = self.prices
+        taker_fees[:old_rows, :old_cols] = self.taker_fees
+        self.prices = prices
+        self.taker_fees = taker_fees
+
+    def update_price(self, exchange, symbol, price):
+        row, col = self._symbol_row(symbol), self._exchange_column(exchange)
+        self.prices[row, col] = price
+        if self.incremental:
+            self.check_symbol(row, exchange)
+
+    def update_prices(self, exchange, symbols, prices):
+        """Write a batch of prices for one exchange in a single indexed assignment"""
+        col = self._exchange_column(exchange)
+        rows = [self._symbol_row(symbol) for symbol in symbols]
+        self.prices[rows, col] = prices
+
+    def update_rows(self, exchange, rows, prices):
+        """Apply a bulk ticker frame without touching rows one symbol at a time
+
+        rows are symbol IDs, which are also the price array rows. In
+        incremental mode only the updated rows are re-scanned.
+        """
+        if not len(rows):
+            return
+        col = self._exchange_column(exchange)
+        for row in rows[~np.isin(rows, self.rows)].tolist():
+            self._symbol_row(row)
+        self.prices[rows, col] = prices
+        if self.incremental:
+            self.check_rows(rows)
+
+    def invalidate_exchange(self, exchange):
+        col = self.exchange_index.get(exchange)
+        if col is not None:
+            self.prices[:, col] = np.nan
+
+    def _row(self, symbol):
+        """Row of a symbol that has been quoted, else None"""
+        row = self.symbols.id(symbol)
+        return row if row in self._active else None
+
+    def get_price(self, exchange, symbol):
+        row = self._row(symbol)
+        col = self.exchange_index.get(exchange)
+        if row is None or col is None or np.isnan(self.prices[row, col]):
+            return None
+        return float(self.prices[row, col])
+
+    def get_best_prices(self, symbol):
+        row = self._row(symbol)
+        if row is None:
+            return {}
+        quotes = self.prices[row, :len(self.exchanges)]
+        if np.isnan(quotes).all():
+            return {}
+        bid_col = int(np.nanargmax(quotes))
+        ask_col = int(np.nanargmin(quotes))
+        return {
+            'bid': (float(quotes[bid_col]), self.exchanges[bid_col]),
+            'ask': (float(quotes[ask_col]), self.exchanges[ask_col])
+        }
+
+    def profit_tensor(self, rows=None):
+        """Return (profit, profit_pct) arrays shaped (symbols, buy_exchange, sell_exchange)"""
+        n_symbols, n_exchanges = self.n_rows, len(self.exchanges)
+        prices = self.prices[:n_symbols, :n_exchanges]
+        fees = self.taker_fees[:n_symbols, :n_exchanges]
+        if rows is not None:
+            prices = prices[rows]
+            fees = fees[rows]
+        cost = prices * (1 + fees)
+        revenue = prices * (1 - fees)
+        profit = revenue[:, np.newaxis, :] - cost[:, :, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_pct = profit / prices[:, :, np.newaxis]
+        return profit, profit_pct
+
+    def check_opportunities(self):
+        n_exchanges = len(self.exchanges)
+        if not self.rows or n_exchanges < 2:
+            return
+        profit, profit_pct = self.profit_tensor()
+        # NaN (missing quote) compares False, so only fully quoted pairs survive
+        with np.errstate(invalid='ignore'):
+            hits = profit_pct >= self.min_profit_threshold
+        hits &= ~np.eye(n_exchanges, dtype=bool)
+        for row, buy_col, sell_col in zip(*np.nonzero(hits)):
+            # np.nonzero yields numpy integers; symbol IDs are plain ints
+            self._emit(int(row), buy_col, sell_col, profit[row, buy_col, sell_col], profit_pct[row, buy_col, sell_col])
+
+    def check_rows(self, rows):
+        """Scan only the given rows, e.g. those a bulk frame just changed"""
+        n_exchanges = len(self.exchanges)
+        if n_exchanges < 2:
+            return
+        profit, profit_pct = self.profit_tensor(rows=rows)
+        with np.errstate(invalid='ignore'):
+            hits = profit_pct >= self.min_profit_threshold
+        hits &= ~np.eye(n_exchanges, dtype=bool)
+        for i, buy_col, sell_col in zip(*np.nonzero(hits)):
+            self._emit(int(rows[i]), buy_col, sell_col, profit[i, buy_col, sell_col], profit_pct[i, buy_col, sell_col])
+
+    def check_symbol(self, symbol, exchange):
+        row = self._row(symbol)
+        col = self.exchange_index.get(exchange)
+        if row is None or col is None:
+            return
+        profit, profit_pct = self.profit_tensor(rows=[row])
+        with np.errstate(invalid='ignore'):
+            hits = profit_pct[0] >= self.min_profit_threshold
+        hits[col, col] = False
+        for buy_col, sell_col in zip(*np.nonzero(hits)):
+            if col in (buy_col, sell_col):
+                self._emit(row, buy_col, sell_col, profit[0, buy_col, sell_col], profit_pct[0, buy_col, sell_col])
+
+    def _emit(self, row, buy_col, sell_col, profit, profit_pct):
+        buy_ex, sell_ex = self.exchanges[buy_col], self.exchanges[sell_col]
+        buy_price = float(self.prices[row, buy_col])
+        sell_price = float(self.prices[row, sell_col])
+        buy_fee = float(self.taker_fees[row, buy_col])
+        sell_fee = float(self.taker_fees[row, sell_col])
+        if self.order_books is not None:
+            # The tensor is a screen on last prices; size survivors against depth
+            opportunity = self._build_opportunity(row, buy_ex, sell_ex, buy_price, sell_price, buy_fee, sell_fee)
+            if opportunity:
+                self._publish(opportunity)
+            return
+        self._publish({
+            'symbol': self.symbols.names[row],
+            'buy_exchange': buy_ex,
+            'sell_exchange': sell_ex,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'buy_fee': buy_fee,
+            'sell_fee': sell_fee,
+            'profit': float(profit),
+            'profit_pct': float(profit_pct)
+        })
+
+# Example usage
+async def main():
+    engine = VectorizedArbitrageEngine(min_profit_threshold=0.002)
+    await engine.load_fees()
+    # Simulate price updates
+    engine.update_price('binance', 'BTCUSDT', 60000)
+    engine.update_price('cex', 'BTCUSDT', 60200)
+    engine.update_price('gate', 'BTCUSDT', 60100)
+    engine.check_opportunities()
+
+if __name__ == '__main__':
+    asyncio.run(main())
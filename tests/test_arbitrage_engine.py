@@ -35,4 +35,83 @@ async def test_arbitrage_opportunity_detection():
     found = []
     engine.set_opportunity_callback(lambda op: found.append(op))
     engine.check_opportunities()
-    assert not found 
\ No newline at end of file
+    assert not found 
+
+def test_incremental_mode_evaluates_on_update():
+    engine = ArbitrageEngine(min_profit_threshold=0.001, incremental=True)
+    engine.fees = {
+        'binance': {'BTCUSDT': {'taker': 0.001}},
+        'cex': {'BTCUSDT': {'taker': 0.001}},
+        'gate': {'BTCUSDT': {'taker': 0.001}}
+    }
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    engine.update_price('binance', 'BTCUSDT', 60000)
+    engine.update_price('gate', 'BTCUSDT', 60050)
+    assert not found
+    engine.update_price('cex', 'BTCUSDT', 60200)
+    # Only pairs involving the updated exchange are evaluated
+    assert found and all('cex' in (op['buy_exchange'], op['sell_exchange']) for op in found)
+    assert any(op['buy_exchange'] == 'binance' and op['sell_exchange'] == 'cex' for op in found)
+
+
+def test_best_prices_tracking():
+    engine = ArbitrageEngine()
+    engine.update_price('binance', 'BTCUSDT', 60000)
+    engine.update_price('cex', 'BTCUSDT', 60200)
+    engine.update_price('gate', 'BTCUSDT', 60100)
+    best = engine.get_best_prices('BTCUSDT')
+    assert best['bid'] == (60200, 'cex') and best['ask'] == (60000, 'binance')
+    # Best venue moving away forces a rescan of the symbol
+    engine.update_price('cex', 'BTCUSDT', 59900)
+    best = engine.get_best_prices('BTCUSDT')
+    assert best['bid'] == (60100, 'gate') and best['ask'] == (59900, 'cex')
+
+
+def test_depth_aware_executable_size():
+    from exchanges.order_book import OrderBookManager
+    books = OrderBookManager()
+    # Buy venue asks: 1 @ 100, 2 @ 100.5, 5 @ 101.5
+    books.on_snapshot('binance', 'BTCUSDT', [['99', '10']], [['100', '1'], ['100.5', '2'], ['101.5', '5']], 1)
+    # Sell venue bids: 2 @ 101.5, 4 @ 101, 10 @ 100
+    books.on_snapshot('cex', 'BTCUSDT', [['101.5', '2'], ['101', '4'], ['100', '10']], [['102', '10']], 1)
+    engine = ArbitrageEngine(min_profit_threshold=0.001, order_books=books)
+    engine.fees = {'binance': {'BTCUSDT': {'taker': 0.001}}, 'cex': {'BTCUSDT': {'taker': 0.001}}}
+    engine.update_price('binance', 'BTCUSDT', 100)
+    engine.update_price('cex', 'BTCUSDT', 101)
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    engine.check_opportunities()
+    assert len(found) == 1
+    op = found[0]
+    assert op['buy_exchange'] == 'binance' and op['sell_exchange'] == 'cex'
+    # 1 @ 100 vs 101.5, 1 @ 100.5 vs 101.5, 1 @ 100.5 vs 101 clear 0.1% after fees;
+    # the 101.5 ask level does not
+    assert op['executable_size'] == pytest.approx(3)
+    assert op['buy_price'] == pytest.approx((100 + 100.5 * 2) / 3)
+    assert op['sell_price'] == pytest.approx((101.5 * 2 + 101) / 3)
+    assert op['buy_limit_price'] == 100.5 and op['sell_limit_price'] == 101
+    assert op['profit_pct'] >= 0.001
+    # Notional cap limits the size
+    engine.max_notional = 150
+    found.clear()
+    engine.check_opportunities()
+    assert found[0]['executable_size'] == pytest.approx(1 + 50 / 100.5)
+
+
+def test_latency_provider_annotates_and_filters():
+    engine = ArbitrageEngine(min_profit_threshold=0.001, max_venue_latency=200)
+    engine.fees = {'binance': {'BTCUSDT': {'taker': 0.001}}, 'cex': {'BTCUSDT': {'taker': 0.001}}}
+    latencies = {'binance': 40.0, 'cex': 90.0}
+    engine.set_latency_provider(latencies.get)
+    engine.update_price('binance', 'BTCUSDT', 60000)
+    engine.update_price('cex', 'BTCUSDT', 60300)
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    engine.check_opportunities()
+    assert found[0]['buy_latency_ms'] == 40.0 and found[0]['sell_latency_ms'] == 90.0
+    # A slow venue suppresses the opportunity
+    latencies['cex'] = 500.0
+    found.clear()
+    engine.check_opportunities()
+    assert not found
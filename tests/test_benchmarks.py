@@ -0,0 +1,33 @@
+import pytest
+from benchmarks.harness import measure, compare
+from benchmarks.run import run
+from exchanges.recorder import FrameRecorder
+from benchmarks.scenarios import synthetic_frames, synthetic_bases
+
+@pytest.mark.asyncio
+async def test_every_scenario_runs_and_reports(tmp_path):
+    recorder = FrameRecorder(str(tmp_path))
+    for i, frame in enumerate(synthetic_frames('binance', synthetic_bases(5), 20)):
+        recorder.record('binance', 1000.0 + i, frame)
+    recorder.close()
+    results = await run(100, frame_paths=[str(tmp_path)])
+    assert 'recorded_frames' in results and 'end_to_end' in results
+    for result in results.values():
+        assert result['msgs_per_sec'] > 0
+        assert result['p50_us'] <= result['p99_us'] <= result['p999_us'] <= result['max_us']
+
+@pytest.mark.asyncio
+async def test_measure_counts_allocations():
+    kept = []
+    result = await measure(lambda i: kept.append(bytearray(10000)), 200, warmup=0)
+    assert result['iterations'] == 200
+    assert result['alloc_bytes'] >= 10000
+    assert result['retained_bytes'] >= 10000
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {'stage': {'msgs_per_sec': 1000, 'p50_us': 100, 'p99_us': 200, 'alloc_bytes': 500}}
+    same = {'stage': {'msgs_per_sec': 900, 'p50_us': 110, 'p99_us': 290, 'alloc_bytes': 520}}
+    assert compare(same, baseline, 0.25) == []
+    slower = {'stage': {'msgs_per_sec': 700, 'p50_us': 140, 'p99_us': 200, 'alloc_bytes': 500}}
+    assert [r.split(':')[1].split()[0] for r in compare(slower, baseline, 0.25)] == ['msgs_per_sec', 'p50_us']
+    assert compare({'new_stage': same['stage']}, baseline, 0.25) == []
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import time
+import pytest
+from config.settings import CONFIG
+from exchanges.binance_pool import BinanceStreamPool
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.pings = []
+    async def send(self, message):
+        self.sent.append((time.monotonic(), json.loads(message)))
+    async def ping(self):
+        self.pings.append(asyncio.get_running_loop().create_future())
+        return self.pings[-1]
+    async def close(self):
+        pass
+
+def _connect(pool):
+    for shard in pool.shards:
+        shard.websocket = FakeSocket()
+        shard.is_connected = True
+
+@pytest.mark.asyncio
+async def test_streams_are_sharded_by_load():
+    pool = BinanceStreamPool(connections=2, max_streams=3)
+    _connect(pool)
+    await pool.subscribe_to_orderbook(['BTCUSDT'], depth="")
+    await pool.subscribe_to_ticker(['BTCUSDT', 'ETHUSDT', 'BNBUSDT'])
+    first, second = pool.shards
+    # The depth stream outweighs the tickers, which all land on the other shard
+    assert first.streams == ['btcusdt@depth@100ms']
+    assert second.streams == ['btcusdt@ticker', 'ethusdt@ticker', 'bnbusdt@ticker']
+    assert second.websocket.sent[0][1]['params'] == second.streams
+    # Both shards are full now, so a new one is opened
+    await pool.subscribe_to_trades(['BTCUSDT', 'ETHUSDT', 'SOLUSDT'])
+    assert len(pool.shards) == 3 and pool.shards[2].streams == ['solusdt@trade']
+    await pool.unsubscribe(['btcusdt@ticker'])
+    assert second.websocket.sent[-1][1] == {
+        'method': 'UNSUBSCRIBE', 'params': ['btcusdt@ticker'], 'id': second.websocket.sent[-1][1]['id']
+    }
+    assert 'btcusdt@ticker' not in pool.streams
+
+@pytest.mark.asyncio
+async def test_subscribe_messages_are_paced(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'binance_subscribe_rate', 20)
+    pool = BinanceStreamPool(connections=1)
+    _connect(pool)
+    for symbol in ('BTCUSDT', 'ETHUSDT', 'BNBUSDT'):
+        await pool.subscribe_to_ticker([symbol])
+    times = [sent_at for sent_at, _ in pool.shards[0].websocket.sent]
+    assert times[2] - times[0] >= 0.09
+
+@pytest.mark.asyncio
+async def test_shards_share_callbacks_and_reconnect_with_their_streams(monkeypatch):
+    import websockets
+    pool = BinanceStreamPool(connections=2)
+    seen = []
+    async def on_ticker(data):
+        seen.append((data['s'], pool.last_recv))
+    pool.register_callback('ticker', on_ticker)
+    pool.shards[1].last_recv = (1.0, 2.0)
+    await pool.shards[1].dispatch({'stream': 'ethusdt@ticker', 'data': {'e': '24hrTicker', 's': 'ETHUSDT'}})
+    assert seen == [('ETHUSDT', (1.0, 2.0))]
+    urls = []
+    async def connect(ws_url):
+        urls.append(ws_url)
+        return FakeSocket()
+    monkeypatch.setattr(websockets, 'connect', connect)
+    await pool.subscribe_to_ticker(['BTCUSDT', 'ETHUSDT'])
+    assert await pool.connect() and pool.is_connected
+    assert sorted(urls) == [
+        'wss://stream.binance.com:9443/stream?streams=btcusdt@ticker',
+        'wss://stream.binance.com:9443/stream?streams=ethusdt@ticker'
+    ]
+
+@pytest.mark.asyncio
+async def test_pong_waits_are_kept_and_cancelled_on_disconnect():
+    pool = BinanceStreamPool(connections=2)
+    _connect(pool)
+    pongs = []
+    pool.bus.subscribe('pong', pongs.append)
+    await pool.ping()
+    first = pool._pong_task
+    await pool.ping()
+    await asyncio.sleep(0)
+    # Only the latest ping is awaited; its pongs are reported once
+    assert first.cancelled() and not pool._pong_task.done()
+    for shard in pool.shards:
+        shard.websocket.pings[-1].set_result(None)
+    await pool._pong_task
+    assert pongs == [{'pong': True}]
+    await pool.ping()
+    pending = pool._pong_task
+    await pool.disconnect()
+    await asyncio.sleep(0)
+    assert pending.cancelled() and pool._pong_task is None
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import pytest
+from exchanges.websocket_manager import WebSocketManager
+from utils.event_bus import EventBus
+
+@pytest.mark.asyncio
+async def test_every_subscriber_gets_the_same_event():
+    bus = EventBus()
+    seen = []
+    async def async_handler(event):
+        seen.append(('async', event))
+    bus.subscribe('price', lambda event: seen.append(('sync', event)))
+    bus.subscribe('price', async_handler)
+    bus.subscribe('price', lambda event: 1 / 0)
+    event = {'last': 1}
+    await bus.publish('price', event)
+    await bus.publish('other', {'last': 2})
+    assert [kind for kind, _ in seen] == ['sync', 'async']
+    assert all(received is event for _, received in seen)
+
+@pytest.mark.asyncio
+async def test_slow_queued_subscriber_does_not_block_others():
+    bus = EventBus()
+    fast, slow = [], []
+    release = asyncio.Event()
+    async def slow_handler(event):
+        await release.wait()
+        slow.append(event)
+    subscription = bus.subscribe('price', slow_handler, queue_size=2)
+    bus.subscribe('price', fast.append)
+    for i in range(5):
+        await bus.publish('price', i)
+    assert fast == [0, 1, 2, 3, 4]
+    release.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    # The backlog keeps only the newest events
+    assert slow == [3, 4]
+    assert subscription.dropped == 3
+    bus.unsubscribe(subscription)
+    assert 'price' in bus.stats() and len(bus.stats()['price']) == 1
+
+@pytest.mark.asyncio
+async def test_manager_and_adapter_callbacks_no_longer_replace_each_other():
+    manager = WebSocketManager()
+    manager.register_handlers()
+    first, second, raw = [], [], []
+    manager.register_price_callback(lambda exchange, symbol, data: first.append(symbol))
+    manager.register_price_callback(lambda exchange, symbol, data: second.append(symbol))
+    manager.binance.register_callback('ticker', raw.append)
+    await manager.binance.handle_message(json.dumps({'e': '24hrTicker', 'E': 1, 's': 'BTCUSDT', 'c': '60000'}))
+    assert first == second == ['BTCUSDT']
+    assert raw and raw[0]['s'] == 'BTCUSDT'
+    assert manager.get_price_data('BTCUSDT')['binance'].last == 60000.0
+
+@pytest.mark.asyncio
+async def test_publish_nowait_tracks_async_handlers(caplog):
+    bus = EventBus()
+    release = asyncio.Event()
+    async def handler(event):
+        await release.wait()
+    async def failing(event):
+        raise ValueError('boom')
+    subscription = bus.subscribe('gap', handler)
+    bus.subscribe('gap', failing, name='failing')
+    bus.publish_nowait('gap', 'binance')
+    for _ in range(3):
+        await asyncio.sleep(0)
+    # Counted once the handler has run, not when it is scheduled
+    assert len(bus._pending) == 1 and subscription.delivered == 0
+    assert 'Error in gap subscriber failing: boom' in caplog.text
+    release.set()
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert not bus._pending and subscription.delivered == 1
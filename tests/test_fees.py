@@ -2,8 +2,7 @@ import pytest
 import asyncio
 from utils.fees import get_all_fees
 
-pytestmark = pytest.mark.asyncio
-
+@pytest.mark.asyncio
 async def test_get_all_fees():
     fees = await get_all_fees()
     assert isinstance(fees, dict)
@@ -12,4 +11,46 @@ async def test_get_all_fees():
     assert 'binance' in fees
     # Each should be a dict or error
     for ex in ['cex', 'gate', 'binance']:
-        assert isinstance(fees[ex], (dict, list)), f"{ex} fees should be dict or list, got {type(fees[ex])}" 
\ No newline at end of file
+        assert isinstance(fees[ex], (dict, list)), f"{ex} fees should be dict or list, got {type(fees[ex])}" 
+from utils.fees import FeeTable, normalize_fees
+
+RAW_FEES = {
+    'binance': [{'symbol': 'BTCUSDT', 'makerCommission': '0.0008', 'takerCommission': '0.0009'}],
+    'gate': {'user_id': 1, 'maker_fee': '0.0015', 'taker_fee': '0.002'},
+    'cex': {'data': {'BTC:USD': {'buy': '0.25', 'sell': '0.25', 'buyMaker': '0.16', 'sellMaker': '0.16'}}}
+}
+
+def test_normalize_fees():
+    table, defaults = normalize_fees(RAW_FEES)
+    assert table[('binance', 'BTCUSDT')] == (0.0008, 0.0009)
+    assert table[('cex', 'BTCUSDT')] == pytest.approx((0.0016, 0.0025))
+    assert defaults['gate'] == (0.0015, 0.002)
+    # Error payloads are skipped
+    assert normalize_fees({'binance': {'error': 'HTTP 401'}}) == ({}, {})
+
+def test_fee_table_lookup_and_cache(tmp_path):
+    path = str(tmp_path / 'fees.json')
+    fees = FeeTable(cache_path=path, ttl=60)
+    fees.load(RAW_FEES)
+    assert fees.get('binance', 'BTCUSDT') == (0.0008, 0.0009)
+    assert fees.get('gate', 'ETHUSDT') == (0.0015, 0.002)
+    assert fees.get('binance', 'ETHUSDT') == (0.001, 0.001)
+    fees.save_cache()
+    cached = FeeTable(cache_path=path, ttl=60)
+    assert cached.load_cache()
+    assert not cached.is_stale()
+    assert cached.get('binance', 'BTCUSDT') == (0.0008, 0.0009)
+    # Defaults served on a miss are not saved as fetched per-pair fees
+    assert ('binance', 'ETHUSDT') not in cached.table and ('gate', 'ETHUSDT') not in cached.table
+    assert not FeeTable(cache_path=str(tmp_path / 'missing.json')).load_cache()
+
+@pytest.mark.asyncio
+async def test_fee_table_refresh_keeps_failed_exchanges(tmp_path):
+    responses = [RAW_FEES, {'binance': {'error': 'HTTP 500'}, 'gate': {'maker_fee': '0.001', 'taker_fee': '0.001'}, 'cex': {'error': 'HTTP 500'}}]
+    async def fetcher():
+        return responses.pop(0)
+    fees = FeeTable(cache_path=str(tmp_path / 'fees.json'), ttl=60, fetcher=fetcher)
+    assert await fees.refresh()
+    assert await fees.refresh()
+    assert fees.get('binance', 'BTCUSDT') == (0.0008, 0.0009)
+    assert fees.get('gate', 'BTCUSDT') == (0.001, 0.001)
@@ -0,0 +1,61 @@
+import pytest
+import asyncio
+import json
+import websockets.exceptions
+from exchanges.ingress import ConflatingQueue
+from exchanges.gate import GateIOWebSocket
+
+@pytest.mark.asyncio
+async def test_conflation_keeps_position_and_latest_value():
+    queue = ConflatingQueue(maxsize=10)
+    queue.put(('tick', 'BTC'), 1)
+    queue.put(('tick', 'ETH'), 2)
+    queue.put(None, 'diff-1')
+    queue.put(None, 'diff-2')
+    queue.put(('tick', 'BTC'), 3)
+    assert [await queue.get() for _ in range(4)] == [3, 2, 'diff-1', 'diff-2']
+    stats = queue.stats()
+    assert stats['conflated'] == 1 and stats['enqueued'] == 5 and stats['depth'] == 0
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest():
+    queue = ConflatingQueue(maxsize=2)
+    for i in range(4):
+        queue.put(None, i)
+    assert queue.stats()['dropped'] == 2
+    assert [await queue.get(), await queue.get()] == [2, 3]
+
+class FakeSocket:
+    def __init__(self, frames):
+        self.frames = list(frames)
+    async def recv(self):
+        if not self.frames:
+            raise websockets.exceptions.ConnectionClosed(None, None)
+        await asyncio.sleep(0)
+        return self.frames.pop(0)
+
+@pytest.mark.asyncio
+async def test_slow_callback_does_not_block_reads():
+    gate = GateIOWebSocket()
+    ticks = [json.dumps({'channel': 'spot.tickers', 'event': 'update',
+                         'result': {'currency_pair': 'BTC_USDT', 'last': str(60000 + i)}}) for i in range(50)]
+    gate.websocket = FakeSocket(ticks)
+    gate.is_connected = True
+    seen = []
+    release = asyncio.Event()
+    async def slow_callback(data):
+        seen.append(data['result']['last'])
+        await release.wait()
+    gate.register_callback('spot.tickers', slow_callback)
+    stats_at_close = {}
+    original_clear = gate.ingress.clear
+    def clear():
+        stats_at_close.update(gate.ingress.stats())
+        original_clear()
+    gate.ingress.clear = clear
+    await asyncio.wait_for(gate.listen(), timeout=1)
+    # All frames were read while the first callback was still blocked,
+    # and the backlog collapsed into a single pending tick
+    assert seen == ['60000']
+    assert stats_at_close['enqueued'] == 50 and stats_at_close['depth'] == 1
+    assert stats_at_close['conflated'] == 48
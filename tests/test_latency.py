@@ -0,0 +1,33 @@
+import pytest
+from utils.latency import LatencyHistogram, RollingHistogram
+
+def test_rolling_histogram_window():
+    histogram = RollingHistogram(size=3)
+    for value in (100, 1, 2, 3):
+        histogram.record(value)
+    assert histogram.count == 4
+    assert histogram.summary()['max'] == 3
+    assert histogram.percentile(50) == 2
+
+def test_latency_histogram_percentiles_within_precision():
+    histogram = LatencyHistogram(precision=0.05)
+    for value in range(1, 1001):
+        histogram.record(float(value))
+    assert histogram.count == 1000
+    assert histogram.percentile(50) == pytest.approx(500, rel=0.05)
+    assert histogram.percentile(99) == pytest.approx(990, rel=0.05)
+    assert histogram.percentile(100) == 1000
+    size = len(histogram.counts)
+    for _ in range(10000):
+        histogram.record(5.0)
+    # Memory does not grow with the number of samples
+    assert len(histogram.counts) == size
+
+def test_latency_histogram_negative_and_overflow():
+    histogram = LatencyHistogram(max_value=1000)
+    histogram.record(-3.0)
+    histogram.record(5000.0)
+    summary = histogram.summary()
+    assert summary['negative'] == 1 and summary['max'] == 5000.0
+    assert histogram.percentile(100) == 5000.0
+    assert LatencyHistogram().summary()['p50'] is None
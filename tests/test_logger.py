@@ -0,0 +1,76 @@
+import logging
+import pytest
+from utils import logger as log_utils
+from utils.logger import RateSampler, get_logger, log_sampled
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    logger = logging.getLogger('test_logger')
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger, handler
+    logger.removeHandler(handler)
+
+
+def test_rate_sampler_caps_and_counts_suppressed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(log_utils.time, 'monotonic', lambda: now[0])
+    sampler = RateSampler({'ticker': 2.0})
+    assert sampler.allow('ticker') == 0
+    assert sampler.allow('ticker') == 0
+    assert sampler.allow('ticker') is None
+    assert sampler.allow('ticker') is None
+    now[0] += 0.5  # refills one token
+    assert sampler.allow('ticker') == 2
+    assert sampler.allow('ticker') is None
+
+
+def test_rate_sampler_unlimited_category():
+    sampler = RateSampler({'ticker': None})
+    assert all(sampler.allow('ticker') == 0 for _ in range(100))
+
+
+def test_log_sampled_reports_suppressed(captured, monkeypatch):
+    logger, handler = captured
+    monkeypatch.setattr(log_utils, 'sampler', RateSampler({'ticker': 1.0}))
+    for i in range(5):
+        log_sampled(logger, 'ticker', 'tick %s', i)
+    assert [r.getMessage() for r in handler.records] == ['tick 0']
+    log_utils.sampler._buckets['ticker'][0] = 1.0
+    log_sampled(logger, 'ticker', 'tick %s', 5)
+    assert handler.records[-1].getMessage() == 'tick 5 (4 similar suppressed)'
+
+
+def test_log_sampled_skips_disabled_level(captured, monkeypatch):
+    logger, handler = captured
+    logger.setLevel(logging.INFO)
+    sampler = RateSampler({'ticker': 1.0})
+    monkeypatch.setattr(log_utils, 'sampler', sampler)
+    log_sampled(logger, 'ticker', 'tick')
+    assert handler.records == []
+    # Disabled messages must not consume the category's budget
+    assert 'ticker' not in sampler._buckets
+
+
+def test_get_logger_writes_through_queue(tmp_path):
+    log_utils.shutdown_logging()
+    log_file = tmp_path / 'logs' / 'arbitrage.log'
+    log_utils.setup_logging('INFO', str(log_file))
+    try:
+        get_logger('test').info('hello %s', 'queue')
+    finally:
+        # Stopping the listener flushes the queue
+        log_utils.shutdown_logging()
+    assert 'arbitrage.test: hello queue' in log_file.read_text()
@@ -0,0 +1,57 @@
+import json
+import numpy as np
+import pytest
+from exchanges.market_table import MarketTable
+from exchanges.websocket_manager import WebSocketManager
+from services.vectorized_engine import VectorizedArbitrageEngine
+from utils.symbols import SymbolRegistry
+
+TICKERS = [
+    {'e': '24hrTicker', 'E': 1700000000000, 's': 'BTCUSDT', 'c': '60000.0', 'b': '59990.0', 'a': '60010.0'},
+    {'e': '24hrTicker', 'E': 1700000000000, 's': 'ETHUSDT', 'c': '3000.0', 'b': '2999.0', 'a': '3001.0'}
+]
+
+def test_ingest_reports_only_changed_rows():
+    symbols = SymbolRegistry()
+    table = MarketTable('binance', symbols, capacity=1)
+    rows = table.ingest_binance_tickers(TICKERS)
+    assert sorted(symbols.names[row] for row in rows) == ['BTCUSDT', 'ETHUSDT']
+    assert table.quote('BTCUSDT') == {'last': 60000.0, 'bid': 59990.0, 'ask': 60010.0, 'event_time': 1700000000000.0}
+    moved = [dict(TICKERS[0]), dict(TICKERS[1], c='3005.0')]
+    rows = table.ingest_binance_tickers(moved)
+    assert rows.tolist() == [symbols.id('ETHUSDT')]
+    assert sorted(table.take_dirty().tolist()) == sorted([symbols.id('BTCUSDT'), symbols.id('ETHUSDT')])
+    assert not len(table.take_dirty())
+
+def test_mini_tickers_leave_bid_ask_empty():
+    table = MarketTable('binance', SymbolRegistry())
+    table.ingest_binance_tickers([{'e': '24hrMiniTicker', 'E': 1, 's': 'BTCUSDT', 'c': '60000.0'}])
+    # Repeating an unchanged mini ticker with NaN bid/ask is not a change
+    assert not len(table.ingest_binance_tickers([{'e': '24hrMiniTicker', 'E': 2, 's': 'BTCUSDT', 'c': '60000.0'}]))
+    assert table.quote('BTCUSDT')['bid'] is None
+    table.invalidate()
+    assert table.quote('BTCUSDT') is None
+
+@pytest.mark.asyncio
+async def test_ticker_array_feeds_engine_in_one_call():
+    symbols = SymbolRegistry()
+    manager = WebSocketManager(symbols=symbols)
+    manager.register_handlers()
+    engine = VectorizedArbitrageEngine(symbol_registry=symbols, incremental=True, min_profit_threshold=0.001)
+    engine.fees = {}
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    calls = []
+    manager.register_bulk_callback(lambda exchange, rows, prices: calls.append(len(rows)))
+    manager.register_bulk_callback(engine.update_rows)
+    engine.update_price('gate', 'ETHUSDT', 3100)
+    manager.binance.last_recv = (1700000000.050, 1.0)
+    await manager.binance.handle_message(json.dumps({'stream': '!ticker@arr', 'data': TICKERS}))
+    assert calls == [2]
+    assert engine.get_price('binance', 'BTCUSDT') == 60000.0
+    assert [(op['symbol'], op['buy_exchange']) for op in found] == [('ETHUSDT', 'binance')]
+    assert manager.get_feed_latency_stats()['binance']['count'] == 1
+    # Raw (/ws) frames are the bare list
+    await manager.binance.handle_message(json.dumps([dict(TICKERS[0], c='60100.0')]))
+    assert calls == [2, 1]
+    assert engine.get_price('binance', 'BTCUSDT') == 60100.0
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+import pytest
+import websockets
+from config.settings import CONFIG
+from exchanges import binance, cex, gate
+from exchanges.mock_exchanges import MockExchanges, FeedProfile
+from exchanges.websocket_manager import WebSocketManager
+from utils.symbols import SymbolRegistry
+
+async def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not met in time'
+        await asyncio.sleep(0.01)
+
+def point_config_at(mocks, monkeypatch):
+    for name, server in mocks.servers.items():
+        monkeypatch.setitem(CONFIG['ws_urls'], name, server.ws_url)
+        monkeypatch.setitem(CONFIG['rest_urls'], name, server.rest_url)
+
+@pytest.mark.asyncio
+async def test_manager_streams_and_reconnects_against_mocks(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'reconnect_delay', 10)
+    async with MockExchanges({'gate': FeedProfile(rate=500, skew=0.01)}) as mocks:
+        point_config_at(mocks, monkeypatch)
+        manager = WebSocketManager(symbols=SymbolRegistry(), workers=False)
+        trades = []
+        manager.register_trade_callback(trades.append)
+        await manager.connect_all()
+        pairs = {name: ['BTCUSDT'] for name in manager.exchanges}
+        await manager.subscribe_to_tickers(pairs)
+        await manager.subscribe_to_orderbooks(pairs)
+        await manager.subscribe_to_trades(pairs)
+        listener = asyncio.create_task(manager.start_listening())
+        try:
+            await wait_for(lambda: len(manager.get_price_data('BTCUSDT')) == 3)
+            await wait_for(lambda: {t.exchange for t in trades} >= {'gate', 'binance'})
+            quotes = manager.get_price_data('BTCUSDT')
+            assert quotes['gate'].last > quotes['binance'].last * 1.005
+            assert quotes['binance'].bid < quotes['binance'].ask
+            await wait_for(lambda: manager.order_books.get_book('gate', 'BTCUSDT') is not None)
+
+            dropped = time.time()
+            await mocks['gate'].drop_connections()
+            await wait_for(lambda: manager.connection_status['gate']['reconnects'] == 1)
+            await wait_for(lambda: 'gate' in manager.get_price_data('BTCUSDT')
+                           and manager.get_price_data('BTCUSDT')['gate'].recv_ts > dropped)
+            assert mocks['gate'].connections_accepted == 2
+        finally:
+            await manager.disconnect_all()
+            listener.cancel()
+
+@pytest.mark.asyncio
+async def test_latency_and_rate_are_injected():
+    profile = FeedProfile(rate=200, latency_ms=50)
+    async with MockExchanges({'binance': profile}, exchanges=['binance']) as mocks:
+        server = mocks['binance']
+        async with websockets.connect(server.ws_url.replace('/ws/', '/stream?streams=btcusdt@ticker')) as ws:
+            sent = time.monotonic()
+            await ws.send(json.dumps({'method': 'SUBSCRIBE', 'params': ['ethusdt@trade'], 'id': 7}))
+            frames = []
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame.get('id') == 7:
+                    break
+                frames.append(frame)
+            assert time.monotonic() - sent >= 0.05
+            started = time.monotonic()
+            while time.monotonic() - started < 0.5:
+                frames.append(json.loads(await ws.recv()))
+        streams = {frame['stream'] for frame in frames}
+        assert streams == {'btcusdt@ticker', 'ethusdt@trade'}
+        assert 50 <= len(frames) <= 200
+
+@pytest.mark.asyncio
+async def test_rest_helpers_use_configured_urls(monkeypatch):
+    async with MockExchanges() as mocks:
+        point_config_at(mocks, monkeypatch)
+        snapshot = await binance.get_orderbook_snapshot('BTCUSDT', 10)
+        assert snapshot['update_id'] == 1000 and len(snapshot['bids']) == 10
+        assert ('BTC', 'USDT') in await gate.get_symbols()
+        assert ('BTC', 'USD') in await cex.get_symbols()
+        book = await cex.get_orderbook_snapshot('ETH:USD', 5)
+        assert float(book['bids'][0][0]) < float(book['asks'][0][0])
@@ -0,0 +1,72 @@
+import pytest
+import asyncio
+from exchanges.order_book import OrderBook, OrderBookManager
+
+def test_snapshot_and_top_of_book():
+    book = OrderBook('binance', 'BTCUSDT')
+    book.apply_snapshot(
+        bids=[['59990', '1.5'], ['60000', '2'], ['59980', '0']],
+        asks=[['60020', '1'], ['60010', '0.5']],
+        update_id=100
+    )
+    assert book.best_bid() == (60000.0, 2.0)
+    assert book.best_ask() == (60010.0, 0.5)
+    assert list(book.bids.levels()) == [(60000.0, 2.0), (59990.0, 1.5)]
+    assert book.top_of_book() == {'bid': 60000.0, 'bid_size': 2.0, 'ask': 60010.0, 'ask_size': 0.5}
+
+def test_diff_updates_and_depth_walk():
+    book = OrderBook('binance', 'BTCUSDT')
+    book.apply_snapshot([['60000', '1']], [['60010', '1'], ['60020', '2']], update_id=100)
+    # Stale diff is ignored
+    assert book.apply_diff([['60000', '5']], [], first_id=90, last_id=100)
+    assert book.best_bid() == (60000.0, 1.0)
+    assert book.apply_diff([['60005', '3']], [['60010', '0']], first_id=99, last_id=101)
+    assert book.best_bid() == (60005.0, 3.0)
+    assert book.best_ask() == (60020.0, 2.0)
+    filled, notional = book.asks.walk(1.5)
+    assert filled == 1.5 and notional == pytest.approx(1.5 * 60020)
+    # A gap in sequence numbers desyncs the book
+    assert not book.apply_diff([], [['60030', '1']], first_id=105, last_id=106)
+    assert not book.is_synced
+
+def test_max_depth_drops_worst_levels():
+    book = OrderBook('gate', 'BTCUSDT', max_depth=2)
+    book.apply_snapshot([['1', '1'], ['2', '1'], ['3', '1']], [], update_id=1)
+    assert list(book.bids.levels()) == [(3.0, 1.0), (2.0, 1.0)]
+    book.apply_diff([['4', '1']], [], first_id=2, last_id=2)
+    assert list(book.bids.levels()) == [(4.0, 1.0), (3.0, 1.0)]
+
+@pytest.mark.asyncio
+async def test_manager_resyncs_from_snapshot_on_gap():
+    manager = OrderBookManager()
+    async def fetch(symbol):
+        await asyncio.sleep(0)
+        return {'bids': [['100', '1']], 'asks': [['101', '1']], 'update_id': 10}
+    manager.register_snapshot_fetcher('binance', fetch)
+    # First diff arrives before any snapshot and triggers a resync
+    manager.on_diff('binance', 'BTCUSDT', [['100', '2']], [], first_id=9, last_id=11)
+    # Diffs received while the snapshot is in flight are buffered and replayed
+    manager.on_diff('binance', 'BTCUSDT', [], [['101', '0'], ['102', '4']], first_id=12, last_id=12)
+    await asyncio.sleep(0.01)
+    top = manager.top_of_book('binance', 'BTCUSDT')
+    assert top == {'bid': 100.0, 'bid_size': 2.0, 'ask': 102.0, 'ask_size': 4.0}
+
+@pytest.mark.asyncio
+async def test_manager_keeps_one_resync_per_book_and_cancels_on_close():
+    manager = OrderBookManager()
+    release = asyncio.Event()
+    calls = []
+    async def fetch(symbol):
+        calls.append(symbol)
+        await release.wait()
+        return {'bids': [['100', '1']], 'asks': [['101', '1']], 'update_id': 10}
+    manager.register_snapshot_fetcher('binance', fetch)
+    manager.on_diff('binance', 'BTCUSDT', [['100', '2']], [], first_id=9, last_id=11)
+    manager.on_diff('binance', 'ETHUSDT', [['10', '2']], [], first_id=9, last_id=11)
+    await asyncio.sleep(0)
+    task = manager._resync_tasks[('binance', manager.symbols.id('BTCUSDT'))]
+    # A second gap on the same book joins the resync already in flight
+    assert manager._start_resync(('binance', manager.symbols.id('BTCUSDT'))) is task
+    assert len(calls) == 2 and len(manager._resync_tasks) == 2
+    await manager.close()
+    assert task.cancelled() and not manager._resync_tasks and not manager._resyncing
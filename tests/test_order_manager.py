@@ -1,21 +1,66 @@
 import pytest
 import asyncio
+from config.settings import CONFIG
+from exchanges import binance, rest
+from exchanges.mock_exchanges import MockExchanges
+from exchanges.rate_limit import RateLimiter
 from services.order_manager import OrderManager
+from services.order_store import OrderStore
+
+CREDENTIALS = ('BINANCE_API_KEY', 'BINANCE_API_SECRET', 'GATEIO_API_KEY', 'GATEIO_API_SECRET',
+               'CEXIO_API_KEY', 'CEXIO_API_SECRET')
+
+def use_mocks(mocks, monkeypatch):
+    for variable in CREDENTIALS:
+        monkeypatch.setenv(variable, 'test')
+    monkeypatch.setattr(rest, '_clients', {})
+    monkeypatch.setitem(CONFIG, 'order_poll_interval', 0.01)
+    for name, server in mocks.servers.items():
+        monkeypatch.setitem(CONFIG['rest_urls'], name, server.rest_url)
 
 @pytest.mark.asyncio
-async def test_order_manager_success():
-    manager = OrderManager()
-    results = []
-    manager.register_callback(lambda r: results.append(r))
-    opportunity = {
-        'symbol': 'BTCUSDT',
-        'buy_exchange': 'binance',
-        'sell_exchange': 'cex',
-        'buy_price': 60000,
-        'sell_price': 60200
-    }
-    await manager.submit_arbitrage_opportunity(opportunity, amount=0.01)
-    assert results and results[0]['status'] == 'success'
+async def test_order_manager_success(monkeypatch):
+    async with MockExchanges(exchanges=['binance', 'cex']) as mocks:
+        use_mocks(mocks, monkeypatch)
+        manager = OrderManager()
+        results = []
+        manager.register_callback(lambda r: results.append(r))
+        opportunity = {
+            'symbol': 'BTCUSDT',
+            'buy_exchange': 'binance',
+            'sell_exchange': 'cex',
+            'buy_price': 60000,
+            'sell_price': 60200
+        }
+        try:
+            await manager.submit_arbitrage_opportunity(opportunity, amount=0.01)
+        finally:
+            await rest.close_clients()
+        assert results and results[0]['status'] == 'success'
+        assert [order['symbol'] for order in mocks['binance'].orders.values()] == ['BTCUSDT']
+        assert results[0]['sell_order']['filled'] == pytest.approx(0.01)
+
+@pytest.mark.asyncio
+async def test_orders_reuse_pooled_connections_ahead_of_refreshes(monkeypatch):
+    async with MockExchanges(exchanges=['binance']) as mocks:
+        use_mocks(mocks, monkeypatch)
+        server = mocks['binance']
+        client = rest.get_client('binance')
+        try:
+            await client.warm_up(2)
+            connections = len(server.rest_clients)
+            # 200 weight/s: each queued snapshot below waits 0.25s
+            client.limiter = RateLimiter('binance', {'weight': (50, 0.25), 'orders': (100, 10)}, headroom=1.0)
+            await client.limiter.acquire({'weight': 50})
+            snapshots = [asyncio.create_task(binance.get_orderbook_snapshot('BTCUSDT', 1000)) for _ in range(2)]
+            await asyncio.sleep(0)
+            order = await OrderManager().place_order('binance', 'BTCUSDT', 'buy', 0.01, 60000)
+            # The order went out ahead of both snapshots queued before it
+            assert order['status'] == 'new' and not any(task.done() for task in snapshots)
+            assert all('bids' in snapshot for snapshot in await asyncio.gather(*snapshots))
+            assert len(server.rest_clients) == connections and server.rest_requests == 5
+        finally:
+            await rest.close_clients()
 
 @pytest.mark.asyncio
 async def test_order_manager_buy_fail(monkeypatch):
@@ -41,7 +86,7 @@ async def test_order_manager_sell_fail(monkeypatch):
     results = []
     manager.register_callback(lambda r: results.append(r))
     # Patch place_order to simulate buy success, sell fail
-    async def place_order(exchange, symbol, side, amount, price):
+    async def place_order(exchange, symbol, side, amount, price, **kwargs):
         if side == 'buy':
             return {'status': 'filled'}
         else:
@@ -55,4 +100,132 @@ async def test_order_manager_sell_fail(monkeypatch):
         'sell_price': 60200
     }
     await manager.submit_arbitrage_opportunity(opportunity, amount=0.01)
-    assert results and results[0]['status'] == 'failed' and results[0]['reason'] == 'sell_failed' 
\ No newline at end of file
+    assert results and results[0]['status'] == 'failed' and results[0]['reason'] == 'sell_failed' 
+@pytest.mark.asyncio
+async def test_order_manager_uses_executable_size():
+    manager = OrderManager()
+    results = []
+    manager.register_callback(lambda r: results.append(r))
+    placed = []
+    async def place_order(exchange, symbol, side, amount, price, **kwargs):
+        placed.append((side, amount, price))
+        return {'status': 'filled'}
+    manager.place_order = place_order
+    opportunity = {
+        'symbol': 'BTCUSDT',
+        'buy_exchange': 'binance',
+        'sell_exchange': 'cex',
+        'buy_price': 60000.5,
+        'sell_price': 60199.5,
+        'buy_limit_price': 60001,
+        'sell_limit_price': 60199,
+        'executable_size': 0.25
+    }
+    await manager.submit_arbitrage_opportunity(opportunity)
+    assert placed == [('buy', 0.25, 60001), ('sell', 0.25, 60199)]
+    assert results[0]['status'] == 'success'
+    # Opportunities without a size are rejected before any order is placed
+    results.clear()
+    del opportunity['executable_size']
+    await manager.submit_arbitrage_opportunity(opportunity)
+    assert results[0]['reason'] == 'no_executable_size' and len(placed) == 2
+
+def recording_venue(fills=None, delays=None, resting=()):
+    """place_order stub: fills[(exchange, side)] is a list of filled amounts, one per call;
+    orders on the (exchange, side) pairs in resting are accepted but never fill"""
+    placed = []
+    async def place_order(exchange, symbol, side, amount, price, **kwargs):
+        placed.append((exchange, side, amount, round(price, 2)))
+        number = len(placed)
+        await asyncio.sleep((delays or {}).get((exchange, side), 0))
+        order = {'exchange': exchange, 'symbol': symbol, 'side': side, 'amount': amount, 'price': price}
+        if (exchange, side) in resting:
+            return {**order, 'status': 'new', 'order_id': f'{exchange}-{number}', 'filled': 0.0}
+        queue = (fills or {}).get((exchange, side))
+        filled = queue.pop(0) if queue else amount
+        status = 'filled' if filled >= amount else ('partially_filled' if filled else 'failed')
+        return {**order, 'status': status, 'filled': filled}
+    return place_order, placed
+
+OPPORTUNITY = {'symbol': 'BTCUSDT', 'buy_exchange': 'binance', 'sell_exchange': 'cex',
+               'buy_price': 60000, 'sell_price': 60200}
+
+@pytest.mark.asyncio
+async def test_concurrent_legs_are_placed_together():
+    manager = OrderManager(concurrent=True)
+    results = []
+    manager.register_callback(results.append)
+    manager.place_order, placed = recording_venue(delays={('binance', 'buy'): 0.1, ('cex', 'sell'): 0.1})
+    started = asyncio.get_running_loop().time()
+    await manager.submit_arbitrage_opportunity(OPPORTUNITY, amount=0.01)
+    assert asyncio.get_running_loop().time() - started < 0.18
+    assert results[0]['status'] == 'success' and len(placed) == 2
+
+@pytest.mark.asyncio
+async def test_failed_leg_is_unwound_on_the_filled_venue():
+    manager = OrderManager(concurrent=True)
+    results = []
+    manager.register_callback(results.append)
+    manager.place_order, placed = recording_venue({('cex', 'sell'): [0]})
+    await manager.submit_arbitrage_opportunity(OPPORTUNITY, amount=0.01)
+    # The bought 0.01 is sold back on binance, crossing by unwind_slippage
+    assert placed[2] == ('binance', 'sell', 0.01, 59880.0)
+    result = results[0]
+    assert (result['status'], result['reason']) == ('failed', 'sell_failed')
+    assert result['unwind']['status'] == 'filled'
+
+@pytest.mark.asyncio
+async def test_partial_fills_are_balanced():
+    manager = OrderManager(concurrent=True)
+    results = []
+    manager.register_callback(results.append)
+    manager.place_order, placed = recording_venue({('binance', 'buy'): [0.004]})
+    await manager.submit_arbitrage_opportunity(OPPORTUNITY, amount=0.01)
+    # Sold 0.006 more than bought: buy it back where it was sold
+    assert placed[2][:2] == ('cex', 'buy') and placed[2][2] == pytest.approx(0.006)
+    assert (results[0]['status'], results[0]['bought'], results[0]['sold']) == ('partial', 0.004, 0.01)
+
+@pytest.mark.asyncio
+async def test_leg_timeout_and_hedge_mode():
+    manager = OrderManager(concurrent=True, order_timeout=0.05, unwind_mode='hedge', order_store=OrderStore())
+    results = []
+    manager.register_callback(results.append)
+    manager.place_order, placed = recording_venue(resting={('binance', 'buy')})
+    cancelled = []
+    async def cancel_order(order):
+        cancelled.append((order['order_id'], len(placed)))
+        return {**order, 'status': 'cancelled', 'filled': 0.0}
+    manager.cancel_order = cancel_order
+    await manager.submit_arbitrage_opportunity(OPPORTUNITY, amount=0.01)
+    result = results[0]
+    assert result['reason'] == 'buy_timeout'
+    # The missing buy is retried on binance, which times out again, so cex buys back
+    assert [p[:2] for p in placed[2:]] == [('binance', 'buy'), ('cex', 'buy')]
+    assert result['hedge']['status'] == 'timeout' and result['unwind']['status'] == 'filled'
+    # Each timed-out order was cancelled before anything else was placed, and is reported
+    assert cancelled == [('binance-1', 2), ('binance-3', 3)]
+    assert [(order['side'], order['cancel']['status']) for order in result['unresolved']] == \
+        [('buy', 'cancelled'), ('buy', 'cancelled')]
+
+@pytest.mark.asyncio
+async def test_timed_out_leg_is_cancelled_before_unwinding(monkeypatch):
+    async with MockExchanges(exchanges=['binance', 'cex']) as mocks:
+        use_mocks(mocks, monkeypatch)
+        # Binance rests the buy; 40% of it turns out filled once it is cancelled
+        mocks['binance'].hold_orders = True
+        mocks['binance'].fill_ratio = 0.4
+        manager = OrderManager(concurrent=True, order_timeout=0.2)
+        results = []
+        manager.register_callback(results.append)
+        try:
+            await manager.submit_arbitrage_opportunity(OPPORTUNITY, amount=0.01)
+        finally:
+            await rest.close_clients()
+        result = results[0]
+        assert (result['status'], result['reason']) == ('partial', 'buy_timeout')
+        assert result['bought'] == pytest.approx(0.004) and result['sold'] == pytest.approx(0.01)
+        [buy] = result['unresolved']
+        assert buy['cancel']['status'] == 'cancelled' and not mocks['binance'].orders[buy['order_id']]['open']
+        # Only the unmatched 0.006 is bought back, on cex where it was sold
+        assert result['unwind']['status'] == 'filled' and result['unwind']['amount'] == pytest.approx(0.006)
+        assert [order['side'] for order in mocks['cex'].orders.values()] == ['sell', 'buy']
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from exchanges.records import OrderUpdate
+from services.order_manager import OrderManager
+from services.order_store import OrderStore
+
+@pytest.mark.asyncio
+async def test_wait_returns_final_state():
+    store = OrderStore()
+    store.track('binance', 1, 'BTCUSDT', 'buy', 0.01, 60000)
+    waiter = asyncio.create_task(store.wait('binance', '1'))
+    await asyncio.sleep(0)
+    store.apply(OrderUpdate('binance', '1', 'partially_filled', filled=0.004))
+    assert not waiter.done()
+    store.apply(OrderUpdate('binance', '1', 'filled', filled=0.01, avg_price=59990))
+    final = await waiter
+    assert (final.status, final.filled, final.symbol, final.side) == ('filled', 0.01, 'BTCUSDT', 'buy')
+    assert await store.wait('binance', 1) is final
+    with pytest.raises(asyncio.TimeoutError):
+        await store.wait('binance', 2, timeout=0.01)
+    assert not store._waiters
+
+def test_out_of_order_events_never_regress():
+    store = OrderStore()
+    # The fill is reported before the REST response names the order
+    store.apply(OrderUpdate('gate', '7', 'filled', filled=1.0, amount=1.0))
+    store.track('gate', '7', 'ETHUSDT', 'sell', 1.0, 3000)
+    store.apply(OrderUpdate('gate', '7', 'new', filled=0.0))
+    order = store.get('gate', 7)
+    assert (order.status, order.filled, order.symbol) == ('filled', 1.0, 'ETHUSDT')
+    assert store.open_orders() == []
+
+def test_fills_and_remaining_amounts():
+    store = OrderStore()
+    store.track('cex', '9', 'BTCUSDT', 'buy', 2.0, 100)
+    store.apply_fill('cex', '9', 'a', 0.5, 100, fee=0.1)
+    store.apply_fill('cex', '9', 'a', 0.5, 100, fee=0.1)
+    store.apply_fill('cex', '9', 'b', 0.5, 102, fee=0.1)
+    order = store.get('cex', '9')
+    assert (order.status, order.filled, order.avg_price, order.fee) == ('partially_filled', 1.0, 101, 0.2)
+    # CEX.IO order events only say what remains
+    store.track('cex', '10', 'BTCUSDT', 'buy', 2.0, 100)
+    store.apply(OrderUpdate('cex', '10', 'new', remaining=1.5))
+    assert (store.get('cex', '10').status, store.get('cex', '10').filled) == ('partially_filled', 0.5)
+
+@pytest.mark.asyncio
+async def test_eviction_keeps_awaited_orders():
+    store = OrderStore(max_orders=2)
+    store.track('binance', 1, 'BTCUSDT', 'buy', 1, 1)
+    waiter = asyncio.create_task(store.wait('binance', 1))
+    await asyncio.sleep(0)
+    for order_id in (2, 3, 4):
+        store.apply(OrderUpdate('binance', order_id, 'filled', filled=1))
+    assert list(store.orders) == [('binance', '1'), ('binance', '4')]
+    store.apply(OrderUpdate('binance', 1, 'cancelled'))
+    assert (await waiter).status == 'cancelled'
+
+@pytest.mark.asyncio
+async def test_order_manager_awaits_open_orders_in_store():
+    store = OrderStore()
+    manager = OrderManager(order_timeout=1, order_store=store)
+    results = []
+    manager.register_callback(results.append)
+
+    async def place_order(exchange, symbol, side, amount, price, **kwargs):
+        order_id = f'{exchange}-{side}'
+        # The fill shows up on the private stream shortly after the order is accepted
+        asyncio.get_running_loop().call_later(0.05, store.apply,
+                                              OrderUpdate(exchange, order_id, 'filled', filled=amount))
+        return {'exchange': exchange, 'symbol': symbol, 'side': side, 'amount': amount, 'price': price,
+                'status': 'new', 'order_id': order_id}
+    manager.place_order = place_order
+    opportunity = {'symbol': 'BTCUSDT', 'buy_exchange': 'binance', 'sell_exchange': 'gate',
+                   'buy_price': 60000, 'sell_price': 60300}
+    await manager.submit_arbitrage_opportunity(opportunity, amount=0.01)
+    assert results[-1]['status'] == 'success'
+    assert results[-1]['sell_order']['filled'] == 0.01
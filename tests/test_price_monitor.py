@@ -28,4 +28,36 @@ async def test_price_monitor_callback(monkeypatch):
         results.append((exchange, symbol, price_data))
     monitor.register_callback(cb)
     await monitor.start()
-    assert results and results[0][0] == 'binance' and results[0][1] == 'BTCUSDT' and results[0][2]['price'] == 60000 
\ No newline at end of file
+    assert results and results[0][0] == 'binance' and results[0][1] == 'BTCUSDT' and results[0][2]['price'] == 60000 
+@pytest.mark.asyncio
+async def test_all_market_tickers_reach_the_engine(monkeypatch):
+    from config.settings import CONFIG
+    from exchanges.mock_exchanges import MockExchanges, FeedProfile
+    from exchanges.replay import connect_engine
+    from exchanges.websocket_manager import WebSocketManager
+    from services.vectorized_engine import VectorizedArbitrageEngine
+    from utils.symbols import SymbolRegistry
+    async with MockExchanges({'gate': FeedProfile(skew=0.05)}) as mocks:
+        for name, server in mocks.servers.items():
+            monkeypatch.setitem(CONFIG['ws_urls'], name, server.ws_url)
+            monkeypatch.setitem(CONFIG['rest_urls'], name, server.rest_url)
+        symbols = SymbolRegistry()
+        # Binance quotes only arrive as !ticker@arr bulk frames
+        monitor = PriceMonitor(pairs={'gate': ['BTCUSDT']}, all_market_tickers=True)
+        monitor.ws_manager = WebSocketManager(symbols=symbols, workers=False)
+        engine = VectorizedArbitrageEngine(symbol_registry=symbols, incremental=True, min_profit_threshold=0.01)
+        engine.fees = {}
+        found = []
+        engine.set_opportunity_callback(found.append)
+        connect_engine(monitor.ws_manager, engine)
+        task = asyncio.create_task(monitor.start())
+        try:
+            deadline = asyncio.get_running_loop().time() + 5
+            while not any(op['symbol'] == 'BTCUSDT' for op in found):
+                assert asyncio.get_running_loop().time() < deadline, 'no opportunity from bulk frames'
+                await asyncio.sleep(0.01)
+        finally:
+            await monitor.ws_manager.disconnect_all()
+            task.cancel()
+        op = next(op for op in found if op['symbol'] == 'BTCUSDT')
+        assert (op['buy_exchange'], op['sell_exchange']) == ('binance', 'gate')
@@ -0,0 +1,73 @@
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from exchanges.rate_limit import RateLimiter, PRIORITY_URGENT, PRIORITY_ORDER, PRIORITY_REFRESH
+from exchanges.rest import RestClient
+
+async def drain(limiter, bucket):
+    await limiter.acquire({bucket: limiter.buckets[bucket].capacity})
+
+@pytest.mark.asyncio
+async def test_queued_requests_are_granted_by_priority():
+    # 100 tokens/s: each queued request below waits about 50ms
+    limiter = RateLimiter('binance', {'weight': (10, 0.1)}, headroom=1.0)
+    await drain(limiter, 'weight')
+    granted = []
+
+    async def request(name, priority):
+        await limiter.acquire({'weight': 5}, priority)
+        granted.append(name)
+    await asyncio.gather(request('refresh', PRIORITY_REFRESH), request('order', PRIORITY_ORDER),
+                         request('cancel', PRIORITY_URGENT))
+    assert granted == ['cancel', 'order', 'refresh']
+    assert limiter.queued == 3
+
+@pytest.mark.asyncio
+async def test_waiting_request_only_blocks_its_own_buckets():
+    limiter = RateLimiter('gate', {'orders': (1, 10), 'public': (10, 1)}, headroom=1.0)
+    await drain(limiter, 'orders')
+    order = asyncio.create_task(limiter.acquire({'orders': 1}, PRIORITY_URGENT))
+    await asyncio.sleep(0)
+    started = time.monotonic()
+    await limiter.acquire({'public': 1}, PRIORITY_REFRESH)
+    assert time.monotonic() - started < 0.05
+    assert not order.done()
+    order.cancel()
+    await asyncio.gather(order, return_exceptions=True)
+    assert not limiter._waiters
+
+def test_usage_headers_lower_the_buckets():
+    limiter = RateLimiter('binance', {'weight': (6000, 60), 'orders': (100, 10)}, headroom=0.8)
+    limiter.observe({'X-MBX-USED-WEIGHT-1M': '4700', 'X-MBX-ORDER-COUNT-10S': '10'}, {'weight': 1})
+    assert limiter.buckets['weight'].tokens == pytest.approx(100)
+    assert limiter.buckets['orders'].tokens == pytest.approx(70)
+    gate = RateLimiter('gate', {'orders': (10, 1)}, headroom=0.8)
+    gate.observe({'X-Gate-RateLimit-Requests-Remain': '5'}, {'orders': 1})
+    # 5 left of 10, of which 2 are our headroom
+    assert gate.buckets['orders'].tokens == pytest.approx(3)
+
+@pytest.mark.asyncio
+async def test_rate_limited_requests_are_retried_after_pause():
+    calls = []
+
+    async def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return web.json_response({'code': -1003}, status=429, headers={'Retry-After': '0.1'})
+        return web.json_response({}, headers={'X-MBX-USED-WEIGHT-1M': '20'})
+    app = web.Application()
+    app.router.add_get('/api/v3/ping', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    client = RestClient('binance', base_url=f"http://127.0.0.1:{runner.addresses[0][1]}",
+                        limiter=RateLimiter('binance', {'weight': (6000, 60)}, headroom=1.0))
+    try:
+        assert await client.get('/api/v3/ping') == (200, {})
+    finally:
+        await client.close()
+        await runner.cleanup()
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.1
+    assert client.limiter.buckets['weight'].tokens <= 6000 - 20
@@ -0,0 +1,79 @@
+import json
+import time
+import pytest
+from exchanges.recorder import FrameRecorder, read_frames
+from exchanges.replay import FrameReplayer, connect_engine
+from exchanges.websocket_manager import WebSocketManager
+from services.arbitrage_engine import ArbitrageEngine
+
+
+def binance_ticker(symbol, last, event_time):
+    return json.dumps({'e': '24hrTicker', 'E': event_time, 's': symbol, 'c': last, 'b': last, 'a': last})
+
+
+def gate_ticker(pair, last):
+    return json.dumps({'channel': 'spot.tickers', 'event': 'update',
+                       'result': {'currency_pair': pair, 'last': last}})
+
+
+def test_segments_rotate_and_read_back_in_order(tmp_path):
+    recorder = FrameRecorder(str(tmp_path), prefix='binance', segment_seconds=10)
+    recorder.record('binance', 1000.0, binance_ticker('BTCUSDT', '60000', 1))
+    recorder.record('binance', 1005.0, b'{"e": "trade",\n "s": "BTCUSDT"}')
+    recorder.record('binance', 1012.0, binance_ticker('BTCUSDT', '60010', 2))
+    recorder.close()
+    assert [path.rsplit('/', 1)[1] for path in recorder.segments] == [
+        'binance-1000000.frames.gz', 'binance-1012000.frames.gz'
+    ]
+    other = FrameRecorder(str(tmp_path), prefix='gate')
+    other.record('gate', 1003.0, gate_ticker('BTC_USDT', '60100'))
+    other.close()
+    frames = list(read_frames([str(tmp_path)]))
+    assert [(t, exchange) for t, exchange, _ in frames] == [
+        (1000.0, 'binance'), (1003.0, 'gate'), (1005.0, 'binance'), (1012.0, 'binance')
+    ]
+    assert json.loads(frames[2][2]) == {'e': 'trade', 's': 'BTCUSDT'}
+
+
+def test_truncated_segment_keeps_complete_frames(tmp_path):
+    recorder = FrameRecorder(str(tmp_path))
+    for i in range(100):
+        recorder.record('binance', 1000.0 + i / 100, binance_ticker('BTCUSDT', str(60000 + i), i))
+    recorder.close()
+    path = recorder.segments[0]
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) - 20])
+    frames = list(read_frames([path]))
+    assert 0 < len(frames) < 100
+    assert all(json.loads(message)['e'] == '24hrTicker' for _, _, message in frames)
+
+
+@pytest.mark.asyncio
+async def test_replay_drives_manager_and_engine(tmp_path):
+    recorder = FrameRecorder(str(tmp_path))
+    recorder.record('binance', 1000.0, binance_ticker('ETHUSDT', '3000', 999000))
+    recorder.record('gate', 1000.1, gate_ticker('ETH_USDT', '3100'))
+    recorder.record('kraken', 1000.2, '{}')
+    recorder.close()
+    manager = WebSocketManager(workers=False)
+    engine = ArbitrageEngine(incremental=True)
+    opportunities = []
+    engine.set_opportunity_callback(opportunities.append)
+    connect_engine(manager, engine)
+    stats = await FrameReplayer(manager, speed=None).run(read_frames([str(tmp_path)]))
+    assert (stats['frames'], stats['skipped']) == (2, 1)
+    assert manager.get_price_data('ETHUSDT')['binance'].recv_ts == 1000.0
+    assert [(o['buy_exchange'], o['sell_exchange']) for o in opportunities] == [('binance', 'gate')]
+
+
+@pytest.mark.asyncio
+async def test_paced_replay_keeps_recorded_gaps():
+    manager = WebSocketManager(workers=False)
+    frames = [(1000.0, 'binance', binance_ticker('BTCUSDT', '60000', 1)),
+              (1000.4, 'binance', binance_ticker('BTCUSDT', '60001', 2))]
+    started = time.monotonic()
+    stats = await FrameReplayer(manager, speed=4).run(frames)
+    assert stats['frames'] == 2
+    assert 0.09 <= time.monotonic() - started < 0.5
@@ -0,0 +1,61 @@
+import hashlib
+import hmac
+import pytest
+from config.settings import CONFIG
+from exchanges import binance, cex, gate, rest
+from exchanges.mock_exchanges import MockExchanges
+from exchanges.rest import GateAuth, HmacSigner, RestClient
+
+def point_rest_at(mocks, monkeypatch):
+    for name, server in mocks.servers.items():
+        monkeypatch.setitem(CONFIG['rest_urls'], name, server.rest_url)
+
+def test_pre_keyed_signer_matches_hmac():
+    signer = HmacSigner('secret', hashlib.sha256)
+    for payload in ('timestamp=1', 'symbol=BTCUSDT&timestamp=2'):
+        assert signer.sign(payload) == hmac.new(b'secret', payload.encode(), hashlib.sha256).hexdigest()
+
+def test_gate_signature_covers_query_and_body(monkeypatch):
+    monkeypatch.setattr(rest.time, 'time', lambda: 1700000000)
+    query, body, headers = GateAuth('key', 'secret').sign('POST', '/api/v4/spot/orders', 'a=1', '{"x": 1}')
+    expected = '\n'.join(['POST', '/api/v4/spot/orders', 'a=1', hashlib.sha512(b'{"x": 1}').hexdigest(),
+                          '1700000000'])
+    assert headers == {'KEY': 'key', 'Timestamp': '1700000000',
+                       'SIGN': hmac.new(b'secret', expected.encode(), hashlib.sha512).hexdigest()}
+    assert (query, body) == ('a=1', '{"x": 1}')
+
+@pytest.mark.asyncio
+async def test_requests_reuse_warmed_connections(monkeypatch):
+    monkeypatch.setattr(rest, '_clients', {})
+    async with MockExchanges(exchanges=['binance']) as mocks:
+        point_rest_at(mocks, monkeypatch)
+        server = mocks['binance']
+        assert await rest.get_client('binance').warm_up(3) == 3
+        assert len(server.rest_clients) == 3
+        for _ in range(5):
+            snapshot = await binance.get_orderbook_snapshot('BTCUSDT', 5)
+            assert len(snapshot['bids']) == 5
+        assert server.rest_requests == 8
+        assert len(server.rest_clients) == 3
+        await rest.close_clients()
+
+@pytest.mark.asyncio
+async def test_signed_fee_requests(monkeypatch):
+    for variable in ('BINANCE_API_KEY', 'BINANCE_API_SECRET', 'GATEIO_API_KEY', 'GATEIO_API_SECRET',
+                     'CEXIO_API_KEY', 'CEXIO_API_SECRET'):
+        monkeypatch.setenv(variable, 'test')
+    monkeypatch.setattr(rest, '_clients', {})
+    async with MockExchanges() as mocks:
+        point_rest_at(mocks, monkeypatch)
+        assert (await gate.get_fees())['taker_fee'] == '0.002'
+        assert (await binance.get_fees())[0]['takerCommission'] == '0.001'
+        assert (await cex.get_fees())['ok'] == 'ok'
+        await rest.close_clients()
+
+@pytest.mark.asyncio
+async def test_missing_credentials_are_reported(monkeypatch):
+    monkeypatch.delenv('GATEIO_API_KEY', raising=False)
+    monkeypatch.setattr(rest, '_clients', {})
+    assert await gate.get_fees() == {'error': 'Missing Gate.io API key or secret'}
+    with pytest.raises(RuntimeError):
+        await RestClient('gate').get('/api/v4/spot/accounts/fee', signed=True)
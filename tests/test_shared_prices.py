@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from exchanges.websocket_manager import WebSocketManager
+from utils.shared_prices import HEADER, OWNER, SharedPriceTable
+from utils.symbols import SymbolRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def table_name():
+    return f"test_prices_{os.getpid()}"
+
+def test_reader_sees_published_quotes(table_name):
+    symbols = SymbolRegistry()
+    writer = SharedPriceTable.create(table_name, capacity=16, symbols=symbols)
+    try:
+        reader = SharedPriceTable.attach(table_name)
+        assert reader.read('gate', 'BTCUSDT') is None
+        writer.publish('gate', symbols.id('BTCUSDT'), 59990.0, 60010.0, 60000.0, 1700000000000, 1700000000.1)
+        quote = reader.read('gate', 'BTCUSDT')
+        assert (quote['bid'], quote['ask'], quote['last'], quote['seq']) == (59990.0, 60010.0, 60000.0, 2)
+        writer.publish('binance', symbols.id('ETHUSDT'), None, None, 3000.0)
+        assert set(reader.snapshot()) == {'BTCUSDT', 'ETHUSDT'}
+        writer.invalidate_exchange('gate')
+        assert reader.read('gate', 'BTCUSDT') is None
+        reader.close()
+    finally:
+        writer.close()
+
+def test_other_process_reads_without_connecting(table_name):
+    symbols = SymbolRegistry()
+    writer = SharedPriceTable.create(table_name, capacity=16, symbols=symbols)
+    try:
+        writer.publish('cex', symbols.id('BTCUSDT'), 1.0, 2.0, 1.5)
+        script = ("import json; from utils.shared_prices import SharedPriceTable; "
+                  f"t = SharedPriceTable.attach({table_name!r}); print(json.dumps(t.read('cex', 'BTCUSDT')))")
+        out = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+        assert json.loads(out.stdout.strip().splitlines()[-1])['last'] == 1.5
+        # The reader exiting must not remove the writer's segment
+        assert SharedPriceTable.attach(table_name).read('cex', 'BTCUSDT')['bid'] == 1.0
+    finally:
+        writer.close()
+
+@pytest.mark.asyncio
+async def test_manager_publishes_ticks(table_name):
+    symbols = SymbolRegistry()
+    manager = WebSocketManager(symbols=symbols)
+    manager.register_handlers()
+    writer = SharedPriceTable.create(table_name, capacity=16, symbols=symbols)
+    manager.set_price_table(writer)
+    try:
+        await manager.binance.handle_message(json.dumps({
+            'e': '24hrTicker', 'E': 1700000000200, 's': 'BTCUSDT', 'c': '60000.00', 'b': '59999', 'a': '60001'
+        }))
+        quote = SharedPriceTable.attach(table_name).read('binance', 'BTCUSDT')
+        assert (quote['bid'], quote['ask'], quote['exchange_ts']) == (59999.0, 60001.0, 1700000000200)
+    finally:
+        writer.close()
+
+def test_rows_are_dense_and_a_full_table_drops_new_symbols(table_name, caplog):
+    symbols = SymbolRegistry()
+    for i in range(100):
+        symbols.id(f'COIN{i}USDT')
+    writer = SharedPriceTable.create(table_name, capacity=2, symbols=symbols)
+    try:
+        # IDs far beyond the capacity still get a row
+        writer.publish('gate', symbols.id('COIN99USDT'), 1.0, 2.0, 1.5)
+        writer.publish('gate', symbols.id('COIN50USDT'), 3.0, 4.0, 3.5)
+        for _ in range(2):
+            writer.publish('gate', symbols.id('COIN7USDT'), 5.0, 6.0, 5.5)
+        assert set(SharedPriceTable.attach(table_name).snapshot()) == {'COIN99USDT', 'COIN50USDT'}
+        assert any('COIN7USDT' in r.message for r in caplog.records)
+        assert len([r for r in caplog.records if 'is full' in r.message]) == 1
+    finally:
+        writer.close()
+
+def test_create_only_replaces_a_dead_writers_table(table_name):
+    writer = SharedPriceTable.create(table_name, capacity=4, symbols=SymbolRegistry())
+    try:
+        with pytest.raises(FileExistsError):
+            SharedPriceTable.create(table_name, capacity=4)
+        assert SharedPriceTable.attach(table_name).exchanges == ['cex', 'gate', 'binance']
+        # The writer dies without cleaning up: its PID no longer runs
+        exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True,
+                                text=True, check=True)
+        OWNER.pack_into(writer.buf, HEADER.size, int(exited.stdout))
+        replacement = SharedPriceTable.create(table_name, capacity=8, symbols=SymbolRegistry())
+        assert SharedPriceTable.attach(table_name).capacity == 8
+        replacement.close()
+    finally:
+        writer.close()
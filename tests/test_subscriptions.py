@@ -0,0 +1,60 @@
+import time
+import pytest
+from config.settings import CONFIG
+from exchanges.gate import GateIOWebSocket
+from exchanges.cex import CEXIOWebSocket
+
+def _capture(adapter):
+    sent = []
+    async def send_message(message):
+        sent.append(message)
+    adapter.send_message = send_message
+    return sent
+
+@pytest.mark.asyncio
+async def test_gate_batches_pair_list_channels(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'subscribe_batch_size', 2)
+    gate = GateIOWebSocket()
+    sent = _capture(gate)
+    await gate.subscribe_to_ticker(['BTC_USDT', 'ETH_USDT', 'SOL_USDT'])
+    await gate.subscribe_to_orderbook_updates(['BTC_USDT', 'ETH_USDT'])
+    assert [(m['channel'], m['payload']) for m in sent] == [
+        ('spot.tickers', ['BTC_USDT', 'ETH_USDT']),
+        ('spot.tickers', ['SOL_USDT']),
+        ('spot.order_book_update', ['BTC_USDT', '100ms']),
+        ('spot.order_book_update', ['ETH_USDT', '100ms'])
+    ]
+
+@pytest.mark.asyncio
+async def test_gate_set_pairs_sends_only_the_difference():
+    gate = GateIOWebSocket()
+    sent = _capture(gate)
+    await gate.subscribe_to_ticker(['BTC_USDT', 'ETH_USDT'])
+    await gate.subscribe_to_ticker(['BTC_USDT'])
+    assert len(sent) == 1
+    sent.clear()
+    await gate.set_pairs('ticker', ['ETH_USDT', 'SOL_USDT'])
+    assert [(m['event'], m['payload']) for m in sent] == [
+        ('unsubscribe', ['BTC_USDT']),
+        ('subscribe', ['SOL_USDT'])
+    ]
+    sent.clear()
+    await gate.resubscribe()
+    assert [m['payload'] for m in sent] == [['ETH_USDT', 'SOL_USDT']]
+
+@pytest.mark.asyncio
+async def test_cex_batches_rooms_and_paces_sends(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'cex_subscribe_rate', 20)
+    cex = CEXIOWebSocket()
+    sent = _capture(cex)
+    started = time.monotonic()
+    await cex.subscribe_to_ticker(['BTC:USD', 'ETH:USD'])
+    await cex.subscribe_to_trades(['BTC:USD'])
+    await cex.set_pairs('ticker', ['ETH:USD'])
+    assert sent == [
+        {'e': 'subscribe', 'rooms': ['tickers:BTC:USD', 'tickers:ETH:USD']},
+        {'e': 'subscribe', 'rooms': ['trades:BTC:USD']},
+        {'e': 'unsubscribe', 'rooms': ['tickers:BTC:USD']}
+    ]
+    # The pacer keeps the sends 1 / rate apart
+    assert time.monotonic() - started >= 2 / 20 - 0.01
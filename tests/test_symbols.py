@@ -0,0 +1,23 @@
+from utils.symbols import SymbolRegistry
+
+def test_fallback_rules_match_native_formats():
+    symbols = SymbolRegistry()
+    btc = symbols.resolve('cex', 'BTC:USD')
+    assert symbols.names[btc] == 'BTCUSDT'
+    assert symbols.resolve('gate', 'BTC_USDT') == symbols.resolve('binance', 'BTCUSDT') == btc
+    assert symbols.native('gate', 'ETHBTC') == 'ETH_BTC'
+    assert symbols.native('cex', 'ETHUSDT') == 'ETH:USD'
+    assert symbols.native('binance', btc) == 'BTCUSDT'
+
+def test_metadata_keeps_aliased_quote_preferred():
+    symbols = SymbolRegistry()
+    # CEX.IO lists both books; the USD one stays the subscription target
+    symbols.load({'cex': [('BTC', 'USD'), ('BTC', 'USDT')]})
+    assert symbols.native('cex', 'BTCUSDT') == 'BTC:USD'
+    assert symbols.resolve('cex', 'BTC:USDT') == symbols.id('BTCUSDT')
+    assert len(symbols) == 1
+
+def test_ids_are_dense_and_stable():
+    symbols = SymbolRegistry()
+    assert [symbols.id(name) for name in ('BTCUSDT', 'ETHUSDT', 'BTCUSDT')] == [0, 1, 0]
+    assert symbols.id(1) == 1 and symbols.name(1) == 'ETHUSDT'
@@ -0,0 +1,141 @@
+import asyncio
+import time
+import pytest
+from config.settings import CONFIG
+from exchanges import binance, cex, gate, rest
+from exchanges.mock_exchanges import MockExchanges
+from exchanges.records import OrderUpdate
+from exchanges.user_streams import USER_STREAMS, parse_binance_execution
+from services.order_manager import OrderManager
+from services.order_store import OrderStore
+
+CREDENTIALS = ('BINANCE_API_KEY', 'BINANCE_API_SECRET', 'GATEIO_API_KEY', 'GATEIO_API_SECRET',
+               'CEXIO_API_KEY', 'CEXIO_API_SECRET')
+
+async def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not met in time'
+        await asyncio.sleep(0.01)
+
+def use_mocks(mocks, monkeypatch):
+    for variable in CREDENTIALS:
+        monkeypatch.setenv(variable, 'test')
+    monkeypatch.setattr(rest, '_clients', {})
+    for name, server in mocks.servers.items():
+        monkeypatch.setitem(CONFIG['ws_urls'], name, server.ws_url)
+        monkeypatch.setitem(CONFIG['rest_urls'], name, server.rest_url)
+
+def test_binance_execution_report():
+    update = parse_binance_execution({'e': 'executionReport', 'E': 1, 's': 'BTCUSDT', 'c': 'abc', 'S': 'BUY',
+                                      'q': '0.02', 'p': '60000', 'X': 'EXPIRED', 'i': 42, 'z': '0.01',
+                                      'Z': '599.9', 'n': '0.00001', 'N': 'BTC'})
+    assert (update.order_id, update.status, update.side, update.filled) == ('42', 'expired', 'buy', 0.01)
+    assert update.avg_price == pytest.approx(59990)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('exchange', ['binance', 'gate', 'cex'])
+async def test_fills_arrive_on_private_streams(exchange, monkeypatch):
+    async with MockExchanges(exchanges=[exchange]) as mocks:
+        use_mocks(mocks, monkeypatch)
+        server = mocks[exchange]
+        server.fill_ratio = 0.5
+        store = OrderStore()
+        stream = USER_STREAMS[exchange](store)
+        stream.start()
+        try:
+            await wait_for(lambda: stream.is_connected)
+            # Private subscriptions are in place once the server has seen them
+            await asyncio.sleep(0.1)
+            if exchange == 'binance':
+                order = await binance.create_order('BTCUSDT', 'buy', 0.02, 60000)
+                order_id = order['orderId']
+            elif exchange == 'gate':
+                order = await gate.create_order('BTC_USDT', 'buy', 0.02, 60000)
+                order_id = order['id']
+            else:
+                order = await cex.create_order('BTC:USD', 'buy', 0.02, 60000)
+                order_id = order['id']
+            store.track(exchange, order_id, 'BTCUSDT', 'buy', 0.02, 60000)
+            final = await store.wait(exchange, order_id, timeout=5)
+            assert final.status in ('expired', 'cancelled')
+            assert final.filled == pytest.approx(0.01)
+            assert final.symbol == 'BTCUSDT'
+        finally:
+            await stream.stop()
+            await rest.close_clients()
+
+@pytest.mark.asyncio
+async def test_missed_fills_are_fetched_after_reconnect(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'reconnect_delay', 200)
+    async with MockExchanges(exchanges=['binance']) as mocks:
+        use_mocks(mocks, monkeypatch)
+        server = mocks['binance']
+        store = OrderStore()
+        stream = USER_STREAMS['binance'](store)
+        stream.start()
+        try:
+            await wait_for(lambda: stream.is_connected)
+            await server.drop_connections()
+            await wait_for(lambda: not stream.is_connected)
+            # Filled while the stream was down
+            order = server.create_order('ETHUSDT', 'sell', 1.0, 3000)
+            store.track('binance', order['id'], 'ETHUSDT', 'sell', 1.0, 3000)
+            final = await store.wait('binance', order['id'], timeout=5)
+            assert (final.status, final.filled) == ('filled', 1.0)
+            assert stream.reconnects == 1 and len(server.listen_keys) == 2
+        finally:
+            await stream.stop()
+            await rest.close_clients()
+
+@pytest.mark.asyncio
+async def test_orders_open_before_the_first_connect_are_fetched(monkeypatch):
+    async with MockExchanges(exchanges=['gate']) as mocks:
+        use_mocks(mocks, monkeypatch)
+        order = mocks['gate'].create_order('BTCUSDT', 'buy', 0.5, 60000)
+        store = OrderStore()
+        store.track('gate', order['id'], 'BTCUSDT', 'buy', 0.5, 60000)
+        stream = USER_STREAMS['gate'](store)
+        stream.start()
+        try:
+            final = await store.wait('gate', order['id'], timeout=5)
+            assert (final.status, final.filled, stream.reconnects) == ('filled', 0.5, 0)
+        finally:
+            await stream.stop()
+            await rest.close_clients()
+        assert stream._reconcile is None
+
+@pytest.mark.asyncio
+async def test_order_manager_fills_arrive_on_the_stream(monkeypatch):
+    async with MockExchanges(exchanges=['binance']) as mocks:
+        use_mocks(mocks, monkeypatch)
+        server = mocks['binance']
+        store = OrderStore()
+        stream = USER_STREAMS['binance'](store)
+        stream.start()
+        manager = OrderManager(order_timeout=5, order_store=store)
+        results = []
+        manager.register_callback(results.append)
+        try:
+            await wait_for(lambda: stream.is_connected)
+            opportunity = {'symbol': 'BTCUSDT', 'buy_exchange': 'binance', 'sell_exchange': 'binance',
+                           'buy_price': 60000, 'sell_price': 60300}
+            await manager.submit_arbitrage_opportunity(opportunity, amount=0.01)
+        finally:
+            await stream.stop()
+            await rest.close_clients()
+        # Binance accepts both orders as NEW; their fills came from the stream, never from polling
+        assert results[0]['status'] == 'success' and results[0]['sell_order']['filled'] == 0.01
+        assert server.rest_requests == 3 and len(server.orders) == 2
+
+@pytest.mark.asyncio
+async def test_gate_fetch_order_uses_native_symbols(monkeypatch):
+    requested = []
+    async def get_order_status(symbol, order_id):
+        requested.append(symbol)
+        return {'error': 'not found'}
+    monkeypatch.setattr(gate, 'get_order_status', get_order_status)
+    stream = USER_STREAMS['gate'](OrderStore(), client=rest.RestClient('gate'))
+    for symbol in ('BTCUSDT', 'XYZ'):
+        assert await stream.fetch_order(OrderUpdate('gate', '1', 'new', symbol=symbol)) is None
+    assert requested == ['BTC_USDT', 'XYZ']
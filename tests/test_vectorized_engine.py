@@ -0,0 +1,84 @@
+import pytest
+from services.arbitrage_engine import ArbitrageEngine
+from services.vectorized_engine import VectorizedArbitrageEngine
+
+FEES = {
+    'binance': {'BTCUSDT': {'taker': 0.001}, 'ETHUSDT': {'taker': 0.001}},
+    'cex': {'BTCUSDT': {'taker': 0.002}, 'ETHUSDT': {'taker': 0.002}},
+    'gate': {'BTCUSDT': {'taker': 0.001}, 'ETHUSDT': {'taker': 0.001}}
+}
+
+PRICES = [
+    ('binance', 'BTCUSDT', 60000),
+    ('cex', 'BTCUSDT', 60400),
+    ('gate', 'BTCUSDT', 60100),
+    ('binance', 'ETHUSDT', 3000),
+    ('gate', 'ETHUSDT', 3015),
+]
+
+def _run(engine):
+    engine.fees = FEES
+    for exchange, symbol, price in PRICES:
+        engine.update_price(exchange, symbol, price)
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    engine.check_opportunities()
+    return {(op['symbol'], op['buy_exchange'], op['sell_exchange']): op for op in found}
+
+def test_matches_scalar_engine():
+    expected = _run(ArbitrageEngine(min_profit_threshold=0.001))
+    found = _run(VectorizedArbitrageEngine(min_profit_threshold=0.001, capacity=1))
+    assert expected and found.keys() == expected.keys()
+    for key, op in found.items():
+        assert op['profit'] == pytest.approx(expected[key]['profit'])
+        assert op['profit_pct'] == pytest.approx(expected[key]['profit_pct'])
+        assert op['sell_fee'] == expected[key]['sell_fee']
+
+def test_missing_quotes_are_ignored():
+    engine = VectorizedArbitrageEngine(min_profit_threshold=0.0)
+    engine.update_price('binance', 'BTCUSDT', 60000)
+    engine.update_price('gate', 'ETHUSDT', 3000)
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    engine.check_opportunities()
+    assert not found
+    assert engine.get_price('gate', 'BTCUSDT') is None
+    assert engine.get_best_prices('BTCUSDT')['ask'] == (60000.0, 'binance')
+
+def test_check_symbol_and_bulk_update():
+    engine = VectorizedArbitrageEngine(min_profit_threshold=0.001)
+    engine.update_prices('binance', ['BTCUSDT', 'ETHUSDT'], [60000, 3000])
+    engine.update_prices('cex', ['BTCUSDT', 'ETHUSDT'], [60500, 3000])
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    engine.check_symbol('BTCUSDT', 'cex')
+    assert [(op['buy_exchange'], op['sell_exchange']) for op in found] == [('binance', 'cex')]
+
+def test_incremental_update_price_matches_scalar_engine():
+    def emitted(engine):
+        engine.fees = FEES
+        found = []
+        engine.set_opportunity_callback(lambda op: found.append(op))
+        for exchange, symbol, price in PRICES:
+            engine.update_price(exchange, symbol, price)
+        return [(op['symbol'], op['buy_exchange'], op['sell_exchange']) for op in found]
+    expected = emitted(ArbitrageEngine(min_profit_threshold=0.001, incremental=True))
+    assert expected and emitted(VectorizedArbitrageEngine(min_profit_threshold=0.001, incremental=True)) == expected
+
+def test_check_opportunities_sizes_against_order_books():
+    from exchanges.order_book import OrderBookManager
+    books = OrderBookManager()
+    books.on_snapshot('binance', 'BTCUSDT', [['99', '10']], [['100', '1'], ['100.5', '2'], ['101.5', '5']], 1)
+    books.on_snapshot('cex', 'BTCUSDT', [['101.5', '2'], ['101', '4'], ['100', '10']], [['102', '10']], 1)
+    engine = VectorizedArbitrageEngine(min_profit_threshold=0.001, order_books=books)
+    engine.fees = {'binance': {'BTCUSDT': {'taker': 0.001}}, 'cex': {'BTCUSDT': {'taker': 0.001}}}
+    engine.update_price('binance', 'BTCUSDT', 100)
+    engine.update_price('cex', 'BTCUSDT', 101)
+    symbols = len(engine.symbols)
+    found = []
+    engine.set_opportunity_callback(lambda op: found.append(op))
+    engine.check_opportunities()
+    assert [(op['symbol'], op['buy_exchange'], op['sell_exchange']) for op in found] == [('BTCUSDT', 'binance', 'cex')]
+    assert found[0]['executable_size'] == pytest.approx(3)
+    # Rows from np.nonzero must not be interned as new symbols
+    assert len(engine.symbols) == symbols
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from exchanges.websocket_manager import WebSocketManager
+from exchanges.workers import RecordSender, BookForwarder, TICK, BULK, DIFF, SNAPSHOT, GAP, RTT
+from utils.symbols import SymbolRegistry
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, batch):
+        self.sent.append(batch)
+
+@pytest.mark.asyncio
+async def test_records_are_batched_per_loop_iteration():
+    conn = FakeConn()
+    sender = RecordSender(conn)
+    symbols = SymbolRegistry()
+    books = BookForwarder(sender, 'gate', symbols)
+    books.on_snapshot('gate', symbols.id('BTCUSDT'), [['1', '2']], [['3', '4']], 7)
+    sender.send((GAP, 'gate'))
+    assert conn.sent == []
+    await asyncio.sleep(0)
+    assert conn.sent == [[(SNAPSHOT, 'gate', 'BTCUSDT', [['1', '2']], [['3', '4']], 7), (GAP, 'gate')]]
+
+def test_worker_mode_limits_manager_to_its_exchange():
+    manager = WebSocketManager(exchanges=['gate'], workers=False)
+    assert list(manager.exchanges) == ['gate'] and manager.workers == {}
+    manager = WebSocketManager(workers=True)
+    assert set(manager.workers) == {'cex', 'gate', 'binance'}
+    assert not any(worker.is_alive for worker in manager.workers.values())
+
+@pytest.mark.asyncio
+async def test_engine_process_applies_worker_records():
+    symbols = SymbolRegistry()
+    manager = WebSocketManager(symbols=symbols, workers=True)
+    ticks, bulk = [], []
+    async def on_price(exchange, symbol, data):
+        ticks.append((exchange, symbol, data.last))
+    manager.register_price_callback(on_price)
+    manager.register_bulk_callback(lambda exchange, rows, prices: bulk.append((exchange, prices.tolist())))
+    await manager._apply_record((TICK, 'gate', 'BTCUSDT', 59990.0, 60010.0, 60000.0, None, None,
+                                 1700000000000, 1700000000.05, 1.0))
+    assert ticks == [('gate', 'BTCUSDT', 60000.0)]
+    assert manager.connection_status['gate']['connected']
+    assert manager.get_feed_latency_stats()['gate']['p50'] == pytest.approx(50, rel=0.05)
+    await manager._apply_record((BULK, 'binance', ['ETHUSDT'], [3000.0], [2999.0], [3001.0], [1700000000000.0], 1700000000.01))
+    assert bulk == [('binance', [3000.0])]
+    await manager._apply_record((SNAPSHOT, 'binance', 'BTCUSDT', [['60000', '1']], [['60010', '1']], 10))
+    await manager._apply_record((DIFF, 'binance', 'BTCUSDT', [], [['60005', '2']], 11, 11))
+    assert manager.order_books.top_of_book('binance', 'BTCUSDT')['ask'] == 60005.0
+    await manager._apply_record((RTT, 'gate', 12.0))
+    assert manager.get_venue_latency('gate') == 12.0
+    await manager._apply_record((GAP, 'gate'))
+    assert manager.get_price_data('BTCUSDT') == {}
+    await manager._apply_record((TICK, 'gate', 'BTCUSDT', None, None, 60001.0, None, None, None, 1700000001.0, 2.0))
+    assert manager.connection_status['gate']['reconnects'] == 1
@@ -12,10 +12,14 @@ from services.price_monitor import PriceMonitor
 from services.arbitrage_engine import ArbitrageEngine
 from services.safety_controller import SafetyController
 from exchanges.websocket_manager import WebSocketManager
+from utils.logger import get_logger, log_sampled
+from utils.shared_prices import SharedPriceTable
+from config.settings import CONFIG
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key'
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+logger = get_logger('ui')
 
 # Global state
 exchange_status = {
@@ -26,6 +30,9 @@ exchange_status = {
 
 price_data = {}
 arbitrage_opportunities = []
+# True when prices come from a running main.py's shared table; the local
+# TradingSystem is then never started and has no feed stats to report
+attached = False
 
 class TradingSystem:
     def __init__(self):
@@ -50,11 +57,17 @@ def index():
 
 @app.route('/api/status')
 def get_status():
-    return jsonify({
+    status = {
         'exchanges': exchange_status,
         'price_data': price_data,
         'opportunities': arbitrage_opportunities
-    })
+    }
+    if not attached:
+        ws_manager = trading_system.price_monitor.ws_manager
+        status['latency'] = ws_manager.get_rtt_stats()
+        status['feed_latency'] = ws_manager.get_feed_latency_stats()
+        status['ingress'] = ws_manager.get_ingress_stats()
+    return jsonify(status)
 
 @socketio.on('connect')
 def handle_connect():
@@ -74,26 +87,20 @@ def update_exchange_status(exchange, connected, last_update=None):
         'opportunities': arbitrage_opportunities
     })
 
-def price_callback(exchange, symbol, price_data_dict):
-    """Handle price updates and emit to UI (synchronous wrapper)"""
+def price_callback(exchange, symbol, quote):
+    """Handle price updates (Quote records) and emit to UI (synchronous wrapper)"""
     global price_data
     
-    print(f"🔔 Price update received: {exchange} {symbol} {price_data_dict}")
+    log_sampled(logger, 'price', "Price update received: %s %s %s", exchange, symbol, quote)
     
     if symbol not in price_data:
         price_data[symbol] = {}
     
-    # Extract the actual price value
-    price_value = None
-    if 'last' in price_data_dict:
-        price_value = float(price_data_dict['last'])
-    elif 'c' in price_data_dict:  # Binance format
-        price_value = float(price_data_dict['c'])
+    price_value = quote.last
     
     if price_value:
-        # Extract bid and ask prices
-        bid_price = float(price_data_dict.get('highest_bid', 0))
-        ask_price = float(price_data_dict.get('lowest_ask', 0))
+        bid_price = quote.bid or 0
+        ask_price = quote.ask or 0
         
         price_data[symbol][exchange] = {
             'price': price_value,
@@ -101,8 +108,7 @@ def price_callback(exchange, symbol, price_data_dict):
             'highest_bid': bid_price,
             'lowest_ask': ask_price,
             'exchange': exchange,
-            'timestamp': time.time(),
-            'raw_data': price_data_dict
+            'timestamp': quote.recv_ts
         }
         
         # Update exchange status
@@ -112,23 +118,14 @@ def price_callback(exchange, symbol, price_data_dict):
         try:
             trading_system.arbitrage_engine.update_price(exchange, symbol, price_value)
         except Exception as e:
-            print(f"Error updating arbitrage engine: {e}")
+            logger.error("Error updating arbitrage engine: %s", e)
         
         # Emit price update to UI with bid/ask data
         socketio.emit('price_update', {
             'exchange': exchange,
             'symbol': symbol,
-            'data': {
-                'price': price_value,
-                'last': price_value,
-                'highest_bid': bid_price,
-                'lowest_ask': ask_price,
-                'exchange': exchange,
-                'timestamp': time.time()
-            }
+            'data': price_data[symbol][exchange]
         })
-        
-        print(f"📊 Updated price for {symbol} on {exchange}: ${price_value}")
 
 def arbitrage_callback(opportunity):
     """Handle arbitrage opportunities"""
@@ -143,14 +140,24 @@ def arbitrage_callback(opportunity):
         'opportunities': arbitrage_opportunities
     })
 
+def feed_gap_callback(exchange):
+    """Mark an exchange as disconnected and drop its stale prices"""
+    trading_system.arbitrage_engine.invalidate_exchange(exchange)
+    for prices in price_data.values():
+        prices.pop(exchange, None)
+    update_exchange_status(exchange, False)
+
 def run_trading_system():
     """Run the trading system in background"""
     try:
         print("🚀 Starting trading system...")
         
         # Set up callbacks
-        trading_system.price_monitor.register_callback(price_callback)
+        # Socket.IO emits run from their own queue so they never hold up the feed
+        trading_system.price_monitor.register_callback(price_callback, queue_size=CONFIG['subscriber_queue_size'])
         trading_system.arbitrage_engine.set_opportunity_callback(arbitrage_callback)
+        trading_system.price_monitor.ws_manager.register_gap_callback(feed_gap_callback)
+        trading_system.arbitrage_engine.set_latency_provider(trading_system.price_monitor.ws_manager.get_venue_latency)
         
         # Create new event loop for this thread
         loop = asyncio.new_event_loop()
@@ -163,6 +170,46 @@ def run_trading_system():
         import traceback
         traceback.print_exc()
 
+def poll_price_table(table, interval=0.5):
+    """Mirror the main process's shared price table into the UI
+    
+    Used instead of running a second trading system when main.py is
+    already publishing, so the UI opens no exchange connections.
+    """
+    seen = {}
+    while True:
+        live = set()
+        for symbol, quotes in table.snapshot().items():
+            for exchange, quote in quotes.items():
+                live.add((symbol, exchange))
+                if seen.get((symbol, exchange)) == quote['seq']:
+                    continue
+                seen[(symbol, exchange)] = quote['seq']
+                price_data.setdefault(symbol, {})[exchange] = {
+                    'price': quote['last'],
+                    'last': quote['last'],
+                    'highest_bid': quote['bid'] or 0,
+                    'lowest_ask': quote['ask'] or 0,
+                    'exchange': exchange,
+                    'timestamp': quote['recv_ts']
+                }
+                exchange_status[exchange]['connected'] = True
+                exchange_status[exchange]['last_update'] = quote['recv_ts']
+                socketio.emit('price_update', {
+                    'exchange': exchange,
+                    'symbol': symbol,
+                    'data': price_data[symbol][exchange]
+                })
+        # Quotes the writer invalidated after a feed dropped are no longer in the snapshot
+        for symbol, exchange in [key for key in seen if key not in live]:
+            del seen[(symbol, exchange)]
+            price_data.get(symbol, {}).pop(exchange, None)
+        live_exchanges = {exchange for _, exchange in live}
+        for exchange, status in exchange_status.items():
+            if status['connected'] and exchange not in live_exchanges:
+                update_exchange_status(exchange, False)
+        socketio.sleep(interval)
+
 def start_trading_system():
     """Start trading system in a separate thread"""
     trading_thread = threading.Thread(target=run_trading_system)
@@ -172,8 +219,15 @@ def start_trading_system():
 if __name__ == '__main__':
     print("🌐 Starting Web UI...")
     
-    # Start trading system in background
-    start_trading_system()
+    try:
+        # Read prices from a running main.py instead of opening our own feeds
+        price_table = SharedPriceTable.attach()
+        attached = True
+        print("📊 Reading prices from the running trading system")
+        socketio.start_background_task(poll_price_table, price_table)
+    except FileNotFoundError:
+        # Start trading system in background
+        start_trading_system()
     
     # Start Flask app
     print("🚀 Web UI ready at http://localhost:5000")
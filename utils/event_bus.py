@@ -0,0 +1,194 @@
+# In-process event bus
+
+import asyncio
+import inspect
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from utils.logger import get_logger
+
+logger = get_logger('event_bus')
+
+# Topics published by WebSocketManager and PriceMonitor; 'trade' events are Trade records
+PRICE = 'price'
+TRADE = 'trade'
+BULK = 'bulk'
+GAP = 'gap'
+
+
+class PriceEvent:
+    """One ticker update: exchange, canonical symbol name and its Quote record"""
+    __slots__ = ('exchange', 'symbol', 'quote')
+
+    def __init__(self, exchange: str, symbol: str, quote):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.quote = quote
+
+
+class BulkEvent:
+    """Rows (symbol IDs) a bulk ticker frame changed, with their last prices"""
+    __slots__ = ('exchange', 'rows', 'prices')
+
+    def __init__(self, exchange: str, rows, prices):
+        self.exchange = exchange
+        self.rows = rows
+        self.prices = prices
+
+
+class GapEvent:
+    """A feed dropped and everything derived from it was invalidated"""
+    __slots__ = ('exchange',)
+
+    def __init__(self, exchange: str):
+        self.exchange = exchange
+
+
+class Subscription:
+    """One subscriber of a topic
+
+    Without a queue the handler runs inline in publish(), so the publisher
+    waits for it (use this for fast consumers such as the engine). With
+    queue_size the subscriber gets its own bounded queue drained by its own
+    task; when it falls behind, the oldest events are dropped and counted,
+    and neither the publisher nor other subscribers are slowed down.
+    """
+
+    def __init__(self, bus, topic: str, handler: Callable, queue_size: Optional[int] = None,
+                 name: Optional[str] = None):
+        self.bus = bus
+        self.topic = topic
+        self.handler = handler
+        self.name = name or getattr(handler, '__qualname__', repr(handler))
+        self.queue = deque(maxlen=queue_size) if queue_size else None
+        self.delivered = 0
+        self.dropped = 0
+        self.high_water = 0
+        self._ready = None
+        self._task = None
+
+    def _put(self, event):
+        queue = self.queue
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append(event)
+        self.high_water = max(self.high_water, len(queue))
+        if self._task is None:
+            self._ready = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+        self._ready.set()
+
+    async def _drain(self):
+        queue = self.queue
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while queue:
+                await self.bus._call(self, queue.popleft())
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            'topic': self.topic,
+            'queued': len(self.queue) if self.queue is not None else 0,
+            'high_water': self.high_water,
+            'delivered': self.delivered,
+            'dropped': self.dropped
+        }
+
+
+class EventBus:
+    """Topic-based publish/subscribe with any number of subscribers per topic
+
+    Every subscriber receives the same event object; nothing is copied, so
+    handlers must treat events as read-only. A failing handler is logged
+    and doesn't affect the others.
+    """
+
+    def __init__(self):
+        self.subscribers = {}  # {topic: [Subscription]}
+        self._pending = set()  # tasks running async handlers scheduled by publish_nowait
+
+    def subscribe(self, topic: str, handler: Callable, queue_size: Optional[int] = None,
+                  name: Optional[str] = None) -> Subscription:
+        """Call handler(event) for each event on topic; handlers may be sync or async"""
+        subscription = Subscription(self, topic, handler, queue_size, name)
+        # Replace rather than append, so publishers iterating the old list are unaffected
+        self.subscribers[topic] = self.subscribers.get(topic, []) + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.cancel()
+        remaining = [s for s in self.subscribers.get(subscription.topic, []) if s is not subscription]
+        if remaining:
+            self.subscribers[subscription.topic] = remaining
+        else:
+            self.subscribers.pop(subscription.topic, None)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self.subscribers
+
+    async def _call(self, subscription: Subscription, event: Any):
+        try:
+            result = subscription.handler(event)
+            if inspect.isawaitable(result):
+                await result
+            subscription.delivered += 1
+        except Exception as e:
+            self._failed(subscription, e)
+
+    async def _finish(self, subscription: Subscription, pending):
+        """Await an async handler scheduled by publish_nowait, counted and logged as _call does"""
+        try:
+            await pending
+            subscription.delivered += 1
+        except Exception as e:
+            self._failed(subscription, e)
+
+    @staticmethod
+    def _failed(subscription: Subscription, error: Exception):
+        logger.error("Error in %s subscriber %s: %s", subscription.topic, subscription.name, error)
+
+    async def publish(self, topic: str, event: Any):
+        """Deliver an event, awaiting inline subscribers and queueing for the rest"""
+        for subscription in self.subscribers.get(topic, ()):
+            if subscription.queue is None:
+                await self._call(subscription, event)
+            else:
+                subscription._put(event)
+
+    def publish_nowait(self, topic: str, event: Any):
+        """Deliver from synchronous code; inline async subscribers are scheduled as tasks"""
+        for subscription in self.subscribers.get(topic, ()):
+            if subscription.queue is not None:
+                subscription._put(event)
+                continue
+            try:
+                result = subscription.handler(event)
+            except Exception as e:
+                self._failed(subscription, e)
+                continue
+            if inspect.isawaitable(result):
+                # Keep a reference until the handler is done, so the task is not collected mid-run
+                task = asyncio.ensure_future(self._finish(subscription, result))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+            else:
+                subscription.delivered += 1
+
+    def stats(self) -> Dict[str, List[Dict]]:
+        """Queue depth, delivery and drop counters per subscriber"""
+        return {
+            topic: [dict(subscription.stats(), name=subscription.name) for subscription in subscriptions]
+            for topic, subscriptions in self.subscribers.items()
+        }
+
+    def close(self):
+        for subscriptions in self.subscribers.values():
+            for subscription in subscriptions:
+                subscription.cancel()
+        for task in list(self._pending):
+            task.cancel()
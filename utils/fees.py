@@ -1,7 +1,18 @@
-# Placeholder for fee calculation utilities 
+# Placeholder for fee calculation utilities
 
 import asyncio
+import json
+import os
+import time
 from exchanges import cex, gate, binance
+from config.settings import CONFIG
+from utils.logger import get_logger
+from utils.symbols import normalize_symbol
+
+logger = get_logger('fees')
+
+DEFAULT_FEE = 0.001
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 async def get_all_fees():
     """Fetch spot trading fees from all exchanges and return as a dict."""
@@ -16,9 +27,190 @@ async def get_all_fees():
         'binance': binance_fees
     }
 
+def normalize_fees(all_fees):
+    """Flatten the raw per-exchange fee payloads.
+
+    Returns (table, defaults) where table is {(exchange, symbol): (maker, taker)}
+    and defaults is {exchange: (maker, taker)} for account-wide rates. Exchanges
+    whose payload is an error are left out so callers can keep older data.
+    """
+    table = {}
+    defaults = {}
+    for exchange, fees in all_fees.items():
+        if isinstance(fees, dict) and 'error' in fees:
+            continue
+        # CEX.IO wraps its payload in {'data': {...}}
+        if isinstance(fees, dict) and isinstance(fees.get('data'), dict):
+            fees = fees['data']
+        if isinstance(fees, list):
+            # Binance tradeFee: [{'symbol', 'makerCommission', 'takerCommission'}]
+            for entry in fees:
+                if isinstance(entry, dict) and 'symbol' in entry:
+                    table[(exchange, normalize_symbol(exchange, entry['symbol']))] = (
+                        float(entry.get('makerCommission', DEFAULT_FEE)),
+                        float(entry.get('takerCommission', DEFAULT_FEE))
+                    )
+        elif isinstance(fees, dict):
+            # Gate.io returns one account-wide rate
+            if 'taker_fee' in fees or 'maker_fee' in fees:
+                defaults[exchange] = (
+                    float(fees.get('maker_fee', DEFAULT_FEE)),
+                    float(fees.get('taker_fee', DEFAULT_FEE))
+                )
+            for symbol, symbol_fees in fees.items():
+                if not isinstance(symbol_fees, dict):
+                    continue
+                if 'taker' in symbol_fees or 'maker' in symbol_fees:
+                    maker = float(symbol_fees.get('maker', symbol_fees.get('taker', DEFAULT_FEE)))
+                    taker = float(symbol_fees.get('taker', symbol_fees.get('maker', DEFAULT_FEE)))
+                elif 'buy' in symbol_fees:
+                    # CEX.IO reports percentages
+                    maker = float(symbol_fees.get('buyMaker', symbol_fees['buy'])) / 100
+                    taker = float(symbol_fees['buy']) / 100
+                else:
+                    continue
+                table[(exchange, normalize_symbol(exchange, symbol))] = (maker, taker)
+    return table, defaults
+
+class FeeTable:
+    """Precompiled (exchange, symbol) -> (maker, taker) fee lookup.
+
+    The table is persisted to disk so a cold start can serve the last known
+    fees immediately; stale data is refreshed from the REST APIs in the
+    background instead of blocking startup.
+    """
+
+    def __init__(self, cache_path=None, ttl=None, fetcher=get_all_fees):
+        self.cache_path = cache_path or os.path.join(PROJECT_ROOT, CONFIG['fee_cache_path'])
+        self.ttl = ttl if ttl is not None else CONFIG['fee_cache_ttl']
+        self.fetcher = fetcher
+        self.table = {}      # {(exchange, symbol): (maker, taker)}
+        self.defaults = {}   # {exchange: (maker, taker)}
+        self._fallbacks = {}  # {(exchange, symbol): (maker, taker)} served from defaults, never saved
+        self.updated_at = 0
+        self.listeners = []
+        self._refresh_task = None
+
+    def get(self, exchange, symbol):
+        """Return (maker, taker) for a pair, memoizing the default on a miss
+
+        Defaults are memoized apart from the fetched table, so save_cache()
+        never persists them as if they were real per-pair rates.
+        """
+        key = (exchange, symbol)
+        try:
+            return self.table[key]
+        except KeyError:
+            pass
+        try:
+            return self._fallbacks[key]
+        except KeyError:
+            fees = self._fallbacks[key] = self.defaults.get(exchange, (DEFAULT_FEE, DEFAULT_FEE))
+            return fees
+
+    def add_listener(self, callback):
+        """Register a callback invoked after the table is reloaded"""
+        self.listeners.append(callback)
+
+    def load(self, all_fees, updated_at=None):
+        """Compile raw fee payloads from get_all_fees() into the table"""
+        table, defaults = normalize_fees(all_fees)
+        self._install(table, defaults, updated_at)
+
+    def _install(self, table, defaults, updated_at=None):
+        self.table = table
+        self.defaults = defaults
+        self._fallbacks = {}
+        self.updated_at = updated_at if updated_at is not None else time.time()
+        for callback in self.listeners:
+            callback()
+
+    def is_stale(self):
+        return time.time() - self.updated_at >= self.ttl
+
+    def load_cache(self):
+        """Load the table from disk, returning False if there is no usable cache"""
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            table = {
+                (exchange, symbol): tuple(fees)
+                for exchange, symbols in cached['fees'].items()
+                for symbol, fees in symbols.items()
+            }
+            defaults = {exchange: tuple(fees) for exchange, fees in cached['defaults'].items()}
+            self._install(table, defaults, cached['updated_at'])
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def save_cache(self):
+        fees = {}
+        for (exchange, symbol), pair_fees in self.table.items():
+            fees.setdefault(exchange, {})[symbol] = list(pair_fees)
+        cached = {
+            'updated_at': self.updated_at,
+            'fees': fees,
+            'defaults': {exchange: list(pair_fees) for exchange, pair_fees in self.defaults.items()}
+        }
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.error("Failed to write fee cache: %s", e)
+
+    async def refresh(self):
+        """Fetch fees from all exchanges, keeping older data for any that fail.
+
+        Returns False if no exchange returned usable fees.
+        """
+        table, defaults = normalize_fees(await self.fetcher())
+        refreshed = {exchange for exchange, _ in table} | set(defaults)
+        if not refreshed:
+            return False
+        merged = {key: fees for key, fees in self.table.items() if key[0] not in refreshed}
+        merged.update(table)
+        merged_defaults = {ex: fees for ex, fees in self.defaults.items() if ex not in refreshed}
+        merged_defaults.update(defaults)
+        self._install(merged, merged_defaults)
+        self.save_cache()
+        return True
+
+    async def ensure_loaded(self):
+        """Serve cached fees right away and refresh in the background when stale"""
+        if not self.table and not self.defaults:
+            self.load_cache()
+        self.start_background_refresh()
+
+    def start_background_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        return self._refresh_task
+
+    def stop(self):
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            delay = self.updated_at + self.ttl - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                refreshed = await self.refresh()
+            except Exception as e:
+                logger.error("Error refreshing fees: %s", e)
+                refreshed = False
+            if not refreshed:
+                # Retry sooner than a full TTL after a failure
+                await asyncio.sleep(min(self.ttl, 60))
+
 if __name__ == '__main__':
     async def main():
         all_fees = await get_all_fees()
         for ex, fees in all_fees.items():
             print(f"{ex.upper()} fees:", fees)
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import math
+from collections import deque
+from typing import Dict, Optional
+
+
+class RollingHistogram:
+    """Fixed-size window of recent latency samples (milliseconds)"""
+
+    def __init__(self, size: int = 100):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def last(self) -> Optional[float]:
+        return self.samples[-1] if self.samples else None
+
+    def summary(self) -> Dict:
+        if not self.samples:
+            return {'count': self.count, 'last': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return {
+            'count': self.count,
+            'last': self.samples[-1],
+            'p50': ordered[min(n * 50 // 100, n - 1)],
+            'p90': ordered[min(n * 90 // 100, n - 1)],
+            'p99': ordered[min(n * 99 // 100, n - 1)],
+            'max': ordered[-1]
+        }
+
+
+class LatencyHistogram:
+    """Fixed-memory log-bucketed latency histogram (milliseconds).
+
+    Buckets grow geometrically by `precision` from `min_value` to `max_value`,
+    so percentiles are accurate to within that relative error regardless of
+    how many samples are recorded. Negative samples (exchange clocks ahead of
+    ours) are clamped to the first bucket and counted separately.
+    """
+
+    def __init__(self, min_value: float = 0.01, max_value: float = 60000.0, precision: float = 0.05):
+        self.min_value = min_value
+        self.growth = math.log1p(precision)
+        self.n_buckets = int(math.log(max_value / min_value) / self.growth) + 2
+        self.counts = [0] * self.n_buckets
+        self.count = 0
+        self.negative = 0
+        self.max = None
+
+    def record(self, value: float):
+        self.count += 1
+        if value < 0:
+            self.negative += 1
+        if self.max is None or value > self.max:
+            self.max = value
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(int(math.log(value / self.min_value) / self.growth) + 1, self.n_buckets - 1)
+        self.counts[index] += 1
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return self.min_value
+        return self.min_value * math.exp(self.growth * index)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.count:
+            return None
+        target = max(math.ceil(self.count * pct / 100), 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                if index == self.n_buckets - 1:
+                    # Overflow bucket
+                    return self.max
+                return min(self._bucket_value(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'negative': self.negative,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max
+        }
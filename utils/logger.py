@@ -1 +1,138 @@
-# Placeholder for logging utilities 
\ No newline at end of file
+# Logging utilities
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+ROOT_LOGGER = 'arbitrage'
+
+# Messages/second allowed per log_sampled() category; None means unlimited
+SAMPLE_RATES = {
+    'ticker': 1.0,
+    'orderbook': 1.0,
+    'trade': 1.0,
+    'kline': 1.0,
+    'price': 1.0
+}
+DEFAULT_SAMPLE_RATE = 1.0
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class RateSampler:
+    """Per-category token bucket that caps how often a message is emitted.
+
+    Each category gets `rate` tokens per second (and a burst of the same
+    size, at least one). allow() returns None when the message should be
+    dropped, otherwise how many messages of that category were dropped
+    since the last one that got through.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, Optional[float]]] = None,
+                 default_rate: Optional[float] = DEFAULT_SAMPLE_RATE):
+        self.rates = dict(SAMPLE_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self._buckets = {}  # {category: [tokens, last_refill, suppressed]}
+
+    def set_rate(self, category: str, rate: Optional[float]):
+        self.rates[category] = rate
+        self._buckets.pop(category, None)
+
+    def allow(self, category: str) -> Optional[int]:
+        rate = self.rates.get(category, self.default_rate)
+        if rate is None:
+            return 0
+        now = time.monotonic()
+        burst = max(rate, 1.0)
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = self._buckets[category] = [burst, now, 0]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] < 1.0:
+            bucket[2] += 1
+            return None
+        bucket[0] -= 1.0
+        suppressed, bucket[2] = bucket[2], 0
+        return suppressed
+
+
+sampler = RateSampler()
+
+
+def setup_logging(level: Optional[str] = None, log_file: Optional[str] = None):
+    """Route the 'arbitrage' logger tree through a queue drained by a background thread.
+
+    Callers only pay for formatting the record and a non-blocking put; stream
+    and file writes happen on the QueueListener thread. Defaults come from the
+    LOG_LEVEL and LOG_FILE environment variables. Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        level = (level or os.getenv('LOG_LEVEL') or 'INFO').upper()
+        log_file = log_file or os.getenv('LOG_FILE')
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers = [logging.StreamHandler()]
+        if log_file:
+            log_dir = os.path.dirname(log_file)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers = [logging.handlers.QueueHandler(log_queue)]
+        root.setLevel(level)
+        root.propagate = False
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the 'arbitrage.<name>' logger, setting up the pipeline on first use"""
+    if _listener is None:
+        setup_logging()
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def log_sampled(logger: logging.Logger, category: str, msg: str, *args, level: int = logging.DEBUG):
+    """Log at most SAMPLE_RATES[category] messages per second.
+
+    The level check comes first, so a disabled hot-path message costs one
+    method call and is never formatted.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    suppressed = sampler.allow(category)
+    if suppressed is None:
+        return
+    if suppressed:
+        msg += ' (%d similar suppressed)'
+        args = args + (suppressed,)
+    logger.log(level, msg, *args)
@@ -0,0 +1,270 @@
+# Shared-memory top-of-book table
+
+import math
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional
+from config.settings import CONFIG
+from utils.logger import get_logger
+from utils.symbols import registry
+
+logger = get_logger('shared_prices')
+
+MAGIC = b'ARBP'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sIIII')  # magic, layout version, exchanges, capacity, symbol generation
+OWNER = struct.Struct('<I')  # writer's PID, right after the header
+HEADER_SIZE = 64
+NAME_SIZE = 32
+MAX_EXCHANGES = 8
+# seq, bid, ask, last, exchange event time (ms), local receive time (s)
+SLOT = struct.Struct('<Qddddd')
+SEQ = struct.Struct('<Q')
+QUOTE = struct.Struct('<ddddd')
+READ_RETRIES = 100
+
+NAN = float('nan')
+
+
+def _encode(name: str) -> bytes:
+    return name.encode()[:NAME_SIZE].ljust(NAME_SIZE, b'\0')
+
+
+def _decode(raw: bytes) -> str:
+    return raw.rstrip(b'\0').decode()
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedPriceTable:
+    """Fixed-layout top-of-book table in shared memory, one writer, many readers
+
+    The ingest process creates the table and publishes every tick into the
+    slot of its (symbol ID, exchange). Other processes (the web UI, CLI
+    tools, strategy workers) attach by name and read without locks or
+    sockets. Each slot is guarded by a seqlock: the writer makes the
+    sequence odd, writes the fields and makes it even again; a reader
+    retries until it sees the same even sequence before and after copying
+    the slot.
+
+    Layout: a 64 byte header (including the writer's PID), MAX_EXCHANGES
+    exchange names, `capacity` symbol names, then capacity x exchanges
+    slots. Rows are handed out in the order symbols are first published,
+    so `capacity` bounds the number of published symbols, not their
+    registry IDs; readers find rows through the name directory.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool, symbols=None):
+        self.shm = shm
+        self.buf = shm.buf
+        self.owner = owner
+        self.symbols = symbols
+        magic, version, n_exchanges, capacity, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            raise ValueError(f"{shm.name} is not a version {LAYOUT_VERSION} price table")
+        self.capacity = capacity
+        self.exchanges = [
+            _decode(bytes(self.buf[HEADER_SIZE + i * NAME_SIZE:HEADER_SIZE + (i + 1) * NAME_SIZE]))
+            for i in range(n_exchanges)
+        ]
+        self.exchange_index = {name: i for i, name in enumerate(self.exchanges)}
+        self._names_offset = HEADER_SIZE + MAX_EXCHANGES * NAME_SIZE
+        self._slots_offset = self._names_offset + capacity * NAME_SIZE
+        self._published = {}      # writer: symbol ID -> row, its name is in the directory
+        self._rows = {}           # reader: symbol name -> row
+        self._generation = None
+        self._dropped = set()     # writer: symbol IDs that found the table full
+
+    @staticmethod
+    def size(capacity: int) -> int:
+        return HEADER_SIZE + MAX_EXCHANGES * NAME_SIZE + capacity * NAME_SIZE + capacity * MAX_EXCHANGES * SLOT.size
+
+    @classmethod
+    def create(cls, name: Optional[str] = None, exchanges: Optional[List[str]] = None,
+               capacity: Optional[int] = None, symbols=None) -> 'SharedPriceTable':
+        """Create the table, replacing one left behind by a dead writer; the caller is its only writer
+
+        Raises FileExistsError if the name is taken by a live writer's table
+        or by a segment that is not a price table.
+        """
+        name = name or CONFIG['shared_price_table']
+        exchanges = list(exchanges or ['cex', 'gate', 'binance'])
+        capacity = capacity or CONFIG['shared_price_capacity']
+        if len(exchanges) > MAX_EXCHANGES:
+            raise ValueError(f"At most {MAX_EXCHANGES} exchanges fit in the price table")
+        cls._remove_stale(name)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.size(capacity))
+        shm.buf[:cls.size(capacity)] = bytes(cls.size(capacity))
+        for i, exchange in enumerate(exchanges):
+            offset = HEADER_SIZE + i * NAME_SIZE
+            shm.buf[offset:offset + NAME_SIZE] = _encode(exchange)
+        HEADER.pack_into(shm.buf, 0, MAGIC, LAYOUT_VERSION, len(exchanges), capacity, 0)
+        OWNER.pack_into(shm.buf, HEADER.size, os.getpid())
+        table = cls(shm, owner=True, symbols=symbols if symbols is not None else registry)
+        logger.info("Publishing top of book to shared memory '%s' (%s symbols)", name, capacity)
+        return table
+
+    @staticmethod
+    def _remove_stale(name: str):
+        try:
+            existing = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return
+        owner = None
+        if existing.size >= HEADER_SIZE and HEADER.unpack_from(existing.buf, 0)[0] == MAGIC:
+            owner = OWNER.unpack_from(existing.buf, HEADER.size)[0]
+        existing.close()
+        if owner is None or _alive(owner):
+            # Not ours to remove: keep the resource tracker from unlinking it when we exit
+            resource_tracker.unregister(existing._name, 'shared_memory')
+            if owner is None:
+                raise FileExistsError(f"Shared memory '{name}' exists and is not a price table")
+            raise FileExistsError(f"Price table '{name}' is still written by process {owner}")
+        # Left behind by a writer that didn't shut down cleanly
+        logger.info("Removing price table '%s' of exited process %s", name, owner)
+        existing.unlink()
+
+    @classmethod
+    def attach(cls, name: Optional[str] = None) -> 'SharedPriceTable':
+        """Open an existing table read-only; raises FileNotFoundError if no writer runs"""
+        name = name or CONFIG['shared_price_table']
+        shm = shared_memory.SharedMemory(name=name)
+        # Readers must not unlink the writer's segment when they exit
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, owner=False)
+
+    def _slot_offset(self, row: int, col: int) -> int:
+        return self._slots_offset + (row * MAX_EXCHANGES + col) * SLOT.size
+
+    # Writer side
+
+    def publish(self, exchange: str, symbol_id: int, bid: Optional[float], ask: Optional[float],
+                last: Optional[float], exchange_ts: Optional[float] = None,
+                recv_ts: Optional[float] = None):
+        """Write one quote; None fields are stored as NaN"""
+        col = self.exchange_index.get(exchange)
+        if col is None:
+            return
+        row = self._published.get(symbol_id)
+        if row is None:
+            row = self._publish_name(symbol_id)
+            if row is None:
+                return
+        offset = self._slot_offset(row, col)
+        buf = self.buf
+        seq = SEQ.unpack_from(buf, offset)[0]
+        SEQ.pack_into(buf, offset, seq + 1)
+        QUOTE.pack_into(
+            buf, offset + SEQ.size,
+            NAN if bid is None else bid,
+            NAN if ask is None else ask,
+            NAN if last is None else last,
+            NAN if exchange_ts is None else exchange_ts,
+            time.time() if recv_ts is None else recv_ts
+        )
+        SEQ.pack_into(buf, offset, seq + 2)
+
+    def _publish_name(self, symbol_id: int) -> Optional[int]:
+        row = len(self._published)
+        if row >= self.capacity:
+            if symbol_id not in self._dropped:
+                self._dropped.add(symbol_id)
+                logger.warning("Price table is full (%s symbols), %s is not published; raise shared_price_capacity",
+                               self.capacity, self.symbols.names[symbol_id])
+            return None
+        offset = self._names_offset + row * NAME_SIZE
+        self.buf[offset:offset + NAME_SIZE] = _encode(self.symbols.names[symbol_id])
+        self._published[symbol_id] = row
+        # Readers rescan the directory when the generation moves
+        HEADER.pack_into(self.buf, 0, MAGIC, LAYOUT_VERSION, len(self.exchanges), self.capacity, len(self._published))
+        return row
+
+    def invalidate_exchange(self, exchange: str):
+        """Clear an exchange's quotes, e.g. after its feed dropped"""
+        for symbol_id in list(self._published):
+            self.publish(exchange, symbol_id, None, None, None)
+
+    # Reader side
+
+    def _row(self, symbol: str) -> Optional[int]:
+        generation = HEADER.unpack_from(self.buf, 0)[4]
+        if generation != self._generation:
+            self._generation = generation
+            self._rows = {}
+            for row in range(self.capacity):
+                offset = self._names_offset + row * NAME_SIZE
+                if self.buf[offset]:
+                    self._rows[_decode(bytes(self.buf[offset:offset + NAME_SIZE]))] = row
+        return self._rows.get(symbol)
+
+    def _read_slot(self, row: int, col: int):
+        """Consistent (seq, fields) copy of a slot, or None if the writer kept it busy"""
+        offset = self._slot_offset(row, col)
+        buf = self.buf
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(buf, offset)[0]
+            if seq & 1:
+                continue
+            fields = QUOTE.unpack_from(buf, offset + SEQ.size)
+            if SEQ.unpack_from(buf, offset)[0] == seq:
+                return seq, fields
+        return None
+
+    def read(self, exchange: str, symbol: str) -> Optional[Dict]:
+        """Latest quote of a canonical symbol on an exchange, or None"""
+        col = self.exchange_index.get(exchange)
+        row = self._row(symbol)
+        if col is None or row is None:
+            return None
+        return self._quote(row, col)
+
+    def _quote(self, row: int, col: int) -> Optional[Dict]:
+        slot = self._read_slot(row, col)
+        if slot is None or slot[0] == 0 or math.isnan(slot[1][2]):
+            return None
+        seq, (bid, ask, last, exchange_ts, recv_ts) = slot
+        return {
+            'bid': _optional(bid),
+            'ask': _optional(ask),
+            'last': last,
+            'exchange_ts': _optional(exchange_ts),
+            'recv_ts': recv_ts,
+            'seq': seq
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        """{symbol: {exchange: quote}} for every live quote"""
+        self._row('')
+        result = {}
+        for symbol, row in self._rows.items():
+            for col, exchange in enumerate(self.exchanges):
+                quote = self._quote(row, col)
+                if quote is not None:
+                    result.setdefault(symbol, {})[exchange] = quote
+        return result
+
+    def close(self):
+        """Detach; the writer also removes the segment"""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,146 @@
+# Symbol registry utilities
+
+import asyncio
+from typing import Dict, List, Optional, Tuple, Union
+from exchanges import cex, gate, binance
+
+# Quote currencies a venue lists under a different name than the engine uses.
+# CEX.IO's USD books are traded as the engine's USDT pairs.
+QUOTE_ALIASES = {'cex': {'USD': 'USDT'}}
+NATIVE_QUOTES = {'cex': {'USDT': 'USD'}}
+SEPARATORS = {'cex': ':', 'gate': '_', 'binance': ''}
+KNOWN_QUOTES = ('USDT', 'USDC', 'BUSD', 'USD', 'EUR', 'GBP', 'BTC', 'ETH', 'BNB')
+
+Symbol = Union[int, str]
+
+
+def normalize_symbol(exchange, symbol):
+    """Map a venue-native symbol (BTC_USDT, BTC:USD) to the engine's BTCUSDT form"""
+    normalized = symbol.replace('_', '').replace(':', '').replace('/', '').upper()
+    # CEX.IO pairs are subscribed as USDT -> USD, so map them back
+    if exchange == 'cex' and normalized.endswith('USD'):
+        normalized += 'T'
+    return normalized
+
+
+def split_symbol(symbol: str) -> Optional[Tuple[str, str]]:
+    """Split a canonical BTCUSDT symbol into (base, quote) using KNOWN_QUOTES"""
+    for quote in KNOWN_QUOTES:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return None
+
+
+class SymbolRegistry:
+    """Interned canonical symbol IDs and venue-native symbol mappings.
+
+    Every canonical symbol (BTCUSDT) gets a small integer ID the first time it
+    is seen; books, engines and the manager key their state by that ID. The
+    native <-> ID maps are filled once from exchange metadata (see
+    load_symbol_registry) so that resolving an incoming symbol is a single
+    dict lookup. Symbols missing from the metadata fall back to the string
+    rules above and are cached on first use.
+    """
+
+    def __init__(self):
+        self.names = []   # id -> canonical symbol
+        self.ids = {}     # canonical symbol -> id
+        self._by_native = {}   # {exchange: {native: id}}
+        self._native = {}      # {exchange: {id: native}}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        symbol_id = self.ids.get(name)
+        if symbol_id is None:
+            symbol_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol_id
+
+    def id(self, symbol: Symbol) -> int:
+        """ID for a canonical symbol name; IDs are passed through"""
+        if type(symbol) is int:
+            return symbol
+        symbol_id = self.ids.get(symbol)
+        return symbol_id if symbol_id is not None else self.intern(symbol)
+
+    def name(self, symbol: Symbol) -> str:
+        return self.names[symbol] if type(symbol) is int else symbol
+
+    def register(self, exchange: str, native: str, canonical: Optional[str] = None,
+                 preferred: bool = True) -> int:
+        """Map a venue-native symbol to its canonical ID (and back)
+
+        When several native symbols share a canonical ID (CEX.IO BTC:USD and
+        BTC:USDT), the preferred one is used for subscriptions.
+        """
+        symbol_id = self.intern(canonical or normalize_symbol(exchange, native))
+        self._by_native.setdefault(exchange, {})[native] = symbol_id
+        natives = self._native.setdefault(exchange, {})
+        if preferred or symbol_id not in natives:
+            natives[symbol_id] = native
+        return symbol_id
+
+    def register_pair(self, exchange: str, base: str, quote: str) -> int:
+        """Register a listed market from its base and quote assets"""
+        base, quote = base.upper(), quote.upper()
+        aliases = QUOTE_ALIASES.get(exchange, {})
+        canonical_quote = aliases.get(quote, quote)
+        native = f"{base}{SEPARATORS.get(exchange, '')}{quote}"
+        # A venue's literal listing of an aliased quote must not displace the alias
+        preferred = quote in aliases or canonical_quote not in aliases.values()
+        return self.register(exchange, native, base + canonical_quote, preferred)
+
+    def resolve(self, exchange: str, native: str) -> int:
+        """ID for a venue-native symbol as it appears in a message"""
+        try:
+            return self._by_native[exchange][native]
+        except KeyError:
+            return self.register(exchange, native, preferred=False)
+
+    def native(self, exchange: str, symbol: Symbol) -> str:
+        """Venue-native symbol to subscribe to for a canonical symbol or ID"""
+        symbol_id = self.id(symbol)
+        native = self._native.get(exchange, {}).get(symbol_id)
+        if native is None:
+            native = self._default_native(exchange, self.names[symbol_id])
+            self.register(exchange, native, self.names[symbol_id], preferred=False)
+        return native
+
+    @staticmethod
+    def _default_native(exchange: str, name: str) -> str:
+        parts = split_symbol(name)
+        separator = SEPARATORS.get(exchange, '')
+        if parts is None or not separator:
+            return name
+        base, quote = parts
+        return f"{base}{separator}{NATIVE_QUOTES.get(exchange, {}).get(quote, quote)}"
+
+    def load(self, metadata: Dict[str, List[Tuple[str, str]]]):
+        """Register every listed (base, quote) market per exchange"""
+        for exchange, pairs in metadata.items():
+            for base, quote in pairs:
+                self.register_pair(exchange, base, quote)
+
+
+# Shared by the manager, books and engines so their IDs agree
+registry = SymbolRegistry()
+
+
+async def load_symbol_registry(symbol_registry: Optional[SymbolRegistry] = None,
+                              exchanges: Optional[List[str]] = None) -> SymbolRegistry:
+    """Fill the registry from each exchange's market listing, skipping venues that fail"""
+    if symbol_registry is None:
+        symbol_registry = registry
+    modules = {'cex': cex, 'gate': gate, 'binance': binance}
+    names = [name for name in modules if exchanges is None or name in exchanges]
+    results = await asyncio.gather(
+        *(modules[name].get_symbols() for name in names),
+        return_exceptions=True
+    )
+    symbol_registry.load({
+        name: pairs for name, pairs in zip(names, results)
+        if isinstance(pairs, list)
+    })
+    return symbol_registry